@@ -8,7 +8,7 @@ import pytest
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from unishell import Archive
+from unishell import Archive, stream_archive, stream_archive_chunks
 
 
 def _prep_content(tmp_path: Path):
@@ -294,6 +294,14 @@ def test_archive_format_detection():
         ("test.gz", "gz"),
         ("test.bz2", "bz2"),
         ("test.rar", "rar"),
+        ("test.tar.xz", "tar.xz"),
+        ("test.txz", "tar.xz"),
+        ("test.tar.zst", "tar.zst"),
+        ("test.tzst", "tar.zst"),
+        ("test.tar.lz4", "tar.lz4"),
+        ("test.xz", "xz"),
+        ("test.zst", "zst"),
+        ("test.lz4", "lz4"),
     ]
     
     for filename, expected_format in test_cases:
@@ -337,3 +345,920 @@ def test_archive_with_mixed_content_types(tmp_path: Path):
         assert (extract_dir / "mixed" / "nested.bin").read_bytes() == b"\xFF\xFE"
 
 
+
+
+def test_plain_tar_add_appends_in_place(tmp_path: Path):
+    (tmp_path / "a.txt").write_text("A", encoding="utf-8")
+    (tmp_path / "b.txt").write_text("B", encoding="utf-8")
+    arc_path = tmp_path / "inplace.tar"
+    arc = Archive(arc_path, "tar")
+    arc.add(tmp_path / "a.txt")
+    inode = arc_path.stat().st_ino
+    head = arc_path.read_bytes()[:1024]
+
+    arc.add(tmp_path / "b.txt")
+    assert arc_path.stat().st_ino == inode
+    assert arc_path.read_bytes()[:1024] == head
+    assert arc.list_files() == ["a.txt", "b.txt"]
+    assert [p.name for p in tmp_path.iterdir() if p.name.startswith(("~temp_", ".inplace"))] == []
+
+
+@pytest.mark.parametrize("fmt", ["tar", "tar.gz", "tar.bz2"])
+def test_tar_readd_replaces_members_without_temp_dir(tmp_path: Path, fmt: str):
+    sub = tmp_path / "sub"
+    sub.mkdir()
+    (sub / "old.txt").write_text("old", encoding="utf-8")
+    (tmp_path / "keep.txt").write_text("keep", encoding="utf-8")
+    arc = Archive(tmp_path / f"replace.{fmt}", fmt)
+    arc.add_many([tmp_path / "keep.txt", sub])
+
+    (sub / "old.txt").unlink()
+    (sub / "new.txt").write_text("new", encoding="utf-8")
+    arc.add(sub)
+
+    names = set(arc.list_files())
+    assert "sub/old.txt" not in names
+    assert {"keep.txt", "sub", "sub/new.txt"} <= names
+    out = tmp_path / "out"
+    arc.extract(path=out)
+    assert (out / "keep.txt").read_text(encoding="utf-8") == "keep"
+    assert not list(tmp_path.glob("~temp_*"))
+
+
+@pytest.mark.parametrize("password", [None, "секрет"])
+def test_7z_update_without_temp_dir(tmp_path: Path, password):
+    sub = tmp_path / "sub"
+    (sub / "empty_dir").mkdir(parents=True)
+    (sub / "old.txt").write_text("old", encoding="utf-8")
+    (tmp_path / "keep.txt").write_text("keep" * 1000, encoding="utf-8")
+    (tmp_path / "empty.txt").write_text("", encoding="utf-8")
+    (tmp_path / "more.txt").write_text("more", encoding="utf-8")
+    arc_path = tmp_path / "update.7z"
+    arc = Archive(arc_path, "7z", password=password)
+    arc.add_many([tmp_path / "keep.txt", tmp_path / "empty.txt", sub])
+
+    # без конфликтов имен - дописывание
+    arc.add(tmp_path / "more.txt")
+    # повторное добавление директории заменяет ее содержимое
+    (sub / "old.txt").unlink()
+    (sub / "new.txt").write_text("new", encoding="utf-8")
+    arc.add(sub)
+
+    names = set(arc.list_files())
+    assert "sub/old.txt" not in names
+    assert {"keep.txt", "empty.txt", "more.txt", "sub", "sub/new.txt", "sub/empty_dir"} <= names
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["empty.txt", "keep.txt", "more.txt", "sub", "update.7z"]
+
+    out = tmp_path / "out"
+    arc.extract(path=out)
+    assert (out / "keep.txt").read_text(encoding="utf-8") == "keep" * 1000
+    assert (out / "empty.txt").read_text(encoding="utf-8") == ""
+    assert (out / "sub" / "new.txt").read_text(encoding="utf-8") == "new"
+
+
+@pytest.mark.parametrize("fmt", ["zip", "7z", "tar", "tar.gz", "tar.bz2"])
+@pytest.mark.parametrize("password", [None, "секрет"])
+def test_open_member_reads_without_extraction(tmp_path: Path, fmt: str, password):
+    if password and fmt not in ("zip", "7z"):
+        pytest.skip("пароль поддерживается только для zip/7z")
+    files, sub = _prep_content(tmp_path)
+    arc = Archive(tmp_path / f"arch.{fmt}", fmt, password=password)
+    arc.add_many([tmp_path / n for n, _ in files] + [sub])
+    before = set(os.listdir(tmp_path))
+
+    for name, content in files:
+        with arc.open(name) as f:
+            assert f.read() == content.encode("utf-8")
+        assert arc.read_text(name) == content
+    assert arc.read_text("sub/nested/deep.txt") == "deep content"
+    assert set(os.listdir(tmp_path)) == before
+
+    with pytest.raises(ValueError):
+        arc.open("nope.txt")
+    with pytest.raises(ValueError):
+        arc.open("a.txt", "wb")
+
+
+@pytest.mark.parametrize("fmt", ["zip", "7z", "tar.gz"])
+def test_archive_member_stream_to_file(tmp_path: Path, fmt: str):
+    from unishell import File
+    text = "строка\r\n" * 1000 + "end"
+    src = tmp_path / "cfg.txt"
+    src.write_bytes(text.encode("cp1251"))
+    arc = Archive(tmp_path / f"arch.{fmt}", fmt)
+    arc.add(src)
+
+    assert arc.read_text("cfg.txt", encoding="cp1251") == text.replace("\r\n", "\n")
+    target = File(tmp_path / "out.txt")
+    arc.member("cfg.txt") > target
+    assert target.content == text.replace("\r\n", "\n")
+    arc / "cfg.txt" >> target
+    assert target.content == 2 * text.replace("\r\n", "\n")
+
+
+def test_gz_bz2_open_member(tmp_path: Path):
+    for opener, ext in ((gzip.open, "gz"), (bz2.open, "bz2")):
+        p = tmp_path / f"file.txt.{ext}"
+        with opener(p, "wb") as f:
+            f.write("данные".encode("utf-8"))
+        arc = Archive(p)
+        with arc.open("file.txt") as f:
+            assert f.read().decode("utf-8") == "данные"
+        with pytest.raises(ValueError):
+            arc.open("other")
+
+
+def _tree(root: Path):
+    return {p.relative_to(root).as_posix(): (p.read_bytes() if p.is_file() else None) for p in root.rglob("*")}
+
+
+@pytest.mark.parametrize("password", [None, "секрет"])
+@pytest.mark.parametrize("member", [None, "sub"])
+def test_parallel_extract_zip_matches_sequential(tmp_path: Path, password, member):
+    files, sub = _prep_content(tmp_path)
+    arc = Archive(tmp_path / "arch.zip", "zip", password=password)
+    arc.add_many([tmp_path / n for n, _ in files] + [sub])
+
+    arc.extract(member=member, path=tmp_path / "seq")
+    arc.extract(member=member, path=tmp_path / "par", workers=4)
+    assert _tree(tmp_path / "par") == _tree(tmp_path / "seq")
+    with pytest.raises(ValueError):
+        arc.extract(member="nope", path=tmp_path / "x", workers=4)
+
+
+def test_parallel_extract_7z_splits_by_block(tmp_path: Path):
+    py7zr = pytest.importorskip("py7zr")
+    _, sub = _prep_content(tmp_path)
+    arc_path = tmp_path / "multi.7z"
+    # каждая запись в режиме 'a' - отдельный сжатый блок
+    with py7zr.SevenZipFile(arc_path, "w") as zf:
+        zf.write(tmp_path / "a.txt", "a.txt")
+    for name in ("b.txt", "nested/deep.txt"):
+        with py7zr.SevenZipFile(arc_path, "a") as zf:
+            zf.write(sub / name, f"sub/{name}")
+
+    arc = Archive(arc_path)
+    with py7zr.SevenZipFile(arc_path) as zf:
+        assert zf.header.main_streams.unpackinfo.numfolders == 3
+    arc.extract(path=tmp_path / "seq")
+    arc.extract(path=tmp_path / "par", workers=4)
+    assert _tree(tmp_path / "par") == _tree(tmp_path / "seq")
+    assert (tmp_path / "par" / "sub" / "nested" / "deep.txt").read_text(encoding="utf-8") == "deep content"
+
+
+def test_parallel_extract_zip_stays_inside_target(tmp_path: Path):
+    import zipfile
+    arc_path = tmp_path / "evil.zip"
+    with zipfile.ZipFile(arc_path, "w") as zf:
+        zf.writestr("../escape.txt", "x")
+        zf.writestr("/abs.txt", "y")
+    Archive(arc_path).extract(path=tmp_path / "out", workers=2)
+    assert not (tmp_path / "escape.txt").exists()
+    assert (tmp_path / "out" / "escape.txt").read_text() == "x"
+    assert (tmp_path / "out" / "abs.txt").read_text() == "y"
+
+
+def test_tar_gz_parallel_blocks_roundtrip(tmp_path: Path):
+    files, sub = _prep_content(tmp_path)
+    big = tmp_path / "big.bin"
+    big.write_bytes(os.urandom(200_000) * 3)
+    arc = Archive(tmp_path / "arch.tar.gz")
+    arc.gzip_workers, arc.gzip_block_size = 4, 64 << 10
+    arc.add_many([big, sub])
+    arc.add(tmp_path / "a.txt")  # пересборка тоже через параллельный gzip
+    arc.extract(path=tmp_path / "out")
+    assert (tmp_path / "out" / "big.bin").read_bytes() == big.read_bytes()
+    assert (tmp_path / "out" / "sub" / "nested" / "deep.txt").read_text(encoding="utf-8") == "deep content"
+    assert (tmp_path / "out" / "a.txt").read_text(encoding="utf-8") == "A"
+
+
+def test_gz_create_single_file(tmp_path: Path):
+    src = tmp_path / "report.txt"
+    src.write_text("отчет " * 10000, encoding="utf-8")
+    arc = Archive.create_from(tmp_path / "report.txt.gz", "gz", [src])
+    assert gzip.decompress(arc.path.read_bytes()) == src.read_bytes()
+    assert arc.read_text("report.txt") == src.read_text(encoding="utf-8")
+    with pytest.raises(ValueError):
+        arc.add_many([src, src])
+    assert gzip.decompress(Archive(tmp_path / "empty.gz").create().path.read_bytes()) == b""
+
+
+@pytest.mark.parametrize("fmt", ["zip", "7z", "tar", "tar.gz", "tar.bz2"])
+def test_member_index_cached_and_invalidated(tmp_path: Path, fmt: str, monkeypatch):
+    from unishell._internal.structures import archive as archive_mod
+    files, sub = _prep_content(tmp_path)
+    arc = Archive(tmp_path / f"arch.{fmt}", fmt)
+    arc.add_many([tmp_path / n for n, _ in files] + [sub])
+
+    builds = []
+    build_index = archive_mod.Archive._build_index
+    monkeypatch.setattr(archive_mod.Archive, "_build_index", lambda self, st: builds.append(1) or build_index(self, st))
+    names = arc.list_files()
+    # новый объект для того же файла тоже берет индекс из кэша
+    other = Archive(arc.path, fmt)
+    assert list(other) == names and "a.txt" in other and "sub" in other and "nope" not in other
+    assert len(builds) == 1
+
+    info = {e.name: e for e in arc.index()}["sub/nested/deep.txt"]
+    assert info.size == len("deep content") and info.type == "file"
+    arc.extract(member="sub/nested", path=tmp_path / "out")
+    assert (tmp_path / "out" / "sub" / "nested" / "deep.txt").read_text(encoding="utf-8") == "deep content"
+    assert arc.read_text("sub/b.txt") == "B"
+    assert len(builds) == 1
+
+    (tmp_path / "new.txt").write_text("new", encoding="utf-8")
+    arc.add(tmp_path / "new.txt")
+    assert "new.txt" in arc
+    assert len(builds) == 2
+
+
+def test_member_index_sidecar(tmp_path: Path, monkeypatch):
+    from unishell._internal.structures import archive as archive_mod
+    files, sub = _prep_content(tmp_path)
+    arc = Archive(tmp_path / "arch.tar.gz")
+    arc.index_sidecar = True
+    arc.add_many([tmp_path / n for n, _ in files] + [sub])
+    names = arc.list_files()
+    sidecar = tmp_path / "arch.tar.gz.index.json"
+    assert sidecar.exists()
+
+    # новый процесс: кэш в памяти пуст, индекс читается из файла рядом с архивом
+    archive_mod._index_cache.clear()
+    monkeypatch.setattr(archive_mod.Archive, "_build_index", lambda self, st: pytest.fail("архив перечитан"))
+    reopened = Archive(arc.path)
+    reopened.index_sidecar = True
+    assert reopened.list_files() == names
+    monkeypatch.undo()
+
+    # архив изменен в обход Archive: ключ (размер, mtime) не совпадает - индекс строится заново
+    archive_mod._index_cache.clear()
+    Archive(tmp_path / "other.tar.gz").add(tmp_path / "a.txt")
+    os.replace(tmp_path / "other.tar.gz", arc.path)
+    assert reopened.list_files() == ["a.txt"]
+    arc.add(tmp_path / "a.txt")
+    assert not sidecar.exists()
+
+
+def test_tar_gz_seek_index_for_member_reads(tmp_path: Path, monkeypatch):
+    from unishell._internal.structures import archive as archive_mod
+    from unishell._internal import gzip_utils
+    src = tmp_path / "src"
+    src.mkdir()
+    for i in range(30):
+        (src / f"f{i:02d}.bin").write_bytes(os.urandom(20_000) + bytes([i]) * 20_000)
+    arc = Archive(tmp_path / "big.tar.gz")
+    arc.gzip_seek_index, arc.gzip_seek_span, arc.gzip_block_size = True, 64 << 10, 64 << 10
+    arc.add(src)
+    names = arc.list_files()
+    gzi = tmp_path / "big.tar.gz.gzi"
+    assert gzi.exists()
+
+    # новый процесс: точки доступа читаются из .gzi, распаковка начинается рядом с элементом
+    archive_mod._index_cache.clear()
+    archive_mod._seek_index_cache.clear()
+    reopened = Archive(arc.path)
+    reopened.gzip_seek_index = True
+    starts = []
+    start = gzip_utils.GzipSeekReader._start
+    monkeypatch.setattr(gzip_utils.GzipSeekReader, "_start", lambda self, point: starts.append(point.uncomp) or start(self, point))
+    assert reopened.read_bytes("src/f29.bin") == (src / "f29.bin").read_bytes()
+    assert max(starts) > 0
+    reopened.extract(member="src/f15.bin", path=tmp_path / "out")
+    assert (tmp_path / "out" / "src" / "f15.bin").read_bytes() == (src / "f15.bin").read_bytes()
+    assert reopened.list_files() == names
+
+    arc.add(tmp_path / "src" / "f00.bin", arcname="again.bin")
+    assert not gzi.exists()
+    assert arc.read_bytes("again.bin") == (src / "f00.bin").read_bytes()
+
+
+def test_copy_members_zip_raw_without_recompression(tmp_path: Path):
+    import zipfile
+    files, sub = _prep_content(tmp_path)
+    comp = Archive(tmp_path / "component.zip", "zip")
+    comp.add_many([tmp_path / n for n, _ in files] + [sub])
+    release = Archive(tmp_path / "release.zip", "zip")
+    release.add(tmp_path / "a.txt", arcname="README.txt")
+
+    release.copy_members(comp, members=["sub", "a.txt"], rename={"a.txt": "docs/a.txt"})
+    assert set(release) == {"README.txt", "docs/a.txt", "sub/b.txt", "sub/nested/deep.txt"}
+    with zipfile.ZipFile(comp.path) as src, zipfile.ZipFile(release.path) as dst:
+        assert dst.testzip() is None
+        # сжатые данные перенесены как есть
+        assert dst.getinfo("docs/a.txt").compress_size == src.getinfo("a.txt").compress_size
+        assert dst.getinfo("sub/b.txt").CRC == src.getinfo("sub/b.txt").CRC
+    assert release.read_text("sub/nested/deep.txt") == "deep content"
+
+    # совпадающее имя заменяется, остальное сохраняется
+    (tmp_path / "new.txt").write_text("new", encoding="utf-8")
+    patch = Archive(tmp_path / "patch.zip", "zip")
+    patch.add(tmp_path / "new.txt", arcname="README.txt")
+    release.copy_members(patch)
+    assert release.list_files().count("README.txt") == 1
+    assert release.read_text("README.txt") == "new"
+    assert release.read_text("docs/a.txt") == "A"
+    with pytest.raises(ValueError):
+        release.copy_members(comp, members=["nope"])
+
+
+def test_copy_members_zip_keeps_encryption_and_descriptors(tmp_path: Path):
+    import io
+    import zipfile
+    files, _ = _prep_content(tmp_path)
+    secret = Archive(tmp_path / "secret.zip", "zip", password="секрет")
+    secret.add_many([tmp_path / n for n, _ in files])
+
+    # zip, записанный в несекционируемый поток, использует дескрипторы данных (флаг 0x08)
+    class Unseekable(io.RawIOBase):
+        def __init__(self):
+            self.buf = io.BytesIO()
+        def writable(self):
+            return True
+        def write(self, b):
+            return self.buf.write(b)
+    stream = Unseekable()
+    with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("streamed.txt", "поток " * 1000)
+    (tmp_path / "streamed.zip").write_bytes(stream.buf.getvalue())
+
+    merged = Archive(tmp_path / "merged.zip", "zip", password="секрет")
+    merged.copy_members(secret).copy_members(tmp_path / "streamed.zip")
+    with zipfile.ZipFile(merged.path) as zf:
+        assert zf.getinfo("streamed.txt").flag_bits & 0x08
+        assert zf.read("streamed.txt").decode("utf-8") == "поток " * 1000
+    out = tmp_path / "out"
+    merged.extract(path=out)
+    for name, content in files:
+        assert (out / name).read_text(encoding="utf-8") == content
+    with pytest.raises(Exception):
+        Archive(merged.path).extract(member="a.txt", path=tmp_path / "nopass")
+
+
+def test_copy_members_zip_appends_after_stub_and_keeps_comment(tmp_path: Path):
+    import zipfile
+    files, _ = _prep_content(tmp_path)
+    comp = Archive(tmp_path / "component.zip", "zip")
+    comp.add_many([tmp_path / n for n, _ in files])
+
+    # самораспаковывающийся zip: перед архивом данные, в конце - комментарий
+    plain = tmp_path / "plain.zip"
+    with zipfile.ZipFile(plain, "w") as zf:
+        zf.writestr("README.txt", "readme")
+        zf.comment = "сборка 42".encode("utf-8")
+    sfx = tmp_path / "release.zip"
+    sfx.write_bytes(b"MZ" + b"\0" * 1022 + plain.read_bytes())
+
+    release = Archive(sfx, "zip")
+    release.copy_members(comp)
+    with zipfile.ZipFile(sfx) as zf:
+        assert zf.testzip() is None
+        assert zf.comment == "сборка 42".encode("utf-8")
+        assert set(zf.namelist()) == {"README.txt"} | {n for n, _ in files}
+    assert sfx.read_bytes()[:2] == b"MZ"
+    # после сырого дописывания архив остаётся рабочим и для обычной записи zipfile
+    (tmp_path / "new.txt").write_text("new", encoding="utf-8")
+    release.replace("README.txt", tmp_path / "new.txt")
+    assert release.read_text("README.txt") == "new"
+    for name, content in files:
+        assert release.read_text(name) == content
+
+
+@pytest.mark.parametrize("src_fmt,dst_fmt", [("tar", "tar"), ("tar.bz2", "tar.gz"), ("zip", "tar"), ("tar.gz", "zip")])
+def test_copy_members_streaming_between_formats(tmp_path: Path, src_fmt: str, dst_fmt: str):
+    files, sub = _prep_content(tmp_path)
+    src = Archive(tmp_path / f"src.{src_fmt}", src_fmt)
+    src.add_many([tmp_path / n for n, _ in files] + [sub])
+    dst = Archive(tmp_path / f"dst.{dst_fmt}", dst_fmt)
+    dst.add(tmp_path / "a.txt", arcname="keep.txt")
+    dst.add(tmp_path / "a.txt", arcname="lib/b.txt")
+
+    dst.copy_members(src, members=["sub"], rename=lambda n: n.replace("sub/", "lib/", 1))
+    assert dst.read_text("lib/b.txt") == "B"
+    assert dst.read_text("lib/nested/deep.txt") == "deep content"
+    assert dst.read_text("keep.txt") == "A"
+    assert dst.list_files().count("lib/b.txt") == 1
+    # копирование архива в самого себя
+    dst.copy_members(dst, members=["keep.txt"], rename={"keep.txt": "copy.txt"})
+    assert dst.read_text("copy.txt") == "A" and "keep.txt" in dst
+
+
+@pytest.mark.parametrize("dst_fmt", ["zip", "tar.gz"])
+def test_copy_members_from_7z_decompresses_once(tmp_path: Path, dst_fmt: str, monkeypatch):
+    from unishell._internal.structures import archive as archive_mod
+    files, sub = _prep_content(tmp_path)
+    src = Archive.create_from(tmp_path / "src.7z", "7z", [tmp_path / n for n, _ in files] + [sub])
+    passes = []
+    original = archive_mod._stream_7z_members
+
+    def counting(*args, **kwargs):
+        passes.append(args[1])
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(archive_mod, "_stream_7z_members", counting)
+    dst = Archive(tmp_path / f"dst.{dst_fmt}", dst_fmt)
+    dst.copy_members(src)
+    assert len(passes) == 1 and len(passes[0]) == 6
+    monkeypatch.undo()
+    for name, content in files:
+        assert dst.read_text(name) == content
+    assert dst.read_text("sub/nested/deep.txt") == "deep content"
+
+
+def test_copy_members_single_codec_into_tar(tmp_path: Path):
+    src_file = tmp_path / "data.log"
+    src_file.write_text("строка\n" * 100, encoding="utf-8")
+    gz = Archive.create_from(tmp_path / "data.log.gz", "gz", [src_file])
+    dst = Archive(tmp_path / "dst.tar", "tar")
+    dst.copy_members(gz)
+    assert dst.read_text("data.log") == src_file.read_text(encoding="utf-8")
+
+
+@pytest.mark.parametrize("fmt", ["zip", "7z", "tar", "tar.gz", "tar.bz2"])
+def test_remove_members(tmp_path: Path, fmt: str):
+    files, sub = _prep_content(tmp_path)
+    long_name = tmp_path / ("long_name_" * 12 + ".txt")
+    long_name.write_text("long", encoding="utf-8")
+    arc = Archive(tmp_path / f"arch.{fmt}", fmt)
+    arc.add_many([tmp_path / n for n, _ in files] + [sub, long_name])
+
+    arc.remove("a.txt")
+    arc.remove_many(["sub/nested", "кириллица.txt"])
+    names = set(arc)
+    assert "a.txt" not in names and "кириллица.txt" not in names
+    assert not any(n.startswith("sub/nested") for n in names)
+    assert {"sub/b.txt", long_name.name, "日本語.txt"} <= names
+    assert arc.read_text(long_name.name) == "long"
+    assert arc.read_text("emoji😊.txt") == "Содержимое с эмодзи 😊"
+    out = tmp_path / "out"
+    arc.extract(path=out)
+    assert (out / "sub" / "b.txt").read_text(encoding="utf-8") == "B"
+    with pytest.raises(ValueError):
+        arc.remove("a.txt")
+
+
+def test_remove_from_plain_tar_copies_blocks(tmp_path: Path):
+    import tarfile
+    files, sub = _prep_content(tmp_path)
+    arc = Archive(tmp_path / "arch.tar")
+    arc.add_many([tmp_path / n for n, _ in files] + [sub])
+    before = {m.name: m for m in tarfile.open(arc.path)}
+    arc.remove_many(["a.txt", "sub/nested"])
+    assert arc.path.stat().st_size % tarfile.RECORDSIZE == 0
+    with tarfile.open(arc.path) as tf:
+        for member in tf:
+            old = before[member.name]
+            assert (member.mode, member.mtime, member.uid) == (old.mode, old.mtime, old.uid)
+    # после сжатия архив остается пригодным для дозаписи на месте
+    arc.add(tmp_path / "a.txt", arcname="again.txt")
+    assert arc.read_text("again.txt") == "A"
+
+
+@pytest.mark.parametrize("fmt", ["zip", "7z", "tar", "tar.gz"])
+def test_replace_members(tmp_path: Path, fmt: str):
+    import zipfile
+    files, sub = _prep_content(tmp_path)
+    arc = Archive(tmp_path / f"arch.{fmt}", fmt)
+    arc.add_many([tmp_path / n for n, _ in files] + [sub])
+    new = tmp_path / "new.txt"
+    new.write_text("новое", encoding="utf-8")
+    new_dir = tmp_path / "new_dir"
+    new_dir.mkdir()
+    (new_dir / "only.txt").write_text("only", encoding="utf-8")
+
+    arc.replace("a.txt", new)
+    arc.replace_many({"sub": new_dir, "日本語.txt": new})
+    names = arc.list_files()
+    assert names.count("a.txt") == 1
+    assert arc.read_text("a.txt") == "новое" and arc.read_text("日本語.txt") == "новое"
+    assert arc.read_text("sub/only.txt") == "only"
+    assert "sub/b.txt" not in names
+    assert arc.read_text("кириллица.txt") == "Привет"
+    if fmt == "zip":
+        with zipfile.ZipFile(arc.path) as zf:
+            assert zf.testzip() is None
+    with pytest.raises(ValueError):
+        arc.replace("nope.txt", new)
+
+
+def _codec_available(fmt: str) -> bool:
+    module = {"zst": "backports.zstd" if sys.version_info < (3, 14) else "compression.zstd", "lz4": "lz4.frame"}.get(fmt.rsplit(".", 1)[-1])
+    if module is None:
+        return True
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
+
+
+@pytest.mark.parametrize("fmt", ["tar.xz", "tar.zst", "tar.lz4"])
+def test_new_tar_codecs_roundtrip(tmp_path: Path, fmt: str):
+    if not _codec_available(fmt):
+        pytest.skip(f"нет библиотеки для {fmt}")
+    files, sub = _prep_content(tmp_path)
+    arc = Archive.create_from(tmp_path / f"arch.{fmt}", fmt, [tmp_path / n for n, _ in files] + [sub], level=1)
+    assert "sub/nested/deep.txt" in arc
+    assert arc.read_text("日本語.txt") == "日本語の内容"
+    arc.add(tmp_path / "a.txt", arcname="again.txt")
+    arc.remove("sub/b.txt")
+    out = tmp_path / "out"
+    arc.extract(path=out)
+    assert (out / "again.txt").read_text(encoding="utf-8") == "A"
+    assert (out / "sub" / "nested" / "deep.txt").read_text(encoding="utf-8") == "deep content"
+    assert not (out / "sub" / "b.txt").exists()
+
+
+@pytest.mark.parametrize("fmt", ["xz", "zst", "lz4", "bz2"])
+def test_single_file_codecs(tmp_path: Path, fmt: str):
+    if not _codec_available(fmt):
+        pytest.skip(f"нет библиотеки для {fmt}")
+    src = tmp_path / "data.log"
+    src.write_bytes(b"line of log\n" * 5000)
+    arc = Archive.create_from(tmp_path / f"data.log.{fmt}", fmt, [src])
+    assert arc.path.stat().st_size < src.stat().st_size
+    assert arc.read_bytes("data.log") == src.read_bytes()
+    arc.extract(path=tmp_path / "out")
+    assert (tmp_path / "out" / "data.log").read_bytes() == src.read_bytes()
+
+
+def test_zstd_level_threads_and_long_window(tmp_path: Path):
+    if not _codec_available("zst"):
+        pytest.skip("нет библиотеки zstd")
+    block = os.urandom(1 << 20)
+    src = tmp_path / "repeats.bin"
+    # повтор на расстоянии 4 МБ - за пределами обычного окна zstd (уровень 1 - окно 512 КБ)
+    src.write_bytes(block + os.urandom(3 << 20) + block)
+    sizes = {}
+    for long_window in (False, True):
+        arc = Archive.create_from(tmp_path / f"long_{long_window}.tar.zst", "tar.zst", [src],
+                                  level=1, threads=2, long_window=long_window)
+        sizes[long_window] = arc.path.stat().st_size
+        assert arc.read_bytes("repeats.bin") == src.read_bytes()
+    assert sizes[True] < sizes[False] - (512 << 10)
+
+
+@pytest.mark.parametrize("fmt", ["tar.zst", "zst"])
+def test_zstd_frames_carry_checksum(tmp_path: Path, fmt: str):
+    if not _codec_available("zst"):
+        pytest.skip("нет библиотеки zstd")
+    src = tmp_path / "random.bin"
+    src.write_bytes(os.urandom(256 << 10))  # несжимаемые данные лежат в кадре как есть - порчу ловит только checksum
+    arc = Archive.create_from(tmp_path / f"data.{fmt}", fmt, [src])
+    data = bytearray(arc.path.read_bytes())
+    assert data[4] & 0x04  # Content_Checksum_flag в заголовке кадра, как у zstd CLI
+    data[len(data) // 2] ^= 1
+    arc.path.write_bytes(data)
+    assert not Archive(arc.path).verify().ok
+
+
+@pytest.mark.parametrize("compression", ["zstd", "lzma", "bzip2", "store"])
+def test_zip_member_compression_methods(tmp_path: Path, compression: str):
+    import zipfile
+    if compression == "zstd" and not _codec_available("zst"):
+        pytest.skip("нет библиотеки zstd")
+    files, sub = _prep_content(tmp_path)
+    arc = Archive.create_from(tmp_path / "arch.zip", "zip", [tmp_path / n for n, _ in files] + [sub],
+                              compression=compression, level=3)
+    methods = {"zstd": 93, "lzma": zipfile.ZIP_LZMA, "bzip2": zipfile.ZIP_BZIP2, "store": zipfile.ZIP_STORED}
+    with zipfile.ZipFile(arc.path) as zf:
+        assert {info.compress_type for info in zf.infolist()} == {methods[compression]}
+    arc.remove("a.txt")
+    assert arc.read_text("sub/nested/deep.txt") == "deep content"
+    out = tmp_path / "out"
+    arc.extract(path=out, workers=2)
+    assert (out / "кириллица.txt").read_text(encoding="utf-8") == "Привет"
+
+
+def test_zip_compression_is_validated(tmp_path: Path):
+    with pytest.raises(ValueError):
+        Archive(tmp_path / "a.zip", compression="brotli")
+
+
+def _prep_search(tmp_path: Path) -> Path:
+    src = tmp_path / "bundle"
+    (src / "logs").mkdir(parents=True)
+    (src / "logs" / "app.log").write_text("start\nERROR disk full\nok\nERROR again\n", encoding="utf-8")
+    (src / "logs" / "old.log").write_bytes("запуск\nERROR сеть недоступна\n".encode("cp1251"))
+    (src / "readme.txt").write_text("release 1.2.3 (see ERROR codes)", encoding="utf-8")
+    (src / "image.bin").write_bytes(b"\x00\x01ERROR\x00" * 100)
+    return src
+
+
+@pytest.mark.parametrize("fmt", ["zip", "7z", "tar", "tar.gz", "tar.bz2"])
+def test_search_members(tmp_path: Path, fmt: str):
+    src = _prep_search(tmp_path)
+    arc = Archive.create_from(tmp_path / f"bundle.{fmt}", fmt, [src])
+    hits = list(arc.search(r"^ERROR"))
+    assert sorted(hits) == [
+        ("bundle/logs/app.log", 2, "ERROR disk full"),
+        ("bundle/logs/app.log", 4, "ERROR again"),
+        ("bundle/logs/old.log", 2, "ERROR сеть недоступна"),
+    ]
+    assert [h.line_no for h in arc.search("ERROR", members_glob="*.txt")] == [1]
+    assert list(arc.search("1.2.3", regex=False)) == [("bundle/readme.txt", 1, "release 1.2.3 (see ERROR codes)")]
+    assert list(arc.search("1.2.3", regex=False, members_glob="*.log")) == []
+    # двоичный элемент пропускается, хотя в нём есть совпадение
+    assert all(h.member != "bundle/image.bin" for h in arc.search("ERROR"))
+
+
+@pytest.mark.parametrize("fmt", ["zip", "7z"])
+def test_search_parallel_matches_sequential(tmp_path: Path, fmt: str):
+    src = tmp_path / "many"
+    src.mkdir()
+    for i in range(40):
+        (src / f"f{i:02d}.txt").write_text("".join(f"line {j} {'hit' if j % 7 == i % 7 else ''}\n" for j in range(200)),
+                                           encoding="utf-8")
+    arc = Archive.create_from(tmp_path / f"many.{fmt}", fmt, [src])
+    sequential = list(arc.search("hit$"))
+    parallel = list(arc.search("hit$", workers=4))
+    assert len(sequential) > 40
+    assert sorted(parallel) == sorted(sequential)
+    # строки одного элемента идут по порядку и в параллельном режиме
+    per_member = {}
+    for hit in parallel:
+        per_member.setdefault(hit.member, []).append(hit.line_no)
+    assert all(lines == sorted(lines) for lines in per_member.values())
+
+
+def test_search_is_lazy_and_chunk_safe(tmp_path: Path):
+    from unishell._internal.stream import CHUNK_SIZE
+    big = tmp_path / "big.txt"
+    # совпадение разрезано границей блока чтения, а строки с \r\n
+    filler = b"x" * (CHUNK_SIZE - 3)
+    big.write_bytes(filler + b"\r\nneedle here\r\n" + b"tail\r\n" * 10 + b"needle last")
+    arc = Archive.create_from(tmp_path / "big.tar.gz", "tar.gz", [big])
+    assert list(arc.search("needle")) == [("big.txt", 2, "needle here"), ("big.txt", 13, "needle last")]
+    hits = arc.search("needle")
+    assert next(hits).line_no == 2
+    hits.close()
+    # совпадение через перевод строки не считается - поиск идёт по строкам
+    assert list(arc.search(r"here\ntail")) == []
+
+
+@pytest.mark.parametrize("fmt", ["zip", "7z", "tar", "tar.gz", "tar.bz2", "tar.xz"])
+def test_verify_intact_archive(tmp_path: Path, fmt: str):
+    files, sub = _prep_content(tmp_path)
+    arc = Archive.create_from(tmp_path / f"arch.{fmt}", fmt, [tmp_path / n for n, _ in files] + [sub])
+    before = set(os.listdir(tmp_path))
+    report = arc.verify(workers=3)
+    assert report.ok and report.bad_members == []
+    assert report.members == 6
+    assert report.bytes_checked == sum(len(c.encode("utf-8")) for _, c in files) + len("B") + len("deep content")
+    assert report.throughput > 0
+    assert set(os.listdir(tmp_path)) == before
+
+
+def test_verify_zip_reports_bad_member(tmp_path: Path):
+    import zipfile
+    arc_path = tmp_path / "bad.zip"
+    with zipfile.ZipFile(arc_path, "w", zipfile.ZIP_STORED) as zf:
+        for name in ("a.txt", "b.txt", "c.txt"):
+            zf.writestr(name, name[0].upper().encode() * 1000)
+    data = bytearray(arc_path.read_bytes())
+    data[data.index(b"B" * 1000) + 10] ^= 1
+    arc_path.write_bytes(data)
+    for workers in (1, 3):
+        report = Archive(arc_path).verify(workers=workers)
+        assert [name for name, _ in report.bad_members] == ["b.txt"]
+        assert "CRC" in report.bad_members[0][1]
+        assert report.members == 3 and not report.ok
+
+
+def test_verify_7z_reports_bad_member_per_block(tmp_path: Path):
+    py7zr = pytest.importorskip("py7zr")
+    arc_path = tmp_path / "bad.7z"
+    copy = [{"id": py7zr.FILTER_COPY}]  # данные лежат в архиве как есть - их легко испортить
+    with py7zr.SevenZipFile(arc_path, "w", filters=copy) as zf:
+        zf.writestr(b"AAAA" * 100, "a.txt")
+        zf.writestr(b"BBBB" * 100, "b.txt")
+        zf.writestr(b"EEEE" * 100, "e.txt")
+    for name, content in (("c.txt", b"CCCC"), ("d.txt", b"DDDD")):
+        with py7zr.SevenZipFile(arc_path, "a", filters=copy) as zf:
+            zf.writestr(content * 100, name)
+    data = bytearray(arc_path.read_bytes())
+    data[data.index(b"BBBB") + 5] ^= 1
+    arc_path.write_bytes(data)
+    for workers in (1, 3):
+        report = Archive(arc_path).verify(workers=workers)
+        assert [name for name, _ in report.bad_members] == ["b.txt", "e.txt"]
+        assert "CrcError" in report.bad_members[0][1] and "не проверен" in report.bad_members[1][1]
+        assert report.bytes_checked == 1200  # a, c и d
+
+
+def test_verify_tar_detects_corruption(tmp_path: Path):
+    import tarfile
+    files, sub = _prep_content(tmp_path)
+    arc = Archive.create_from(tmp_path / "arch.tar", "tar", [tmp_path / n for n, _ in files] + [sub])
+    good = arc.path.read_bytes()
+
+    # испорченный заголовок посреди архива: tarfile просто останавливается, verify - нет
+    entries = sorted(arc.index(), key=lambda e: e.offset)
+    offset = entries[3].offset
+    broken = bytearray(good)
+    broken[offset + 10] ^= 0xFF
+    arc.path.write_bytes(broken)
+    report = Archive(arc.path).verify()
+    assert report.bad_members and report.bad_members[-1][0] == ""
+    assert str(offset) in report.bad_members[-1][1]
+
+    # архив обрезан на границе элемента: нет маркера конца
+    arc.path.write_bytes(good[:entries[-1].offset])
+    assert not Archive(arc.path).verify().ok
+
+    # обрезан посреди данных
+    arc.path.write_bytes(good[:entries[-1].offset + tarfile.BLOCKSIZE + 3])
+    assert not Archive(arc.path).verify().ok
+
+
+@pytest.mark.parametrize("fmt", ["tar.gz", "gz", "bz2", "xz"])
+def test_verify_compressed_stream_trailer(tmp_path: Path, fmt: str):
+    src = tmp_path / "data.txt"
+    src.write_bytes(b"payload line\n" * 2000)
+    arc = Archive.create_from(tmp_path / f"data.{fmt}", fmt, [src])
+    assert arc.verify().ok
+    data = bytearray(arc.path.read_bytes())
+    data[-3] ^= 0xFF  # контрольная сумма/размер в хвосте потока
+    arc.path.write_bytes(data)
+    report = Archive(arc.path).verify()
+    assert not report.ok
+
+
+def test_verify_missing_archive(tmp_path: Path):
+    with pytest.raises(FileNotFoundError):
+        Archive(tmp_path / "none.zip").verify()
+
+
+@pytest.mark.parametrize("fmt", ["zip", "7z", "tar", "tar.gz", "tar.bz2"])
+@pytest.mark.parametrize("workers", [1, 3])
+def test_extract_update_writes_only_changed(tmp_path: Path, fmt: str, workers: int):
+    files, sub = _prep_content(tmp_path)
+    arc = Archive.create_from(tmp_path / f"arch.{fmt}", fmt, [tmp_path / n for n, _ in files] + [sub])
+    out = tmp_path / "out"
+    arc.extract(path=out, workers=workers)
+    arc.extract(path=out, mode="update")  # для zip первый extract не восстановил время - update выравнивает его
+
+    # размер и время совпадают - файл не трогается, даже если содержимое другое
+    same = out / "a.txt"
+    st = same.stat()
+    same.write_text("Z", encoding="utf-8")
+    os.utime(same, ns=(st.st_atime_ns, st.st_mtime_ns))
+    # другой размер - перезаписывается
+    (out / "sub" / "b.txt").write_text("changed", encoding="utf-8")
+    # удалённый файл восстанавливается
+    (out / "sub" / "nested" / "deep.txt").unlink()
+
+    arc.extract(path=out, mode="update", workers=workers)
+    assert same.read_text(encoding="utf-8") == "Z"
+    assert (out / "sub" / "b.txt").read_text(encoding="utf-8") == "B"
+    assert (out / "sub" / "nested" / "deep.txt").read_text(encoding="utf-8") == "deep content"
+    for n, c in files[1:]:
+        assert (out / n).read_text(encoding="utf-8") == c
+
+
+@pytest.mark.parametrize("fmt", ["zip", "7z"])
+def test_extract_update_uses_crc_when_only_mtime_differs(tmp_path: Path, fmt: str):
+    files, sub = _prep_content(tmp_path)
+    arc = Archive.create_from(tmp_path / f"arch.{fmt}", fmt, [tmp_path / n for n, _ in files])
+    out = tmp_path / "out"
+    arc.extract(path=out, mode="update")
+    entry = next(e for e in arc.index() if e.name == "a.txt")
+    target = out / "a.txt"
+
+    # то же содержимое с новым временем: по CRC файл признаётся актуальным, ему возвращается время элемента
+    os.utime(target, (entry.mtime + 3600, entry.mtime + 3600))
+    arc.extract(path=out, mode="update")
+    assert abs(target.stat().st_mtime - entry.mtime) < 1
+
+    # время снова сдвинуто, а содержимое другое того же размера - перезаписывается
+    target.write_text("Q", encoding="utf-8")
+    os.utime(target, (entry.mtime + 3600, entry.mtime + 3600))
+    arc.extract(path=out, mode="update")
+    assert target.read_text(encoding="utf-8") == "A"
+
+
+@pytest.mark.parametrize("fmt", ["zip", "tar.gz"])
+def test_extract_update_delete_extra(tmp_path: Path, fmt: str):
+    files, sub = _prep_content(tmp_path)
+    arc = Archive.create_from(tmp_path / f"arch.{fmt}", fmt, [tmp_path / n for n, _ in files] + [sub])
+    out = tmp_path / "out"
+    arc.extract(path=out)
+    (out / "stale.txt").write_text("old", encoding="utf-8")
+    (out / "sub" / "gone").mkdir()
+    (out / "sub" / "gone" / "x.txt").write_text("x", encoding="utf-8")
+
+    arc.extract(path=out, mode="update")
+    assert (out / "stale.txt").exists() and (out / "sub" / "gone" / "x.txt").exists()
+
+    # при member удаление не выходит за его пределы
+    arc.extract("sub", path=out, mode="update", delete=True)
+    assert (out / "stale.txt").exists() and not (out / "sub" / "gone").exists()
+
+    arc.extract(path=out, mode="update", delete=True)
+    assert not (out / "stale.txt").exists()
+    assert (out / "sub" / "nested" / "deep.txt").read_text(encoding="utf-8") == "deep content"
+    assert sorted(p.name for p in out.iterdir()) == sorted([n for n, _ in files] + ["sub"])
+
+
+def test_extract_unknown_mode(tmp_path: Path):
+    src = tmp_path / "a.txt"
+    src.write_text("A", encoding="utf-8")
+    arc = Archive.create_from(tmp_path / "a.zip", "zip", [src])
+    with pytest.raises(ValueError):
+        arc.extract(path=tmp_path / "out", mode="merge")
+
+
+class _PipeLike:
+    """Приёмник без tell/seek - как канал или сокет."""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.writes = []
+
+    def write(self, data):
+        self.data += data
+        self.writes.append(len(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+@pytest.mark.parametrize("fmt", ["zip", "tar", "tar.gz", "tar.bz2", "tar.xz", "tar.zst", "tar.lz4"])
+def test_stream_archive_to_unseekable_sink(tmp_path: Path, fmt: str):
+    if not _codec_available(fmt):
+        pytest.skip(f"{fmt} codec is not installed")
+    files, sub = _prep_content(tmp_path)
+    (sub / "empty").mkdir()
+    sink = _PipeLike()
+    stream_archive([tmp_path / n for n, _ in files] + [sub], fmt, sink, level=1)
+    out = tmp_path / f"streamed.{fmt}"
+    out.write_bytes(bytes(sink.data))
+
+    arc = Archive(out)
+    assert arc.verify().ok
+    names = {name.rstrip("/") for name in arc}
+    assert {"sub/empty", "sub/nested/deep.txt"} | {n for n, _ in files} <= names
+    arc.extract(path=tmp_path / "out")
+    for n, c in files:
+        assert (tmp_path / "out" / n).read_text(encoding="utf-8") == c
+    assert (tmp_path / "out" / "sub" / "nested" / "deep.txt").read_text(encoding="utf-8") == "deep content"
+
+
+def test_stream_archive_through_os_pipe(tmp_path: Path):
+    import threading
+    import tarfile
+    src = tmp_path / "big.bin"
+    src.write_bytes(os.urandom(3 << 20))
+    r, w = os.pipe()
+    received = bytearray()
+
+    def reader():
+        with os.fdopen(r, "rb") as f:
+            while chunk := f.read(65536):
+                received.extend(chunk)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    with os.fdopen(w, "wb") as f:
+        stream_archive([src], "tar.gz", f)
+    thread.join()
+    import io
+    with tarfile.open(fileobj=io.BytesIO(bytes(received)), mode="r:gz") as tf:
+        assert tf.extractfile("big.bin").read() == src.read_bytes()
+
+
+@pytest.mark.parametrize("fmt", ["zip", "tar.gz"])
+def test_stream_archive_chunks_bounded(tmp_path: Path, fmt: str):
+    from unishell._internal.stream import CHUNK_SIZE
+    src = tmp_path / "big.bin"
+    src.write_bytes(os.urandom(4 * CHUNK_SIZE + 123))
+    chunks = list(stream_archive_chunks([src], fmt, level=1))
+    # архив отдаётся по ходу чтения, а не одним куском в конце
+    assert len(chunks) > 3
+    assert max(map(len, chunks)) < 2 * CHUNK_SIZE
+    out = tmp_path / f"out.{fmt}"
+    out.write_bytes(b"".join(chunks))
+    with Archive(out).open("big.bin") as f:
+        assert f.read() == src.read_bytes()
+
+
+def test_stream_archive_single_codec(tmp_path: Path):
+    src = tmp_path / "data.txt"
+    src.write_bytes(b"line\n" * 10000)
+    data = b"".join(stream_archive_chunks([src], "gz"))
+    assert gzip.decompress(data) == src.read_bytes()
+    with pytest.raises(ValueError):
+        list(stream_archive_chunks([src, src], "gz"))
+
+
+def test_stream_archive_errors(tmp_path: Path):
+    src = tmp_path / "a.txt"
+    src.write_text("A", encoding="utf-8")
+    sink = _PipeLike()
+    with pytest.raises(FileNotFoundError):
+        stream_archive([src, tmp_path / "missing"], "tar", sink)
+    assert not sink.data  # проверка до первого байта
+    with pytest.raises(NotImplementedError):
+        stream_archive([src], "7z", sink)
+    with pytest.raises(ValueError):
+        stream_archive([src], "zip", sink, compression="brotli")
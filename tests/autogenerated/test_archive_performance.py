@@ -365,3 +365,144 @@ def test_archive_format_comparison(tmp_path: Path):
         else:
             assert data["creation_time"] < 15, f"{fmt} слишком медленный: {data['creation_time']:.2f}с"
     assert all(data["extraction_time"] < 10 for data in results.values())
+
+
+# Число файлов для бенчмарка масштабирования (UNISHELL_BENCH_FILES=10000 для полного прогона)
+BENCH_FILES = int(os.environ.get("UNISHELL_BENCH_FILES", "2000"))
+
+
+@pytest.mark.parametrize("fmt", ["zip", "7z", "tar", "tar.gz", "tar.bz2"])
+def test_archive_add_many_scales_linearly(tmp_path: Path, fmt: str):
+    """add_many открывает архив один раз: время растет линейно с числом файлов"""
+    src = tmp_path / "src"
+    src.mkdir()
+    files = []
+    for i in range(BENCH_FILES):
+        file_path = src / f"bulk_{i:05d}.txt"
+        file_path.write_text(f"Bulk content {i}", encoding="utf-8")
+        files.append(file_path)
+
+    timings = {}
+    for count in (BENCH_FILES // 4, BENCH_FILES):
+        arc_path = tmp_path / f"bulk_{count}.{fmt}"
+        arc = Archive(arc_path, fmt)
+        start_time = time.perf_counter()
+        with arc.writer() as w:
+            for file_path in files[:count]:
+                w.add(file_path)
+        timings[count] = time.perf_counter() - start_time
+        assert len(arc.list_files()) == count
+
+    small, large = timings[BENCH_FILES // 4], timings[BENCH_FILES]
+    print(f"add_many {fmt}: {BENCH_FILES // 4} файлов {small:.2f}с, {BENCH_FILES} файлов {large:.2f}с")
+    # линейный рост дает ~4x, квадратичный ~16x
+    assert large < small * 8 + 0.5
+
+
+def test_archive_add_many_into_existing(tmp_path: Path):
+    """add_many дописывает в существующий архив и уважает arcnames"""
+    for i in range(3):
+        (tmp_path / f"f{i}.txt").write_text(str(i), encoding="utf-8")
+    for fmt in ["zip", "7z", "tar", "tar.gz", "tar.bz2"]:
+        arc = Archive(tmp_path / f"existing.{fmt}", fmt)
+        arc.add(tmp_path / "f0.txt")
+        arc.add_many([tmp_path / "f1.txt", tmp_path / "f2.txt"], arcnames=["one.txt", None])
+        assert set(arc.list_files()) == {"f0.txt", "one.txt", "f2.txt"}
+        with pytest.raises(ValueError):
+            arc.add_many([tmp_path / "f1.txt"], arcnames=[])
+
+
+def test_archive_parallel_extract_benchmark(tmp_path: Path):
+    """extract(workers=N) на архиве из BENCH_FILES элементов дает то же дерево, что и последовательный"""
+    src = tmp_path / "src"
+    for i in range(BENCH_FILES):
+        file_path = src / f"dir_{i % 50:02d}" / f"member_{i:05d}.txt"
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_bytes(f"Member {i} ".encode() * 200 + os.urandom(1024))
+    arc = Archive.create_from(tmp_path / "bench.zip", "zip", [src])
+
+    timings = {}
+    for workers in (1, None):
+        out = tmp_path / f"out_{workers}"
+        start_time = time.perf_counter()
+        arc.extract(path=out, workers=workers)
+        timings[workers] = time.perf_counter() - start_time
+        assert sum(1 for p in out.rglob("*") if p.is_file()) == BENCH_FILES
+
+    print(f"extract {BENCH_FILES} элементов: 1 поток {timings[1]:.2f}с, {os.cpu_count()} потоков {timings[None]:.2f}с")
+    # на одном ядре выигрыша может не быть, но и заметного проигрыша - тоже
+    assert timings[None] < timings[1] * 2 + 0.5
+
+
+# Объём «типичных» данных для матрицы кодеков в МБ (UNISHELL_BENCH_MB=64 для полного прогона)
+BENCH_MB = float(os.environ.get("UNISHELL_BENCH_MB", "2"))
+
+# (формат, уровень, метод zip, long_window)
+CODEC_MATRIX = [
+    ("zip", None, "deflate", False),
+    ("zip", None, "zstd", False),
+    ("zip", None, "lzma", False),
+    ("tar.gz", 1, None, False),
+    ("tar.gz", 6, None, False),
+    ("tar.bz2", 9, None, False),
+    ("tar.xz", 1, None, False),
+    ("tar.xz", 6, None, False),
+    ("tar.zst", 1, None, False),
+    ("tar.zst", 3, None, False),
+    ("tar.zst", 19, None, True),
+    ("tar.lz4", 0, None, False),
+]
+
+
+def _typical_payload(root: Path, total: int) -> None:
+    """Логи, JSON, исходники и уже сжатые данные - в равных долях."""
+    import json
+    root.mkdir()
+    part = max(total // 4, 1)
+    lines = []
+    for i in range(part // 90 + 1):
+        lines.append(f"2024-05-{i % 28 + 1:02d} 12:{i % 60:02d}:{i % 59:02d} INFO worker-{i % 8} request id={i} took {i % 997}ms")
+    (root / "service.log").write_text("\n".join(lines), encoding="utf-8")
+    records = [{"id": i, "name": f"user{i}", "tags": ["a", "b", str(i % 13)], "score": i * 0.37} for i in range(part // 70 + 1)]
+    (root / "data.json").write_text(json.dumps(records, indent=1), encoding="utf-8")
+    source = Path(__file__).read_text(encoding="utf-8")
+    (root / "src.py").write_text(source * (part // len(source) + 1), encoding="utf-8")
+    (root / "blob.bin").write_bytes(os.urandom(part))
+
+
+def test_archive_codec_matrix_benchmark(tmp_path: Path):
+    """Матрица кодеков: степень сжатия и скорость упаковки/распаковки на типичных данных"""
+    src = tmp_path / "payload"
+    _typical_payload(src, int(BENCH_MB * (1 << 20)))
+    original_size = sum(p.stat().st_size for p in src.iterdir())
+    mb = original_size / (1 << 20)
+
+    rows = []
+    for fmt, level, compression, long_window in CODEC_MATRIX:
+        arc_path = tmp_path / f"matrix_{len(rows)}.{fmt}"
+        start_time = time.perf_counter()
+        try:
+            arc = Archive.create_from(arc_path, fmt, [src], level=level, long_window=long_window,
+                                      compression=compression if fmt == "zip" else None)
+        except ImportError as e:
+            print(f"{fmt}: пропущен ({e})")
+            continue
+        pack_time = time.perf_counter() - start_time
+
+        out = tmp_path / f"out_{len(rows)}"
+        start_time = time.perf_counter()
+        arc.extract(path=out)
+        unpack_time = time.perf_counter() - start_time
+        assert (out / "payload" / "data.json").read_bytes() == (src / "data.json").read_bytes()
+
+        ratio = original_size / arc_path.stat().st_size
+        name = fmt + (f"/{compression}" if compression else "") + (f" -{level}" if level is not None else "") + (" long" if long_window else "")
+        rows.append((name, ratio, mb / max(pack_time, 1e-6), mb / max(unpack_time, 1e-6)))
+
+    print(f"\nМатрица кодеков на {mb:.1f} МБ данных:")
+    print(f"{'Формат':22} | {'Сжатие':>7} | {'Упаковка':>11} | {'Распаковка':>11}")
+    print("-" * 62)
+    for name, ratio, pack_speed, unpack_speed in rows:
+        print(f"{name:22} | {ratio:6.2f}x | {pack_speed:7.1f} МБ/с | {unpack_speed:7.1f} МБ/с")
+    # четверть данных - случайные байты, так что больше ~4x не ждём, но сжимать должен каждый кодек
+    assert all(ratio > 1.1 for _, ratio, _, _ in rows)
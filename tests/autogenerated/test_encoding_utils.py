@@ -47,3 +47,79 @@ def test_determine_minimal_encoding(content: str, expected: str):
         assert enc == expected
 
 
+
+
+def test_detect_encoding_cache_hits_and_persistence(tmp_path: Path):
+    from unishell import encoding_cache
+
+    encoding_cache.clear()
+    p = tmp_path / "cached.txt"
+    p.write_text("Привет, мир! " * 50, encoding="utf-8")
+
+    first = detect_encoding(p)
+    assert detect_encoding(p) == first
+    assert encoding_cache.stats()["hits"] == 1
+    assert encoding_cache.stats()["misses"] == 1
+
+    store = tmp_path / "enc-cache.json"
+    encoding_cache.save(store)
+    encoding_cache.clear()
+    encoding_cache.load(store)
+    assert detect_encoding(p) == first
+    assert encoding_cache.stats()["hits"] == 1
+
+    # изменение файла меняет ключ (размер/mtime) - повторное определение
+    p.write_bytes(b"\xEF\xBB\xBFnew content")
+    assert detect_encoding(p) == "utf-8-sig"
+    assert encoding_cache.stats()["misses"] == 1
+
+
+@pytest.mark.parametrize(
+    "data,expected",
+    [
+        (b"\xEF\xBB\xBFhello", ("utf-8-sig", "bom")),
+        (b"plain ascii", ("ascii", "ascii")),
+        ("Привет, 日本".encode("utf-8"), ("utf-8", "utf-8")),
+        ("Содержимое на русском".encode("cp1251"), ("cp1251", "cp1251")),
+    ],
+)
+def test_sniff_encoding_tiers(data: bytes, expected):
+    from unishell import sniff_encoding
+
+    assert sniff_encoding(data) == expected
+
+
+def test_sniff_encoding_truncated_utf8_and_custom_backend():
+    from unishell import sniff_encoding
+
+    sample = "Привет".encode("utf-8")[:-1]
+    assert sniff_encoding(sample, complete=False) == ("utf-8", "utf-8")
+    # latin-1 текст не похож на кириллицу - решает бэкенд
+    assert sniff_encoding("café déjà".encode("latin-1"), backend=lambda raw: "latin-1") == ("latin-1", "custom")
+
+
+def test_minimal_encoding_streaming():
+    from unishell._internal.encoding_utils import MinimalEncoding
+
+    detector = MinimalEncoding()
+    assert detector.feed("plain ") == "ascii"
+    assert detector.feed("Привет ") == "cp1251"
+    assert detector.feed("ещё ascii") == "cp1251"
+    assert detector.feed("日本") == "utf-8"
+    assert detector.feed("abc") == "utf-8"
+    assert determine_minimal_encoding("ё№") == "cp1251"
+    assert determine_minimal_encoding("\x98") == "utf-8"
+
+
+def test_tier_stats_counts_from_threads():
+    import threading
+    from unishell import sniff_encoding
+    from unishell._internal.encoding_utils import tier_stats
+
+    before = tier_stats["ascii"]
+    threads = [threading.Thread(target=lambda: [sniff_encoding(b"plain") for _ in range(2000)]) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert tier_stats["ascii"] - before == 16000
@@ -1,6 +1,7 @@
 import os
 import platform
 import stat
+import sys
 from pathlib import Path
 
 import pytest
@@ -91,3 +92,74 @@ def test_ls_details(tmp_path: Path):
     assert "a.txt" in details
 
 
+
+
+@pytest.mark.parametrize("kernel", [True, False])
+def test_copy_content_rewrite_and_append(tmp_path: Path, monkeypatch, kernel: bool):
+    from unishell._internal import file_utils
+
+    if not kernel:
+        monkeypatch.delattr(file_utils.os, "copy_file_range", raising=False)
+        monkeypatch.delattr(file_utils.os, "sendfile", raising=False)
+    src = tmp_path / "src.csv"
+    dst = tmp_path / "dst.csv"
+    src.write_bytes(b"a,b\n1,2\n" * 1000)
+    dst.write_bytes(b"old content that is longer than nothing")
+
+    file_utils.copy_content(src, dst)
+    assert dst.read_bytes() == src.read_bytes()
+
+    file_utils.copy_content(src, dst, append=True)
+    assert dst.read_bytes() == src.read_bytes() * 2
+
+
+def test_make_archive_gztar_uses_parallel_gzip(tmp_path: Path):
+    import tarfile
+    src_dir = tmp_path / "data"
+    fu.mkdir(src_dir)
+    (src_dir / "f.txt").write_text("hi" * 100000)
+    fu.make_archive(src_dir, tmp_path / "data", format="gztar")
+    with tarfile.open(tmp_path / "data.tar.gz") as tf:
+        assert set(tf.getnames()) == {"data", "data/f.txt"}
+        assert tf.extractfile("data/f.txt").read() == b"hi" * 100000
+
+
+@pytest.mark.parametrize("fmt,suffix", [("xztar", ".tar.xz"), ("zstdtar", ".tar.zst"), ("bztar", ".tar.bz2")])
+def test_make_archive_codecs_with_level(tmp_path: Path, fmt: str, suffix: str):
+    if fmt == "zstdtar":
+        pytest.importorskip("backports.zstd" if sys.version_info < (3, 14) else "compression.zstd")
+    src_dir = tmp_path / "data"
+    fu.mkdir(src_dir)
+    (src_dir / "f.txt").write_text("hi" * 100000)
+    fu.make_archive(src_dir, tmp_path / "data", format=fmt, level=1, threads=2)
+    assert (tmp_path / f"data{suffix}").exists()
+    out = tmp_path / "out"
+    fu.extract_archive(tmp_path / f"data{suffix}", out)
+    assert (out / "data" / "f.txt").read_text() == "hi" * 100000
+
+
+def test_make_archive_zip_level(tmp_path: Path):
+    import zipfile
+    src_dir = tmp_path / "data"
+    fu.mkdir(src_dir)
+    fu.mkdir(src_dir / "sub")
+    (src_dir / "sub" / "f.txt").write_text("hi" * 100000)
+    fu.make_archive(src_dir, tmp_path / "fast", format="zip", level=1)
+    fu.make_archive(src_dir, tmp_path / "default", format="zip")
+    with zipfile.ZipFile(tmp_path / "fast.zip") as fast, zipfile.ZipFile(tmp_path / "default.zip") as default:
+        assert fast.namelist() == default.namelist()
+        assert fast.read("data/sub/f.txt") == b"hi" * 100000
+
+
+def test_extract_archive_update_mode(tmp_path: Path):
+    src_dir = tmp_path / "site"
+    fu.mkdir(src_dir)
+    (src_dir / "index.html").write_text("<html/>")
+    fu.make_archive(src_dir, tmp_path / "site", format="gztar")
+    out = tmp_path / "out"
+    fu.extract_archive(tmp_path / "site.tar.gz", out, format="gztar", mode="update")
+    (out / "site" / "index.html").write_text("edited")
+    (out / "site" / "old.html").write_text("old")
+    fu.extract_archive(tmp_path / "site.tar.gz", out, mode="update", delete=True)
+    assert (out / "site" / "index.html").read_text() == "<html/>"
+    assert not (out / "site" / "old.html").exists()
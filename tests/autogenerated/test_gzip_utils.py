@@ -0,0 +1,87 @@
+import os
+import gzip
+import io
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from unishell._internal.gzip_utils import ParallelGzipWriter, WINDOW_SIZE
+
+
+DATA = (b"repeated text block " * 5000 + os.urandom(50000)) * 6
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+@pytest.mark.parametrize("block_size", [WINDOW_SIZE, 100_000, 1 << 20])
+def test_parallel_gzip_roundtrip(tmp_path: Path, workers: int, block_size: int):
+    target = tmp_path / "data.bin.gz"
+    with ParallelGzipWriter(target, workers=workers, block_size=block_size) as gz:
+        for i in range(0, len(DATA), 33333):
+            gz.write(DATA[i:i + 33333])
+    assert gzip.decompress(target.read_bytes()) == DATA
+    with gzip.open(target) as f:
+        f.read()
+        assert f.name == str(target)
+    # словарь из предыдущего блока: степень сжатия почти как у однопоточного gzip
+    assert target.stat().st_size < len(gzip.compress(DATA)) * 1.05
+
+
+def test_parallel_gzip_header_and_fileobj(tmp_path: Path):
+    buf = io.BytesIO()
+    with ParallelGzipWriter(buf, filename="report.txt", mtime=1_000_000, workers=2) as gz:
+        gz.write(b"")
+    raw = buf.getvalue()
+    assert raw[:3] == b"\x1f\x8b\x08"
+    assert raw[10:21] == b"report.txt\x00"
+    assert gzip.decompress(raw) == b""
+    assert not buf.closed
+    with pytest.raises(ValueError):
+        ParallelGzipWriter(io.BytesIO(), block_size=1024)
+
+
+@pytest.mark.skipif(shutil.which("gzip") is None, reason="нет утилиты gzip")
+def test_parallel_gzip_accepted_by_gzip_tool(tmp_path: Path):
+    target = tmp_path / "data.gz"
+    with ParallelGzipWriter(target, workers=3, block_size=WINDOW_SIZE) as gz:
+        gz.write(DATA)
+    assert subprocess.run(["gzip", "-t", str(target)]).returncode == 0
+
+
+def _gzip_variants(tmp_path: Path):
+    pigz = tmp_path / "pigz.gz"
+    with ParallelGzipWriter(pigz, workers=2, block_size=WINDOW_SIZE) as gz:
+        gz.write(DATA)
+    members = tmp_path / "members.gz"
+    half = len(DATA) // 2
+    members.write_bytes(gzip.compress(DATA[:half]) + gzip.compress(DATA[half:]) + b"\0" * 4)
+    plain = tmp_path / "plain.gz"
+    plain.write_bytes(gzip.compress(DATA))
+    return {"pigz": pigz, "members": members, "plain": plain}
+
+
+@pytest.mark.parametrize("kind", ["pigz", "members", "plain"])
+def test_gzip_seek_index_random_reads(tmp_path: Path, kind: str):
+    from unishell._internal.gzip_utils import GzipIndex, GzipIndexBuilder, GzipSeekReader
+    path = _gzip_variants(tmp_path)[kind]
+    with open(path, "rb") as raw:
+        builder = GzipIndexBuilder(raw, span=64 << 10)
+        assert builder.read(1000) == DATA[:1000]
+        builder.seek(200_000)
+        assert builder.read(10) == DATA[200_000:200_010]
+        index = builder.finish()
+    assert index.size == len(DATA)
+    # точки есть только там, где поток выровнен по байту
+    assert len(index.points) > {"pigz": 3, "members": 1, "plain": 0}[kind]
+
+    index.save(tmp_path / "x.gzi", 1, 2)
+    loaded = GzipIndex.load(tmp_path / "x.gzi", 1, 2)
+    assert loaded.points == index.points and GzipIndex.load(tmp_path / "x.gzi", 1, 3) is None
+
+    with GzipSeekReader(path, loaded) as reader:
+        for offset in (len(DATA) - 5, 0, 123_456, len(DATA) // 2 - 3, 400_000):
+            reader.seek(offset)
+            assert reader.read(7000) == DATA[offset:offset + 7000]
+        reader.seek(-10, os.SEEK_END)
+        assert reader.read() == DATA[-10:]
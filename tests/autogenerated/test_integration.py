@@ -2,6 +2,7 @@ import sys
 import os
 import tempfile
 import shutil
+import subprocess
 from pathlib import Path
 
 import pytest
@@ -389,3 +390,86 @@ def test_complex_nested_structure(tmp_path: Path):
             extracted_file = extract_dir / "complex" / path_str
             assert extracted_file.exists()
             assert extracted_file.read_text(encoding="utf-8") == content
+
+
+def test_to_abspath_cache_invalidation(tmp_path: Path):
+    """Кэш to_abspath сбрасывается при cd и изменении параметров"""
+    from unishell import UniShell
+    from unishell._internal.ViewPort import ViewPort
+
+    shell = UniShell(current_dir=tmp_path, parms=ViewPort())
+    first = shell.to_abspath("data/file.txt")
+    assert first == tmp_path / "data" / "file.txt"
+    assert shell.to_abspath("data/file.txt") is first
+
+    shell.parms.set_("DATA", str(tmp_path / "one"))
+    assert shell.to_abspath("%DATA%/x.txt") == tmp_path / "one" / "x.txt"
+    shell.parms.set_("DATA", str(tmp_path / "two"))
+    assert shell.to_abspath("%DATA%/x.txt") == tmp_path / "two" / "x.txt"
+
+    (tmp_path / "sub").mkdir()
+    shell.cd("sub")
+    assert shell.to_abspath("data/file.txt") == tmp_path / "sub" / "data" / "file.txt"
+
+    shell.abspath_cache_size = 2
+    for name in ("a", "b", "c"):
+        shell.to_abspath(name)
+    assert len(shell._abspath_cache) == 2
+
+
+def test_viewport_all_is_lazy_and_links_are_memoised():
+    """ViewPort.all() не вычисляет связанные параметры до чтения ключа"""
+    from unishell._internal.ViewPort import ViewPort
+
+    calls = []
+    state = {"dep": 1}
+    vp = ViewPort()
+    vp.set_("LAZY", lambda: calls.append(1) or "value", link=True)
+    vp.set_("MEMO", lambda: calls.append(2) or state["dep"] * 10, link=True, depends=lambda: state["dep"])
+
+    view = vp.all()
+    assert "LAZY" in view and "MEMO" in view
+    assert calls == []
+    assert view["LAZY"] == "value"
+    assert calls == [1]
+
+    assert vp["MEMO"] == 10
+    assert vp["MEMO"] == 10
+    assert calls == [1, 2]
+    state["dep"] = 2
+    assert vp["MEMO"] == 20
+    assert calls == [1, 2, 2]
+    assert dict(view)["LAZY"] == "value"
+
+    snapshot = view.copy()
+    assert type(snapshot) is dict and snapshot["MEMO"] == 20
+    assert "'LAZY': 'value'" in repr(view)
+
+
+
+IMPORT_BUDGET_MS = float(os.environ.get("UNISHELL_IMPORT_BUDGET_MS", "150"))
+
+
+def _import_env() -> dict:
+    return dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in sys.path if p))
+
+
+def test_import_does_not_load_backends():
+    """import unishell не загружает архивные бэкенды и chardet"""
+    probe = "import sys, unishell; print(','.join(m for m in ('py7zr', 'rarfile', 'chardet', 'pyzipper') if m in sys.modules))"
+    loaded = subprocess.run([sys.executable, "-c", probe], env=_import_env(), capture_output=True, text=True, check=True)
+    assert loaded.stdout.strip() == ""
+
+
+@pytest.mark.performance
+def test_import_startup_budget():
+    """import unishell укладывается в бюджет по времени (зависит от машины: -m "not performance" на медленном CI)"""
+    env = _import_env()
+    timings = []
+    for _ in range(3):  # первый запуск может компилировать .pyc
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import unishell"],
+                                env=env, capture_output=True, text=True, check=True)
+        last = [line for line in result.stderr.splitlines() if line.rstrip().endswith("| unishell")][-1]
+        timings.append(int(last.split("|")[1]) / 1000)
+    print(f"import unishell: {min(timings):.1f} ms (бюджет {IMPORT_BUDGET_MS} ms)")
+    assert min(timings) < IMPORT_BUDGET_MS
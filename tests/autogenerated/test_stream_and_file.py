@@ -3,6 +3,8 @@ import os
 import platform
 from pathlib import Path
 
+import pytest
+
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from unishell._internal.stream import Stream
@@ -65,3 +67,243 @@ def test_file_hidden_flag_unix_like(tmp_path: Path):
         assert isinstance(f.metadata()["hidden"], bool)
 
 
+
+
+def test_file_append_keeps_encoding_and_escalates(tmp_path: Path):
+    p = tmp_path / "log.txt"
+    f = File(p)
+    f << "start"
+    assert f.encoding == "ascii"
+
+    f << " Привет"
+    assert f.encoding == "cp1251"
+    assert p.read_bytes() == "start Привет".encode("cp1251")
+
+    f << " 日本"
+    assert f.encoding == "utf-8"
+    assert p.read_text(encoding="utf-8") == "start Привет 日本"
+
+
+def test_file_append_utf8_sig_does_not_repeat_bom(tmp_path: Path):
+    p = tmp_path / "bom.txt"
+    p.write_bytes("первый".encode("utf-8-sig"))
+    f = File(p, encoding="utf-8-sig")
+    f << " второй"
+    assert p.read_bytes().count(b"\xEF\xBB\xBF") == 1
+    assert f.content == "первый второй"
+
+
+def test_file_append_checks_real_encoding(tmp_path: Path):
+    p = tmp_path / "legacy.txt"
+    p.write_bytes("старый текст\n".encode("cp1251") * 1000)
+    f = File(p, encoding="utf-8")  # кодировка указана неверно
+    f << "новая строка"
+    assert f.encoding == "cp1251"
+    assert p.read_bytes().decode("cp1251").endswith("старый текст\nновая строка")
+
+
+def test_file_append_to_empty_writes_bytes(tmp_path: Path):
+    p = tmp_path / "new.txt"
+    f = File(p)
+    f << "a\r\nb\n"
+    # как и при дописывании в непустой файл, концы строк не переводятся (на Windows тоже)
+    assert p.read_bytes() == b"a\r\nb\n"
+    assert f.encoding == "ascii"
+
+
+def test_file_appender_batches_writes(tmp_path: Path):
+    p = tmp_path / "batch.txt"
+    f = File(p)
+    f.content = "head\n"
+    with f.appender(buffer_size=1024) as app:
+        for i in range(100):
+            app << f"line {i}\n"
+        assert f.content == "head\n"
+    lines = f.content.splitlines()
+    assert lines[0] == "head"
+    assert lines[-1] == "line 99"
+    assert len(lines) == 101
+
+
+def test_stream_chunked_copy(tmp_path: Path, monkeypatch):
+    from unishell._internal.structures import file as file_mod
+
+    monkeypatch.setattr(file_mod, "CHUNK_SIZE", 7)
+    src = File(tmp_path / "src.txt")
+    src.content = "ascii head " * 5 + "и кириллица в конце"
+    dst = File(tmp_path / "dst.txt")
+    dst.content = "old"
+
+    chunks = list(src.__stream_iter__())
+    assert all(len(c) <= 7 for c in chunks)
+
+    src > dst
+    assert dst.content == src.content
+    assert dst.encoding == "cp1251"
+
+    src >> dst
+    assert dst.content == src.content * 2
+
+
+def test_stream_append_rolls_back_after_recode(tmp_path: Path):
+    p = tmp_path / "target.txt"
+    p.write_bytes("исходное\r\n".encode("cp1251"))
+    f = File(p, encoding="cp1251")
+
+    def chunks():
+        yield "кириллица "
+        yield "日本 "  # перекодирует файл в utf-8
+        yield "ещё"
+        raise UnicodeDecodeError("utf-8", b"\xff", 0, 1, "bad source")
+
+    with pytest.raises(UnicodeDecodeError):
+        f.__stream_append_iter__(chunks())
+    assert f.encoding == "utf-8"
+    assert p.read_bytes() == "исходное\r\n".encode("utf-8")
+
+
+def test_stream_files_chunked_into_file(tmp_path: Path):
+    from unishell import Files
+
+    a = tmp_path / "a.txt"
+    b = tmp_path / "b.txt"
+    a.write_text("first", encoding="utf-8")
+    b.write_text("second", encoding="utf-8")
+    out = File(tmp_path / "out.txt")
+    Files(a, b) > out
+    assert out.content == "first\nsecond"
+
+
+def test_stream_falls_back_on_wrong_source_encoding(tmp_path: Path):
+    p = tmp_path / "cp.txt"
+    p.write_bytes("Содержимое на русском языке".encode("utf-8"))
+    src = File(p, encoding="ascii")
+    dst = File(tmp_path / "dst.txt")
+    dst.content = "keep"
+    src > dst
+    assert dst.content == "Содержимое на русском языке"
+
+
+def test_stream_same_encoding_copies_bytes(tmp_path: Path):
+    a = tmp_path / "a.csv"
+    b = tmp_path / "b.csv"
+    a.write_bytes("id;имя\r\n1;Иван\r\n".encode("cp1251"))
+    b.write_bytes("0;Пётр\r\n".encode("cp1251"))
+    src = File(a, encoding="cp1251")
+    dst = File(b, encoding="cp1251")
+
+    src >> dst
+    assert b.read_bytes() == "0;Пётр\r\n".encode("cp1251") + a.read_bytes()
+
+    src > dst
+    assert b.read_bytes() == a.read_bytes()
+    assert dst.encoding == "cp1251"
+
+    src > src
+    assert a.read_bytes() == b.read_bytes()
+
+
+def test_stream_transfer_checks_real_encodings(tmp_path: Path):
+    a = tmp_path / "a.txt"
+    b = tmp_path / "b.txt"
+    a.write_bytes("новое\n".encode("utf-8"))
+    b.write_bytes("старое\n".encode("cp1251"))
+    # обе стороны заявлены как utf-8 (по умолчанию), но приёмник на деле в cp1251
+    File(a, encoding="utf-8") >> File(b, encoding="utf-8")
+    assert b.read_bytes() == "старое\nновое\n".encode("cp1251")
+
+    # источник заявлен как utf-8, а на деле cp1251: его байты не попадают в utf-8 приёмник как есть,
+    # текст перекодируется после определения настоящей кодировки
+    c = tmp_path / "c.txt"
+    d = tmp_path / "d.txt"
+    c.write_bytes("ещё\n".encode("cp1251"))
+    d.write_bytes("текст\n".encode("utf-8"))
+    File(c, encoding="utf-8") >> File(d, encoding="utf-8")
+    assert d.read_bytes() == "текст\nещё\n".encode("utf-8")
+
+
+def _link_or_skip(make, *args):
+    try:
+        make(*args)
+    except (OSError, NotImplementedError) as e:
+        pytest.skip(f"ссылки недоступны: {e}")
+
+
+def test_stream_rewrite_keeps_symlinks_and_hardlinks(tmp_path: Path):
+    src = tmp_path / "s.txt"
+    src.write_bytes("новое\n".encode("cp1251"))
+    real = tmp_path / "real.txt"
+    real.write_bytes(b"old\n")
+    link = tmp_path / "link.txt"
+    _link_or_skip(os.symlink, real, link)
+
+    File(src, encoding="cp1251") > File(link)
+    assert link.is_symlink()
+    assert real.read_bytes() == "новое\n".encode("cp1251")
+
+    h1, h2 = tmp_path / "h1.txt", tmp_path / "h2.txt"
+    h1.write_bytes(b"old\n")
+    _link_or_skip(os.link, h1, h2)
+    File(src, encoding="cp1251") > File(h1)
+    assert h1.stat().st_nlink == 2
+    assert h2.read_bytes() == "новое\n".encode("cp1251")
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["h1.txt", "h2.txt", "link.txt", "real.txt", "s.txt"]
+
+
+def test_file_recode_streaming(tmp_path: Path, monkeypatch):
+    from unishell._internal.structures import file as file_mod
+
+    monkeypatch.setattr(file_mod, "CHUNK_SIZE", 5)
+    p = tmp_path / "legacy.csv"
+    text = "id;name\r\n1;Иван\r\n2;Пётр\r\n"
+    p.write_bytes(text.encode("cp1251"))
+    f = File(p, encoding="cp1251")
+
+    f.recode(to_encoding="utf-8")
+    assert f.encoding == "utf-8"
+    assert p.read_bytes() == text.encode("utf-8")
+
+    # минимальная кодировка определяется в том же проходе
+    f.recode()
+    assert f.encoding == "cp1251"
+    assert p.read_bytes() == text.encode("cp1251")
+    assert [q.name for q in tmp_path.iterdir()] == ["legacy.csv"]
+
+    # перекодировка через символическую ссылку меняет сам файл, ссылка остаётся ссылкой
+    link = tmp_path / "link.csv"
+    _link_or_skip(os.symlink, p, link)
+    File(link, encoding="cp1251").recode(to_encoding="utf-16")
+    assert link.is_symlink()
+    assert p.read_bytes() == text.encode("utf-16")
+
+    # жёсткие ссылки не разрываются
+    hard = tmp_path / "hard.csv"
+    _link_or_skip(os.link, p, hard)
+    File(p, encoding="utf-16").recode(to_encoding="utf-8")
+    assert p.stat().st_nlink == 2
+    assert hard.read_bytes() == text.encode("utf-8")
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("line\r\nnext\r\n", "ascii"),
+    ("\r\nстрока\r\n", "cp1251"),
+    ("\r\nстрока\r\n日本\r\n", "utf-8"),  # переход cp1251 -> utf-8 посреди файла
+])
+def test_file_recode_minimal_keeps_line_endings(tmp_path: Path, monkeypatch, text: str, expected: str):
+    from unishell._internal.structures import file as file_mod
+
+    monkeypatch.setattr(file_mod, "CHUNK_SIZE", 4)
+    p = tmp_path / "crlf.txt"
+    p.write_bytes(text.encode("utf-16"))
+    f = File(p, encoding="utf-16")
+    f.recode()
+    assert f.encoding == expected
+    assert p.read_bytes() == text.encode(expected)
+
+
+def test_file_recode_detects_wrong_source_encoding(tmp_path: Path):
+    p = tmp_path / "wrong.txt"
+    p.write_bytes("Привет, мир".encode("utf-8"))
+    f = File(p, encoding="ascii")
+    f.recode(to_encoding="utf-16")
+    assert p.read_text(encoding="utf-16") == "Привет, мир"
@@ -4,7 +4,7 @@ UniShell - унифицированная оболочка для работы 
 from .unishell import *
 from ._internal import structures as std
 from pathlib import Path
-from ._internal.encoding_utils import detect_encoding,determine_minimal_encoding,check_bom
+from ._internal.encoding_utils import detect_encoding,determine_minimal_encoding,check_bom,encoding_cache,sniff_encoding
 class File(std.File):
 	def __init__(self, path: str | Path, encoding: str|None = None,shell:UniShell|None = None):
 		shell = shell or sh
@@ -26,10 +26,21 @@ class Dir(std.Dir):
 		path = shell.to_abspath(path)
 		super().__init__(path)
 class Archive(std.Archive):
-	def __init__(self,path: File|Path|str, format: str|None = None, password: str|None = None, shell: UniShell|None = None):
+	def __init__(self,path: File|Path|str, format: str|None = None, password: str|None = None, shell: UniShell|None = None,
+			  level: int|None = None, threads: int|None = None, long_window: bool = False, compression: str|None = None):
 		shell = shell or sh
 		path = shell.to_abspath(path)
-		super().__init__(path)
+		super().__init__(path, format, password, level=level, threads=threads, long_window=long_window, compression=compression)
+def stream_archive(sources: list[File|Path|str], format: str, fileobj, shell: UniShell|None = None,
+				   level: int|None = None, threads: int|None = None, long_window: bool = False, compression: str|None = None):
+	shell = shell or sh
+	std.stream_archive([shell.to_abspath(source) for source in sources], format, fileobj,
+					   level=level, threads=threads, long_window=long_window, compression=compression)
+def stream_archive_chunks(sources: list[File|Path|str], format: str, shell: UniShell|None = None,
+						  level: int|None = None, threads: int|None = None, long_window: bool = False, compression: str|None = None):
+	shell = shell or sh
+	return std.stream_archive_chunks([shell.to_abspath(source) for source in sources], format,
+									 level=level, threads=threads, long_window=long_window, compression=compression)
 
 sh = UniShell()
 
@@ -42,6 +53,8 @@ __all__ = [
     'detect_encoding',
     'determine_minimal_encoding',
 	'check_bom',
+	'encoding_cache',
+	'sniff_encoding',
     'Path',
 ]
 
@@ -1,5 +1,77 @@
-from typing import Optional, List, Any,Dict,Callable
+from typing import Optional, List, Any,Dict,Callable,Iterator
+from collections.abc import Mapping
 import os
+import time
+
+_MISSING = object()
+
+class CachedLink:
+    """
+    Связанный параметр, запоминающий вычисленное значение.
+    Значение пересчитывается, когда истёк ttl (секунды) или изменился результат depends().
+    """
+    def __init__(self, func: Callable[[], Any], ttl: Optional[float] = None, depends: Optional[Callable[[], Any]] = None):
+        self.func = func
+        self.ttl = ttl
+        self.depends = depends
+        self._value: Any = _MISSING
+        self._key: Any = _MISSING
+        self._expires = 0.0
+
+    def __call__(self) -> Any:
+        key = self.depends() if self.depends is not None else None
+        if self._value is not _MISSING and key == self._key and (self.ttl is None or time.monotonic() < self._expires):
+            return self._value
+        self._value = self.func()
+        self._key = key
+        if self.ttl is not None:
+            self._expires = time.monotonic() + self.ttl
+        return self._value
+
+    def invalidate(self):
+        self._value = _MISSING
+
+class ParmsView(Mapping):
+    """
+    Ленивое объединённое представление параметров: os.environ, значения и связанные параметры.
+    Связанные параметры вычисляются только при чтении ключа.
+    Приоритет: связанные > значения > окружение.
+    """
+    def __init__(self, viewport: "ViewPort"):
+        self._viewport = viewport
+
+    def __getitem__(self, name: str) -> Any:
+        vp = self._viewport
+        if name in vp.parms_link:
+            return vp.parms_link[name]()
+        if name in vp.parms_value:
+            return vp.parms_value[name]
+        return os.environ[name]
+
+    def __contains__(self, name: object) -> bool:
+        vp = self._viewport
+        return name in vp.parms_link or name in vp.parms_value or name in os.environ
+
+    def __iter__(self) -> Iterator[str]:
+        vp = self._viewport
+        seen = set()
+        for layer in (os.environ, vp.parms_value, vp.parms_link):
+            for name in layer:
+                if name not in seen:
+                    seen.add(name)
+                    yield name
+
+    def __len__(self) -> int:
+        vp = self._viewport
+        return len(os.environ.keys() | vp.parms_value.keys() | vp.parms_link.keys())
+
+    def copy(self) -> Dict[str, Any]:
+        """Снимок всех параметров обычным dict (связанные параметры вычисляются)."""
+        return dict(self)
+
+    def __repr__(self) -> str:
+        return repr(self.copy())
+
 class ViewPort:
     def __init__(self, 
                  parms_value: Optional[Dict[str, Any]] = None, 
@@ -7,6 +79,8 @@ class ViewPort:
                  parms_gl: Optional[Dict[str, str]] = None):
         self.parms_value = parms_value or {}
         self.parms_link = parms_link or {}
+        # Увеличивается при каждом изменении параметров (используется кэшами, например to_abspath)
+        self.version = 0
         
         # Инициализация глобальных переменных
         if parms_gl is not None:
@@ -16,33 +90,36 @@ class ViewPort:
     def set_gl(self, name: str, value: str):
         """Устанавливает глобальную переменную окружения"""
         os.environ[name] = value
+        self.version += 1
     
     def del_gl(self, name: str):
         """Удаляет глобальную переменную окружения"""
         if name in os.environ:
             del os.environ[name]
+        self.version += 1
     
     
-    def all(self) -> Dict[str, Any]:
-        """Возвращает объединённый словарь всех параметров"""
-        return {
-            **os.environ,
-            **self.parms_value,
-            **{k: v() for k, v in self.parms_link.items()}
-        }
+    def all(self) -> ParmsView:
+        """Возвращает ленивое объединённое представление всех параметров (dict(...) для копии)"""
+        return ParmsView(self)
     
-    def set_(self, name: str, value: Any, link: bool = False):
+    def set_(self, name: str, value: Any, link: bool = False, ttl: Optional[float] = None, depends: Optional[Callable[[], Any]] = None):
         """
         Устанавливает параметр
         - link=True: сохраняет как вычисляемую функцию
         - link=False: сохраняет как статическое значение
+        - ttl/depends (только для link=True): запоминает значение функции на ttl секунд
+          и/или пока не изменится результат depends()
         """
         if link:
             if not callable(value):
                 raise TypeError("Для связанных параметров значение должно быть функцией")
+            if ttl is not None or depends is not None:
+                value = CachedLink(value, ttl=ttl, depends=depends)
             self.parms_link[name] = value
         else:
             self.parms_value[name] = value
+        self.version += 1
     def sets(self, parms: Dict[str,Any] , link: bool = False):
         for k,v in parms.items():
             self.set_(k,v,link)
@@ -52,6 +129,7 @@ class ViewPort:
             del self.parms_value[name]
         if name in self.parms_link:
             del self.parms_link[name]
+        self.version += 1
     def dels(self, parms: List[str]):
         for k,v in parms:
             self.del_(k)
@@ -71,6 +149,7 @@ class ViewPort:
             self.parms_link[name] = value
         else:
             self.parms_value[name] = value
+        self.version += 1
     
     def __delitem__(self, name: str):
         self.del_(name)
@@ -0,0 +1,94 @@
+import importlib.util
+import os
+import sys
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from .funcs import LazyModule
+from .gzip_utils import ParallelGzipWriter
+
+# zstd входит в стандартную библиотеку с Python 3.14 (compression.zstd), раньше - пакет backports.zstd с тем же API
+zstd = LazyModule('compression.zstd' if sys.version_info >= (3, 14) else 'backports.zstd',
+                  "zstd support requires the 'backports.zstd' package")
+lz4frame = LazyModule('lz4.frame', "lz4 support requires the 'lz4' package")
+gzip = LazyModule('gzip')
+bz2 = LazyModule('bz2')
+lzma = LazyModule('lzma')
+
+# Кодеки потокового сжатия: и для одиночных файлов (.zst), и для tar (.tar.zst)
+CODECS = ('gz', 'bz2', 'xz', 'zst', 'lz4')
+
+# Окно zstd в режиме long_window - как у `zstd --long`: 128 МБ; распаковщик по умолчанию принимает окна до 2**27
+LONG_WINDOW_LOG = 27
+
+
+def _has_module(name: str) -> bool:
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def zipfile_module() -> str:
+    """
+    Имя модуля zipfile с поддержкой элементов ZIP_ZSTANDARD: стандартный начиная с Python 3.14,
+    раньше - его копия из backports.zstd (если пакет установлен), иначе - обычный zipfile без zstd.
+    """
+    if sys.version_info >= (3, 14) or not _has_module('backports.zstd'):
+        return 'zipfile'
+    return 'backports.zstd.zipfile'
+
+
+def open_compressed(target: Union[Path, str, Any], codec: str, mode: str = 'rb', level: Optional[int] = None,
+                    threads: Optional[int] = None, long_window: bool = False) -> Any:
+    """
+    Открывает сжатый поток кодека codec на чтение ('rb') или запись ('wb').
+
+    Параметры:
+    target - путь или бинарный файловый объект
+    codec - один из CODECS
+    level - уровень сжатия (None - по умолчанию кодека): gz 0-9, bz2 1-9, xz 0-9, zst 1-22 (и отрицательные - быстрые), lz4 0-16
+    threads - потоки сжатия для gz и zst (None - по числу ядер); bz2, xz и lz4 сжимают в один поток
+    long_window - только zst: поиск совпадений в окне 128 МБ (выигрыш на больших повторяющихся данных)
+    """
+    if codec not in CODECS:
+        raise ValueError(f"Неизвестный кодек сжатия: {codec}")
+    if mode not in ('rb', 'wb'):
+        raise ValueError(f"Поддерживаются только режимы 'rb' и 'wb', получен '{mode}'")
+
+    if mode == 'rb':
+        if codec == 'gz':
+            return gzip.open(target, 'rb')
+        if codec == 'bz2':
+            return bz2.open(target, 'rb')
+        if codec == 'xz':
+            return lzma.open(target, 'rb')
+        if codec == 'zst':
+            return zstd.open(target, 'rb')
+        return lz4frame.open(target, 'rb')
+
+    if codec == 'gz':
+        return ParallelGzipWriter(target, level=6 if level is None else level, workers=threads)
+    if codec == 'bz2':
+        return bz2.open(target, 'wb', compresslevel=9 if level is None else level)
+    if codec == 'xz':
+        return lzma.open(target, 'wb', preset=6 if level is None else level)
+    if codec == 'zst':
+        return zstd.open(target, 'wb', options=zstd_options(level, threads, long_window))
+    return lz4frame.open(target, 'wb', compression_level=0 if level is None else level)
+
+
+def zstd_options(level: Optional[int] = None, threads: Optional[int] = None, long_window: bool = False) -> dict:
+    """Параметры ZstdCompressor: уровень, контрольная сумма, число рабочих потоков (если библиотека собрана с ними) и длинное окно."""
+    param = zstd.CompressionParameter
+    # контрольная сумма содержимого в каждом кадре - как у zstd CLI; по ней распаковщик (и Archive.verify) ловит порчу
+    options = {param.compression_level: zstd.COMPRESSION_LEVEL_DEFAULT if level is None else level,
+               param.checksum_flag: True}
+    workers = (os.cpu_count() or 1) if threads is None else threads
+    max_workers = param.nb_workers.bounds()[1]
+    if workers > 1 and max_workers > 0:
+        options[param.nb_workers] = min(workers, max_workers)
+    if long_window:
+        options[param.enable_long_distance_matching] = True
+        options[param.window_log] = LONG_WINDOW_LOG
+    return options
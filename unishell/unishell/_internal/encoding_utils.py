@@ -1,5 +1,85 @@
+import os
+import re
+import json
+import codecs
+import threading
+from collections import OrderedDict, Counter
 from pathlib import Path
-from typing import Optional,Literal
+from typing import Optional,Literal,Dict,Tuple,Callable,Union
+
+# Which tier of sniff_encoding decided, accumulated over all detections in the process.
+# Updated under _tier_stats_lock: detection runs in worker threads (Archive.search, extract)
+tier_stats: Counter[str] = Counter()
+_tier_stats_lock = threading.Lock()
+
+Backend = Union[str, Callable[[bytes], Optional[str]]]
+
+class EncodingCache:
+    """
+    Process-wide cache of detect_encoding results keyed by file identity
+    (device, inode, size, mtime_ns) and sample size. Any change to the file
+    produces a new key, so stale entries are simply never hit again.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[tuple, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(path: Path | str, sample_size: int) -> tuple:
+        st = os.stat(path)
+        return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, sample_size)
+
+    def get(self, key: tuple) -> Optional[str]:
+        with self._lock:
+            encoding = self._data.get(key)
+            if encoding is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._data.move_to_end(key)
+            return encoding
+
+    def put(self, key: tuple, encoding: str) -> None:
+        with self._lock:
+            self._data[key] = encoding
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the current number of entries."""
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._data)}
+
+    def save(self, path: Path | str) -> None:
+        """Persist the cache to a JSON file (e.g. between runs over a large static tree)."""
+        with self._lock:
+            entries = [[*key, encoding] for key, encoding in self._data.items()]
+        Path(path).write_text(json.dumps(entries), encoding='utf-8')
+
+    def load(self, path: Path | str) -> None:
+        """Merge entries previously written by save(); a missing file is ignored."""
+        path = Path(path)
+        if not path.exists():
+            return
+        for *key, encoding in json.loads(path.read_text(encoding='utf-8')):
+            self.put(tuple(key), encoding)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __repr__(self) -> str:
+        return f"<EncodingCache: size={len(self._data)}, hits={self.hits}, misses={self.misses}>"
+
+encoding_cache = EncodingCache()
 
 def check_bom(data: bytes) -> Optional[str]:
     """Check for Byte Order Mark in binary data."""
@@ -11,49 +91,130 @@ def check_bom(data: bytes) -> Optional[str]:
         return 'utf-16'
     return None
 
+def _looks_like_cp1251(raw_data: bytes) -> bool:
+    """Heuristic: the non-ASCII bytes decode to Cyrillic words, not to letters glued onto Latin ones."""
+    try:
+        text = raw_data.decode('cp1251')
+    except UnicodeDecodeError:
+        return False
+    non_ascii = cyrillic = mixed = 0
+    prev = ''
+    for ch in text:
+        if ch.isascii():
+            if ch.isalpha() and '\u0400' <= prev <= '\u04ff':
+                mixed += 1
+        else:
+            non_ascii += 1
+            if '\u0400' <= ch <= '\u04ff':
+                cyrillic += 1
+                if prev.isascii() and prev.isalpha():
+                    mixed += 1
+        prev = ch
+    return non_ascii > 0 and cyrillic >= 0.9 * non_ascii and mixed <= 0.1 * cyrillic
+
+def _detect_with_backend(raw_data: bytes, backend: Backend) -> Optional[str]:
+    if callable(backend):
+        return backend(raw_data)
+    if backend == 'chardet':
+        try:
+            import chardet
+        except ImportError:
+            raise ImportError("Install chardet for automatic encoding detection")
+        result = chardet.detect(raw_data)
+        if result['confidence'] < 0.7:
+            return 'utf-8'
+        return result['encoding']
+    if backend == 'charset-normalizer':
+        try:
+            from charset_normalizer import from_bytes  # type: ignore[import-not-found]
+        except ImportError:
+            raise ImportError("Install charset-normalizer for automatic encoding detection")
+        best = from_bytes(raw_data).best()
+        return best.encoding if best is not None else None
+    raise ValueError(f"Unknown encoding detection backend: {backend!r}")
+
+def sniff_encoding(raw_data: bytes, complete: bool = True, backend: Backend = 'chardet') -> Tuple[str, str]:
+    """
+    Detect the encoding of a byte sample, cheapest checks first.
+    Returns (encoding, tier) where tier is one of
+    'bom', 'ascii', 'utf-8', 'cp1251' or the backend name ('custom' for a callable).
+    complete=False means the sample may end in the middle of a multi-byte character.
+    """
+    if bom_encoding := check_bom(raw_data):
+        tier, encoding = 'bom', bom_encoding
+    elif raw_data.isascii():
+        tier, encoding = 'ascii', 'ascii' if raw_data else 'utf-8'
+    else:
+        try:
+            codecs.getincrementaldecoder('utf-8')().decode(raw_data, final=complete)
+            tier, encoding = 'utf-8', 'utf-8'
+        except UnicodeDecodeError:
+            if _looks_like_cp1251(raw_data):
+                tier, encoding = 'cp1251', 'cp1251'
+            else:
+                tier = backend if isinstance(backend, str) else 'custom'
+                encoding = _detect_with_backend(raw_data, backend) or 'utf-8'
+    with _tier_stats_lock:
+        tier_stats[tier] += 1
+    return encoding, tier
+
 def detect_encoding(
     path: Path | str, 
     sample_size: int = 65536, 
-    ignore_errors: bool = False
+    ignore_errors: bool = False,
+    use_cache: bool = True,
+    backend: Backend = 'chardet'
 ) -> Optional[str]:
-    """Detect file encoding using BOM and chardet."""
+    """
+    Detect file encoding with sniff_encoding: BOM, strict ASCII/UTF-8, cp1251 heuristics,
+    then chardet (or another backend). Results are memoised in encoding_cache.
+    """
     path = Path(path)
     
     try:
-        import chardet
-        
+        key = None
+        if use_cache and backend == 'chardet':
+            key = EncodingCache.key(path, sample_size)
+            if cached := encoding_cache.get(key):
+                return cached
+
         with path.open('rb') as f:
-            raw_data = f.read(sample_size)
-        
-        if bom_encoding := check_bom(raw_data):
-            return bom_encoding
-        
-        result = chardet.detect(raw_data)
-        
-        if result['confidence'] < 0.7:
-            return 'utf-8'
-            
-        return result['encoding'] or 'utf-8'
+            raw_data = f.read(sample_size + 1)
+        complete = len(raw_data) <= sample_size
+        encoding, _ = sniff_encoding(raw_data[:sample_size], complete=complete, backend=backend)
+
+        if key is not None:
+            encoding_cache.put(key, encoding)
+        return encoding
     
     except ImportError:
-        raise ImportError("Install chardet for automatic encoding detection")
+        raise
     except Exception:
         if ignore_errors:
             return None
         raise
 
-def determine_minimal_encoding(content: str) -> Literal["ascii","cp1251","utf-8"]:
-    """Determine the minimal encoding that supports the content."""
-    try:
-        content.encode('ascii')
-        return 'ascii'
-    except UnicodeEncodeError:
-        pass
-    
-    try:
-        content.encode('cp1251')
-        return 'cp1251'
-    except UnicodeEncodeError:
-        pass
+# Matches the first code point that cp1251 cannot represent: a C-speed scan without a throwaway encode
+_NOT_CP1251 = re.compile('[^' + re.escape(''.join(sorted(set(bytes(range(256)).decode('cp1251', errors='ignore'))))) + ']')
 
-    return 'utf-8'
\ No newline at end of file
+class MinimalEncoding:
+    """
+    Streaming variant of determine_minimal_encoding: feed() text chunks, read .encoding.
+    Only escalates (ascii -> cp1251 -> utf-8) and never keeps the text itself.
+    """
+
+    def __init__(self):
+        self.encoding: Literal["ascii","cp1251","utf-8"] = 'ascii'
+
+    def feed(self, chunk: str) -> Literal["ascii","cp1251","utf-8"]:
+        if self.encoding == 'ascii':
+            if chunk.isascii():
+                return self.encoding
+            self.encoding = 'cp1251'
+        if self.encoding == 'cp1251' and _NOT_CP1251.search(chunk):
+            self.encoding = 'utf-8'
+        return self.encoding
+
+def determine_minimal_encoding(content: str) -> Literal["ascii","cp1251","utf-8"]:
+    """Determine the minimal encoding that supports the content (single pass, no trial encodes)."""
+    return MinimalEncoding().feed(content)
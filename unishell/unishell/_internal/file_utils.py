@@ -1,7 +1,6 @@
 import shutil as sh
 import os
 import platform
-import subprocess
 from pathlib import Path
 from typing import Optional
 import sys
@@ -19,6 +18,56 @@ def copy(from_path: Path, to_path: Path, follow_symlinks: bool = True):
     else:
         raise ValueError(f"'{from_path}' is not a valid file or directory.")
 
+def copy_content(from_path: Path, to_path: Path, append: bool = False):
+    """Копирует байты файла в другой файл (перезапись или дозапись в конец), по возможности средствами ядра."""
+    with open(from_path, 'rb') as fsrc:
+        src_fd = fsrc.fileno()
+        count = os.fstat(src_fd).st_size
+        flags = os.O_WRONLY | os.O_CREAT | getattr(os, 'O_BINARY', 0)
+        if not append:
+            flags |= os.O_TRUNC
+        dst_fd = os.open(to_path, flags, 0o666)
+        try:
+            dst_offset = os.lseek(dst_fd, 0, os.SEEK_END)
+            _copy_fd(src_fd, dst_fd, count, dst_offset)
+        finally:
+            os.close(dst_fd)
+
+def _copy_fd(src_fd: int, dst_fd: int, count: int, dst_offset: int, bufsize: int = 1 << 20, src_offset: int = 0):
+    """Копирует count байт src_fd (со смещения src_offset) в dst_fd со смещения dst_offset: copy_file_range -> sendfile -> буфер."""
+    copied = 0
+    if hasattr(os, 'copy_file_range'):
+        try:
+            while copied < count:
+                sent = os.copy_file_range(src_fd, dst_fd, count - copied, src_offset + copied, dst_offset + copied)
+                if sent == 0:
+                    break
+                copied += sent
+        except OSError:
+            pass  # другая ФС, старое ядро и т.п. - пробуем следующий способ с текущей позиции
+    if copied < count and hasattr(os, 'sendfile') and sys.platform.startswith('linux'):
+        try:
+            os.lseek(dst_fd, dst_offset + copied, os.SEEK_SET)
+            while copied < count:
+                sent = os.sendfile(dst_fd, src_fd, src_offset + copied, min(count - copied, 1 << 30))
+                if sent == 0:
+                    break
+                copied += sent
+        except OSError:
+            pass
+    if copied < count:
+        os.lseek(src_fd, src_offset + copied, os.SEEK_SET)
+        os.lseek(dst_fd, dst_offset + copied, os.SEEK_SET)
+        while copied < count:
+            data = os.read(src_fd, min(bufsize, count - copied))
+            if not data:
+                break
+            view = memoryview(data)
+            while view:
+                written = os.write(dst_fd, view)
+                view = view[written:]
+            copied += len(data)
+
 def mkdir(path: Path, mode: int = 0o777, parents: bool = False, exist_ok: bool = False):
     """Создаёт директорию по указанному пути."""
     path.mkdir(mode=mode, parents=parents, exist_ok=exist_ok)
@@ -35,23 +84,87 @@ def rmdir(path: Path, ignore_errors: bool = False, onexc=None):
     """Рекурсивно удаляет директорию по указанному пути. ignore_errors и onerror передаются полностью."""
     sh.rmtree(path, ignore_errors=ignore_errors, onexc=onexc)
 
-def make_archive(from_path: Path, to_path: Path, format: str = "zip", owner: Optional[str] = None, group: Optional[str] = None):
-    """Создаёт архив из директории или файла."""
+# Сжатые tar собираются сами через compress_utils (shutil сжимает в один поток и без настройки уровня)
+_TAR_CODECS = {"gztar": "gz", "bztar": "bz2", "xztar": "xz", "zstdtar": "zst", "lz4tar": "lz4"}
+
+def make_archive(from_path: Path, to_path: Path, format: str = "zip", owner: Optional[str] = None, group: Optional[str] = None,
+                 level: Optional[int] = None, threads: Optional[int] = None, long_window: bool = False):
+    """Создаёт архив из директории или файла; level/threads/long_window - настройки сжатия (см. compress_utils)."""
     base_name = to_path.with_suffix('')
     base_dir = to_path.parent
     if not from_path.exists():
         raise FileNotFoundError(f"Каталог или файл '{from_path}' не найден.")
+    if format in _TAR_CODECS:
+        codec = _TAR_CODECS[format]
+        _make_tar(from_path, Path(f"{base_name}.tar.{codec}"), codec, owner, group, level, threads, long_window)
+        return
+    if format == "zip" and level is not None:
+        _make_zip(from_path, Path(f"{base_name}.zip"), level)
+        return
     sh.make_archive(str(base_name), format,
                    root_dir=str(from_path.parent),
                    base_dir=str(from_path.name),
                    owner=owner, group=group)
 
-def extract_archive(from_path: Path, to_path: Path, format: Optional[str] = None):
-    """Распаковывает архив в указанную директорию."""
+def _make_tar(from_path: Path, archive_path: Path, codec: str, owner: Optional[str] = None, group: Optional[str] = None,
+              level: Optional[int] = None, threads: Optional[int] = None, long_window: bool = False):
+    """Сжатый tar как у shutil.make_archive('gztar'), но с многопоточным gzip/zstd и настраиваемым уровнем."""
+    import tarfile
+    from .compress_utils import open_compressed
+
+    uid = gid = None
+    if owner is not None:
+        try:
+            import pwd
+            uid = pwd.getpwnam(owner).pw_uid
+        except (ImportError, KeyError):
+            pass
+    if group is not None:
+        try:
+            import grp
+            gid = grp.getgrnam(group).gr_gid
+        except (ImportError, KeyError):
+            pass
+
+    def set_owner(tarinfo: "tarfile.TarInfo") -> "tarfile.TarInfo":
+        if uid is not None:
+            tarinfo.uid, tarinfo.uname = uid, owner or ''
+        if gid is not None:
+            tarinfo.gid, tarinfo.gname = gid, group or ''
+        return tarinfo
+
+    archive_path.parent.mkdir(parents=True, exist_ok=True)
+    with open_compressed(archive_path, codec, 'wb', level, threads, long_window) as raw, \
+         tarfile.open(fileobj=raw, mode='w') as tf:
+        tf.add(from_path, arcname=from_path.name, filter=set_owner)
+
+def _make_zip(from_path: Path, archive_path: Path, level: int):
+    """zip как у shutil.make_archive('zip') (с записями каталогов), но с заданным уровнем deflate."""
+    import zipfile
+
+    archive_path.parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=level) as zf:
+        zf.write(from_path, from_path.name)
+        if from_path.is_dir():
+            for item in sorted(from_path.rglob('*')):
+                zf.write(item, item.relative_to(from_path.parent).as_posix())
+
+def extract_archive(from_path: Path, to_path: Path, format: Optional[str] = None, mode: str = "overwrite", delete: bool = False):
+    """
+    Распаковывает архив в указанную директорию.
+    mode='update' - записать только изменившиеся элементы (см. Archive.extract), delete - заодно удалить
+    файлы, которых нет в архиве.
+    """
     if not from_path.exists():
         raise FileNotFoundError(f"Архив '{from_path}' не найден")
     if to_path.exists():
         to_path.mkdir(parents=True, exist_ok=True)
+    if mode != "overwrite" or format in ("zstdtar", "lz4tar") or (format is None and from_path.name.endswith((".tar.zst", ".tzst", ".tar.lz4"))):
+        # форматов zstd и lz4 и режима обновления нет в shutil.unpack_archive
+        from .structures.archive import Archive
+        archive_format = format if format in (None, "zip", "tar") else f"tar.{_TAR_CODECS[format]}"
+        Archive(from_path, archive_format).extract(path=to_path, mode=mode, delete=delete)
+        return
     sh.unpack_archive(from_path, to_path, format)
 
 def chmod(path: Path, mode: int):
@@ -79,6 +192,7 @@ def nano(path: Path, edit_txt="notepad"):
         editor_command = ["nano", str(path)]
     else:
         raise OSError(f"Операционная система '{platform.system()}' не поддерживается.")
+    import subprocess
     subprocess.run(editor_command, check=True)
 
 def remove(path: Path):
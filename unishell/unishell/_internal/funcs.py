@@ -1,3 +1,5 @@
+import importlib
+
 class FakeObj:
     """A stub class that absorbs any calls. Return when the functionality is not available on this OS."""
     
@@ -29,4 +31,32 @@ class FakeObj:
         return "<Fake>"
     
     def __bool__(self):
-        return False
\ No newline at end of file
+        return False
+
+
+class LazyModule:
+    """A module proxy that imports the real module on first attribute access."""
+
+    def __init__(self, name: str, hint: str | None = None):
+        self.__dict__['_name'] = name
+        self.__dict__['_hint'] = hint
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            try:
+                module = importlib.import_module(self._name)
+            except ImportError as e:
+                if self._hint is None:
+                    raise
+                raise ImportError(self._hint) from e
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__['_module'] is not None else "not loaded"
+        return f"<LazyModule {self._name} ({state})>"
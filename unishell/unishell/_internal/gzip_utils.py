@@ -0,0 +1,448 @@
+import io
+import os
+import bisect
+import struct
+import time
+import zlib
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, List, NamedTuple, Optional, Union
+
+# Размер окна deflate: каждый блок сжимается со словарём из последних 32 КБ предыдущего
+WINDOW_SIZE = 32 << 10
+DEFAULT_BLOCK_SIZE = 128 << 10
+
+
+def _deflate_block(data: bytes, zdict: bytes, level: int, last: bool) -> bytes:
+    """Сжимает один блок в «сырой» deflate. Блоки кроме последнего заканчиваются sync flush, чтобы их можно было склеить."""
+    if zdict:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, zlib.DEF_MEM_LEVEL, zlib.Z_DEFAULT_STRATEGY, zdict)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class ParallelGzipWriter(io.RawIOBase):
+    """
+    Запись gzip в несколько потоков по схеме pigz: вход режется на блоки по block_size,
+    блоки сжимаются независимо в пуле потоков (zlib отпускает GIL) со словарём из хвоста
+    предыдущего блока и склеиваются по порядку в один deflate-поток. Результат - обычный
+    gzip-файл, который читает любой распаковщик.
+
+    Параметры:
+    target - путь или бинарный файловый объект
+    level - уровень сжатия 0-9
+    block_size - размер независимо сжимаемого блока
+    workers - число потоков (None - по числу ядер, 1 - без пула)
+    filename - имя исходного файла для заголовка gzip (по умолчанию - имя архива без .gz)
+    mtime - время модификации для заголовка (по умолчанию - текущее)
+    """
+
+    def __init__(self, target: Union[Path, str, Any], level: int = 6, block_size: int = DEFAULT_BLOCK_SIZE,
+                 workers: Optional[int] = None, filename: Optional[str] = None, mtime: Optional[float] = None):
+        if block_size < WINDOW_SIZE:
+            raise ValueError(f"block_size должен быть не меньше {WINDOW_SIZE} байт")
+        if isinstance(target, (str, os.PathLike)):
+            self._file = open(target, 'wb')
+            self._own_file = True
+            name = os.fspath(target)
+        else:
+            self._file = target
+            self._own_file = False
+            name = getattr(target, 'name', '')
+        self.name = name
+        self.level = level
+        self.block_size = block_size
+        self.workers = workers or os.cpu_count() or 1
+        self._buffer = bytearray()
+        self._window = b''
+        self._crc = 0
+        self._size = 0
+        self._pending: Deque[Any] = deque()
+        self._pool: Any = None
+        if self.workers > 1:
+            from concurrent.futures import ThreadPoolExecutor
+            self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        if filename is None and isinstance(name, str):
+            base = os.path.basename(name)
+            filename = base[:-3] if base.endswith('.gz') else ''
+        self._write_header(filename or '', time.time() if mtime is None else mtime)
+
+    def _write_header(self, filename: str, mtime: float) -> None:
+        fname = filename.encode('latin-1', 'replace')
+        flags = 0x08 if fname else 0
+        xfl = 2 if self.level == 9 else 4 if self.level == 1 else 0
+        self._file.write(b'\x1f\x8b\x08' + bytes([flags]) + struct.pack('<I', int(mtime) & 0xFFFFFFFF) + bytes([xfl, 255]))
+        if fname:
+            self._file.write(fname + b'\x00')
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        """Позиция в несжатых данных (нужна tarfile)."""
+        return self._size
+
+    def write(self, data: Any) -> int:
+        if self.closed:
+            raise ValueError("Запись в закрытый ParallelGzipWriter")
+        view = memoryview(data).cast('B')
+        self._crc = zlib.crc32(view, self._crc)
+        self._size += len(view)
+        self._buffer += view
+        if len(self._buffer) >= self.block_size:
+            data = bytes(self._buffer)
+            end = len(data) - len(data) % self.block_size
+            for start in range(0, end, self.block_size):
+                self._submit(data[start:start + self.block_size], last=False)
+            self._buffer = bytearray(data[end:])
+        return len(view)
+
+    def _submit(self, block: bytes, last: bool) -> None:
+        zdict, self._window = self._window, block[-WINDOW_SIZE:]
+        if self._pool is None:
+            self._file.write(_deflate_block(block, zdict, self.level, last))
+            return
+        self._pending.append(self._pool.submit(_deflate_block, block, zdict, self.level, last))
+        # ограничиваем число блоков в памяти: пишем готовые по порядку
+        while len(self._pending) > self.workers * 2 or (self._pending and self._pending[0].done()):
+            self._file.write(self._pending.popleft().result())
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            self._submit(bytes(self._buffer), last=True)
+            self._buffer.clear()
+            while self._pending:
+                self._file.write(self._pending.popleft().result())
+            self._file.write(struct.pack('<II', self._crc, self._size & 0xFFFFFFFF))
+            self._file.flush()
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+            if self._own_file:
+                self._file.close()
+            super().close()
+
+
+# Точки доступа (по схеме zran) ставятся там, где deflate-поток выровнен по байту: после sync flush
+# (пустой stored-блок 00 00 FF FF - так пишут ParallelGzipWriter и pigz) и на границах gzip-членов.
+# Python-овый zlib не умеет начинать распаковку с произвольного бита (inflatePrime), поэтому в обычном
+# однопоточном gzip без таких мест индекс состоит из одной начальной точки.
+_SYNC_MARKER = b'\x00\x00\xff\xff'
+_INDEX_MAGIC = b'USGZI1\n'
+DEFAULT_SPAN = 16 << 20
+_VERIFY_SIZE = 4096
+_READ_SIZE = 256 << 10
+
+
+class GzipPoint(NamedTuple):
+    comp: int                # смещение в сжатом файле
+    uncomp: int              # смещение в распакованных данных
+    window: Optional[bytes]  # последние 32 КБ перед точкой; None - начало gzip-члена
+
+
+class GzipIndex:
+    """Точки доступа к gzip-файлу: распаковка с ближайшей точки вместо начала потока."""
+
+    def __init__(self, points: List[GzipPoint], size: int):
+        self.points = points
+        self.size = size
+        self._uncomp = [point.uncomp for point in points]
+
+    def point_for(self, offset: int) -> GzipPoint:
+        """Последняя точка не дальше offset."""
+        return self.points[max(bisect.bisect_right(self._uncomp, offset) - 1, 0)]
+
+    def save(self, path: Union[Path, str], archive_size: int, archive_mtime_ns: int) -> None:
+        """Сохраняет индекс (окна сжаты zlib) с привязкой к размеру и mtime архива."""
+        with open(path, 'wb') as f:
+            f.write(_INDEX_MAGIC + struct.pack('<QqQI', archive_size, archive_mtime_ns, self.size, len(self.points)))
+            for point in self.points:
+                window = b'' if point.window is None else zlib.compress(point.window)
+                f.write(struct.pack('<QQBI', point.comp, point.uncomp, point.window is not None, len(window)) + window)
+
+    @classmethod
+    def load(cls, path: Union[Path, str], archive_size: int, archive_mtime_ns: int) -> Optional["GzipIndex"]:
+        """Загружает индекс; None, если файла нет, он повреждён или архив с тех пор изменился."""
+        try:
+            with open(path, 'rb') as f:
+                if f.read(len(_INDEX_MAGIC)) != _INDEX_MAGIC:
+                    return None
+                size, mtime_ns, total, count = struct.unpack('<QqQI', f.read(struct.calcsize('<QqQI')))
+                if (size, mtime_ns) != (archive_size, archive_mtime_ns):
+                    return None
+                points = []
+                for _ in range(count):
+                    comp, uncomp, has_window, length = struct.unpack('<QQBI', f.read(struct.calcsize('<QQBI')))
+                    window = zlib.decompress(f.read(length)) if has_window else None
+                    points.append(GzipPoint(comp, uncomp, window))
+        except (OSError, struct.error, zlib.error):
+            return None
+        return cls(points, total)
+
+
+class GzipIndexBuilder(io.RawIOBase):
+    """
+    Распаковывает gzip при чтении и попутно строит GzipIndex: один полный проход
+    (например, перечисление tar.gz) даёт и данные, и точки доступа.
+    Перемотка поддерживается только вперёд.
+
+    Параметры:
+    raw - сжатый файл (бинарный, с seek)
+    span - минимальное расстояние между точками в распакованных байтах
+    """
+
+    def __init__(self, raw: Any, span: int = DEFAULT_SPAN):
+        self._raw = raw
+        self.span = span
+        self._d = zlib.decompressobj(31)
+        self._pos = 0          # сколько сжатых байт отдано распаковщику
+        self._out = 0          # сколько распаковано
+        self._upos = 0         # сколько отдано читателю
+        self._buffer = b''
+        self._bufpos = 0
+        self._window = b''
+        self._tail = b''
+        self._between = False  # между gzip-членами: пропускаем нулевое выравнивание
+        self._eof = False
+        self._pending: List[Any] = []  # кандидаты в точки, ожидающие проверки
+        self.points = [GzipPoint(0, 0, None)]
+
+    def readable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._upos
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            return self.readall()
+        while len(self._buffer) - self._bufpos < size and not self._eof:
+            self._fill()
+        data = self._buffer[self._bufpos:self._bufpos + size]
+        self._bufpos += len(data)
+        self._upos += len(data)
+        return data
+
+    def readinto(self, buffer: Any) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._upos
+        elif whence != io.SEEK_SET or offset < self._upos:
+            raise io.UnsupportedOperation("GzipIndexBuilder перематывает только вперёд")
+        while self._upos < offset and self.read(min(offset - self._upos, _READ_SIZE)):
+            pass
+        return self._upos
+
+    def finish(self) -> GzipIndex:
+        """Дочитывает поток до конца и возвращает построенный индекс."""
+        while not self._eof:
+            self._fill()
+            self._upos += len(self._buffer) - self._bufpos
+            self._buffer, self._bufpos = b'', 0
+        return GzipIndex(self.points, self._out)
+
+    def _fill(self) -> None:
+        data = self._raw.read(_READ_SIZE)
+        if not data:
+            if not self._between and self._out:
+                raise EOFError("Сжатый поток оборвался до конца gzip-члена")
+            for pending in self._pending:
+                self._verify(*pending)
+            self._pending.clear()
+            self._eof = True
+            return
+        base = self._pos
+        search = self._tail + data
+        start = 0
+        end = search.find(_SYNC_MARKER)
+        while end != -1:
+            cut = base - len(self._tail) + end + len(_SYNC_MARKER)
+            if cut > self._pos:
+                self._inflate(data[start:cut - base])
+                start = cut - base
+                self._candidate()
+            end = search.find(_SYNC_MARKER, end + 1)
+        self._inflate(data[start:])
+        self._tail = search[-(len(_SYNC_MARKER) - 1):]
+
+    def _inflate(self, data: bytes) -> None:
+        while data:
+            if self._between:
+                stripped = data.lstrip(b'\0')
+                self._pos += len(data) - len(stripped)
+                data = stripped
+                if not data:
+                    return
+                self._between = False
+                if self._out - self.points[-1].uncomp >= self.span:
+                    self.points.append(GzipPoint(self._pos, self._out, None))
+            self._emit(self._d.decompress(data))
+            if self._d.eof:
+                rest = self._d.unused_data
+                self._pos += len(data) - len(rest)
+                self._d = zlib.decompressobj(31)
+                self._between = True
+                data = rest
+            else:
+                self._pos += len(data)
+                data = b''
+
+    def _emit(self, out: bytes) -> None:
+        if not out:
+            return
+        self._buffer = self._buffer[self._bufpos:] + out
+        self._bufpos = 0
+        self._out += len(out)
+        self._window = (self._window + out)[-WINDOW_SIZE:]
+        for pending in self._pending[:]:
+            pending[1] += out[:_VERIFY_SIZE - len(pending[1])]
+            if len(pending[1]) >= _VERIFY_SIZE:
+                self._pending.remove(pending)
+                self._verify(*pending)
+
+    def _candidate(self) -> None:
+        """Место сразу после 00 00 FF FF: возможная граница sync flush, проверяется по следующим данным."""
+        last = self._pending[-1][0].uncomp if self._pending else self.points[-1].uncomp
+        if not self._between and self._out - last >= self.span:
+            self._pending.append([GzipPoint(self._pos, self._out, self._window), bytearray()])
+
+    def _verify(self, point: GzipPoint, expected: bytearray) -> None:
+        # 00 00 FF FF может случайно встретиться внутри сжатых данных - тогда распаковка с этого места не совпадёт
+        saved = self._raw.tell()
+        try:
+            self._raw.seek(point.comp)
+            data = self._raw.read(_READ_SIZE)
+        finally:
+            self._raw.seek(saved)
+        d = zlib.decompressobj(-zlib.MAX_WBITS, zdict=point.window) if point.window else zlib.decompressobj(-zlib.MAX_WBITS)
+        try:
+            got = d.decompress(data, len(expected))
+        except zlib.error:
+            return
+        if got == expected[:len(got)] and (len(got) == len(expected) or d.eof):
+            self.points.append(point)
+            self.points.sort(key=lambda p: p.uncomp)
+
+
+class GzipSeekReader(io.RawIOBase):
+    """
+    Чтение gzip с произвольной позиции по GzipIndex: seek распаковывает с ближайшей
+    предшествующей точки доступа, а не с начала файла.
+
+    Параметры:
+    target - путь или сжатый бинарный файл с seek
+    index - индекс, построенный GzipIndexBuilder
+    """
+
+    def __init__(self, target: Union[Path, str, Any], index: GzipIndex):
+        if isinstance(target, (str, os.PathLike)):
+            self._raw = open(target, 'rb')
+            self._own_raw = True
+        else:
+            self._raw = target
+            self._own_raw = False
+        self.index = index
+        self._start(index.points[0])
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._upos
+
+    def _start(self, point: GzipPoint) -> None:
+        self._raw.seek(point.comp)
+        if point.window is None:
+            self._d = zlib.decompressobj(31)
+        elif point.window:
+            self._d = zlib.decompressobj(-zlib.MAX_WBITS, zdict=point.window)
+        else:
+            self._d = zlib.decompressobj(-zlib.MAX_WBITS)
+        self._raw_member = point.window is not None  # у «сырого» deflate трейлер gzip не съедается распаковщиком
+        self._upos = point.uncomp
+        self._buffer = b''
+        self._bufpos = 0
+        self._input = b''
+        self._skip = 0
+        self._between = False
+        self._eof = False
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._upos
+        elif whence == io.SEEK_END:
+            offset += self.index.size
+        if offset < 0:
+            raise ValueError("Отрицательная позиция")
+        point = self.index.point_for(offset)
+        if not point.uncomp <= self._upos <= offset:
+            self._start(point)
+        while self._upos < offset and self.read(min(offset - self._upos, _READ_SIZE)):
+            pass
+        return self._upos
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            return self.readall()
+        parts = []
+        while size > 0:
+            if self._bufpos == len(self._buffer):
+                if self._eof:
+                    break
+                self._decompress_more()
+                continue
+            data = self._buffer[self._bufpos:self._bufpos + size]
+            self._bufpos += len(data)
+            size -= len(data)
+            parts.append(data)
+        data = b''.join(parts)
+        self._upos += len(data)
+        return data
+
+    def readinto(self, buffer: Any) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def _decompress_more(self) -> None:
+        data = self._d.unconsumed_tail
+        if not data:
+            data, self._input = self._input, b''
+            if not data:
+                data = self._raw.read(_READ_SIZE)
+                if not data:
+                    if not self._between:
+                        raise EOFError("Сжатый поток оборвался до конца gzip-члена")
+                    self._eof = True
+                    return
+            if self._skip:
+                skipped = min(self._skip, len(data))
+                data, self._skip = data[skipped:], self._skip - skipped
+            if self._between:
+                data = data.lstrip(b'\0')
+                if not data:
+                    return
+                self._between = False
+        self._buffer, self._bufpos = self._d.decompress(data, _READ_SIZE), 0
+        if self._d.eof:
+            self._input = self._d.unused_data
+            self._skip = 8 if self._raw_member else 0
+            self._raw_member = False
+            self._between = True
+            self._d = zlib.decompressobj(31)
+
+    def close(self) -> None:
+        if not self.closed:
+            if self._own_raw:
+                self._raw.close()
+            super().close()
@@ -1,6 +1,9 @@
 from typing import List, Any, Dict, TypeVar, Optional, Union, overload
 from functools import wraps
 
+# Максимальный размер (в символах) одной порции данных в потоковом режиме
+CHUNK_SIZE = 1 << 20
+
 T = TypeVar('T')
 StreamType = TypeVar('StreamType', bound='Stream')
 
@@ -31,6 +34,15 @@ class Stream:
     __stream_rewrite__(self,value) < / >  - запрос на перезапись данных
     __stream_append__(self,value) << / >> - запрос на добавление данных
     __stream_getData__(self)              - запрос на данные
+
+    Необязательный потоковый протокол (используется операторами, если его реализуют обе стороны):
+    __stream_iter__(self)                        - итератор порций данных (не более CHUNK_SIZE)
+    __stream_rewrite_iter__(self, chunks)  < / > - перезапись данных из итератора порций
+    __stream_append_iter__(self, chunks)  << / >> - добавление данных из итератора порций
+    Если потоковая передача завершилась UnicodeDecodeError, операция повторяется через строки.
+    __stream_transfer__(self, target, append) -> bool - прямая передача в target без участия
+                                                 протоколов выше; False, если источник не может
+                                                 передать данные этому приёмнику напрямую
     """
     
     def __lt__(self, other: Union['Stream', str]) -> 'Stream':
@@ -38,7 +50,7 @@ class Stream:
         Оператор < : перезаписывает содержимое из другого объекта в текущий.
         """
         if isinstance(other, Stream):
-            self.__stream_rewrite__(other.__stream_getData__())
+            _transfer(other, self, append=False)
         elif isinstance(other, str):
             self.__stream_rewrite__(other)
         else:
@@ -50,7 +62,7 @@ class Stream:
         Оператор > : перезаписывает содержимое из текущего объекта в другой.
         """
         if isinstance(other, Stream):
-            other.__stream_rewrite__(self.__stream_getData__())
+            _transfer(self, other, append=False)
             return other
         elif isinstance(other, str):
             self.__stream_rewrite__(other)
@@ -63,7 +75,7 @@ class Stream:
         Оператор << : добавляет в конец содержимое из другого объекта в текущий.
         """
         if isinstance(other, Stream):
-            self.__stream_append__(other.__stream_getData__())
+            _transfer(other, self, append=True)
         elif isinstance(other, str):
             self.__stream_append__(other)  # Исправлено: было __stream_rewrite__, должно быть __stream_append__
         else:
@@ -75,7 +87,7 @@ class Stream:
         Оператор >> : добавляет в конец содержимое из текущего объекта в другой.
         """
         if isinstance(other, Stream):
-            other.__stream_append__(self.__stream_getData__())
+            _transfer(self, other, append=True)
             return other
         elif isinstance(other, str):
             self.__stream_append__(other)
@@ -92,5 +104,26 @@ class Stream:
     def __stream_getData__(self) -> str:
         raise NotImplementedError(f"Этот метод не разрешен в {self.__class__.__name__}")
 
+def _transfer(source: Stream, target: Stream, append: bool) -> None:
+    """
+    Передаёт данные из source в target: напрямую, если источник это умеет,
+    порциями, если обе стороны это умеют, иначе строкой.
+    """
+    direct = getattr(source, '__stream_transfer__', None)
+    if direct is not None and direct(target, append):
+        return
+    chunks = getattr(source, '__stream_iter__', None)
+    sink = getattr(target, '__stream_append_iter__' if append else '__stream_rewrite_iter__', None)
+    if chunks is not None and sink is not None:
+        try:
+            sink(chunks())
+            return
+        except UnicodeDecodeError:
+            pass  # кодировка источника указана неверно - строковый протокол определит её сам
+    if append:
+        target.__stream_append__(source.__stream_getData__())
+    else:
+        target.__stream_rewrite__(source.__stream_getData__())
+
 # Type variable для аннотаций
 subStream = TypeVar('subStream', bound=Stream)
\ No newline at end of file
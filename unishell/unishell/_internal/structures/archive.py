@@ -1,14 +1,84 @@
-import zipfile
-import py7zr
-import tarfile
-import rarfile  # type: ignore[import-not-found]
 import shutil
 import os
-import gzip
-import bz2
+import io
+import codecs
+import copy
+import stat
+import struct
 import sys
+import queue
+import threading
+import time
+import json
+import re
+import fnmatch
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
-from typing import Union, Optional, List, Iterator, Any, cast
+from typing import Union, Optional, List, Dict, Tuple, FrozenSet, NamedTuple, Iterable, Iterator, Any, Callable, cast
+
+from ..funcs import LazyModule
+from ..stream import Stream, CHUNK_SIZE
+from ..encoding_utils import sniff_encoding, check_bom
+from ..file_utils import _copy_fd
+from ..gzip_utils import ParallelGzipWriter, GzipIndex, GzipIndexBuilder, GzipSeekReader, DEFAULT_BLOCK_SIZE, DEFAULT_SPAN
+from ..compress_utils import CODECS, open_compressed, zipfile_module
+
+# Бэкенды форматов загружаются при первом обращении, чтобы `import unishell` оставался лёгким
+zipfile = LazyModule(zipfile_module())
+tarfile = LazyModule('tarfile')
+py7zr = LazyModule('py7zr', "7z support requires the 'py7zr>=1.0.0' package")
+rarfile = LazyModule('rarfile', "RAR support requires the 'rarfile' package")
+
+# Сжатый tar - это tarfile поверх потока кодека (см. compress_utils), одиночный файл - сам поток
+_TAR_FORMATS = ('tar',) + tuple('tar.' + codec for codec in CODECS)
+_SINGLE_FORMATS = CODECS
+# Методы сжатия элементов zip (параметр compression); zstd - с Python 3.14 или с пакетом backports.zstd
+_ZIP_METHODS = {'store': 0, 'deflate': 8, 'bzip2': 12, 'lzma': 14, 'zstd': 93}
+
+
+class MemberInfo(NamedTuple):
+    """Запись индекса архива."""
+    name: str
+    size: Optional[int]
+    offset: Optional[int]  # смещение заголовка элемента (zip, tar, rar); None, если формат его не даёт
+    mtime: Optional[float]
+    crc: Optional[int]
+    type: str  # 'file', 'dir', 'link' или 'other'
+
+
+class VerifyReport(NamedTuple):
+    """Результат Archive.verify."""
+    bad_members: List[Tuple[str, str]]  # (элемент, причина); '' - повреждена сама структура архива
+    members: int  # проверено элементов-файлов
+    bytes_checked: int  # распаковано байт
+    seconds: float
+
+    @property
+    def ok(self) -> bool:
+        return not self.bad_members
+
+    @property
+    def throughput(self) -> float:
+        """Распаковано байт в секунду."""
+        return self.bytes_checked / self.seconds if self.seconds > 0 else 0.0
+
+
+class SearchHit(NamedTuple):
+    """Совпадение Archive.search."""
+    member: str
+    line_no: int  # с 1
+    line: str  # без перевода строки
+
+
+# Индексы архивов на процесс: ключ - путь и идентичность файла, поэтому изменённый архив просто не попадает в кэш
+_INDEX_CACHE_SIZE = 64
+_index_cache: "OrderedDict[tuple, Tuple[Tuple[MemberInfo, ...], FrozenSet[str]]]" = OrderedDict()
+_index_lock = threading.Lock()
+# Точки доступа tar.gz (окна по 32 КБ) занимают заметно больше памяти - держим всего несколько
+_SEEK_INDEX_CACHE_SIZE = 4
+_seek_index_cache: "OrderedDict[tuple, GzipIndex]" = OrderedDict()
 
 class Archive:
     """
@@ -17,14 +87,28 @@ class Archive:
         - zip: создание, добавление, извлечение (с поддержкой паролей)
         - 7z: создание, добавление, извлечение (с поддержкой паролей)
         - tar: создание, добавление, извлечение
-        - tar.gz/tgz: создание, добавление, извлечение
-        - tar.bz2/tbz2: создание, добавление, извлечение
-        - gz: только чтение и извлечение (один файл)
-        - bz2: только чтение и извлечение (один файл)
+        - tar.gz/tgz, tar.bz2/tbz2, tar.xz/txz, tar.zst/tzst, tar.lz4: создание, добавление, извлечение
+        - gz, bz2, xz, zst, lz4: создание и извлечение (один файл)
         - rar: только чтение и извлечение (с поддержкой паролей)
+
+    Сжатие настраивается параметрами level, threads и long_window (см. compress_utils.open_compressed);
+    элементы zip сжимаются методом compression: 'deflate' (по умолчанию), 'zstd', 'lzma', 'bzip2' или 'store'.
+    gzip для tar.gz и gz сжимается блоками в несколько потоков (см. ParallelGzipWriter);
+    размер блока задаётся атрибутом gzip_block_size, число потоков - threads (или атрибутом gzip_workers).
+    zstd сжимает в threads потоков средствами самой библиотеки, bz2, xz и lz4 - в один поток.
     """
 
-    def __init__(self, path: Union[Path, str], format: Optional[str] = None, password: Optional[str] = None):
+    gzip_workers: Optional[int] = None
+    gzip_block_size: int = DEFAULT_BLOCK_SIZE
+    # Сохранять индекс элементов рядом с архивом (<архив>.index.json) между запусками
+    index_sidecar: bool = False
+    # tar.gz: индекс точек доступа (<архив>.gzi) для чтения отдельных элементов без распаковки с начала
+    gzip_seek_index: bool = False
+    gzip_seek_span: int = DEFAULT_SPAN
+
+    def __init__(self, path: Union[Path, str], format: Optional[str] = None, password: Optional[str] = None,
+                 level: Optional[int] = None, threads: Optional[int] = None, long_window: bool = False,
+                 compression: Optional[str] = None):
         """
         Инициализирует объект архива.
         
@@ -32,10 +116,20 @@ class Archive:
         path - путь к архиву
         format - явное указание формата (опционально)
         password - пароль для защищенных архивов (опционально)
+        level - уровень сжатия при записи (None - по умолчанию формата)
+        threads - число потоков сжатия для gz и zst (None - по числу ядер)
+        long_window - длинное окно zstd (128 МБ) для tar.zst и zst
+        compression - метод сжатия элементов zip: 'deflate', 'zstd', 'lzma', 'bzip2' или 'store'
         """
+        if compression is not None and compression not in _ZIP_METHODS:
+            raise ValueError(f"Неизвестный метод сжатия zip: {compression}")
         self.path = Path(path)
         self.password = password  # Храним пароль как строку
         self.temp_dir = None  # Для временных операций с 7z
+        self.level = level
+        self.threads = threads
+        self.long_window = long_window
+        self.compression = compression
 
         # Автоматическое определение формата по расширению файла
         suffixes = self.path.suffixes
@@ -49,14 +143,19 @@ class Archive:
                 '.tar': 'tar',
                 '.gz': 'gz',
                 '.bz2': 'bz2',
+                '.xz': 'xz',
+                '.zst': 'zst',
+                '.lz4': 'lz4',
                 '.rar': 'rar',
                 '.tgz': 'tar.gz',
-                '.tbz2': 'tar.bz2'
+                '.tbz2': 'tar.bz2',
+                '.txz': 'tar.xz',
+                '.tzst': 'tar.zst'
             }
 
             if len(suffixes) >= 2:
                 compound_ext = ''.join(suffixes[-2:])
-                if compound_ext in ('.tar.gz', '.tar.bz2'):
+                if compound_ext[1:] in _TAR_FORMATS:
                     self.format = ext_map.get(compound_ext, compound_ext[1:])
                 else:
                     self.format = ext_map.get(suffixes[-1], suffixes[-1][1:])
@@ -76,39 +175,220 @@ class Archive:
         Итератор по содержимому архива.
         Возвращает имена файлов/папок в архиве.
         """
+        for entry in self._load_index()[0]:
+            yield entry.name
+
+    def __contains__(self, name: str) -> bool:
+        """Есть ли в архиве элемент или каталог с таким именем (в т.ч. каталог без собственной записи, как в zip)."""
+        return name.rstrip('/') in self._load_index()[1]
+
+    def index(self) -> List[MemberInfo]:
+        """
+        Индекс элементов архива: имя, размер, смещение, время изменения, CRC и тип.
+        Строится один раз за проход по архиву и кэшируется в памяти (и в файле рядом с архивом,
+        если включён index_sidecar) до изменения размера или времени изменения архива.
+        """
+        return list(self._load_index()[0])
+
+    def _load_index(self) -> Tuple[Tuple[MemberInfo, ...], FrozenSet[str]]:
+        if self.format not in ('zip', '7z', 'rar') + _TAR_FORMATS + _SINGLE_FORMATS:
+            raise NotImplementedError(f"Итерация не поддерживается для {self.format}")
+        st = self.path.stat()
+        key = self._cache_key(st)
+        with _index_lock:
+            cached = _index_cache.get(key)
+            if cached is not None:
+                _index_cache.move_to_end(key)
+                return cached
+
+        entries = self._read_sidecar(st) if self.index_sidecar else None
+        if entries is None:
+            entries = list(self._build_index(st))
+            if self.index_sidecar:
+                self._write_sidecar(st, entries)
+        names = set()
+        for entry in entries:
+            parts = entry.name.rstrip('/').split('/')
+            names.update('/'.join(parts[:i]) for i in range(1, len(parts) + 1))
+        cached = (tuple(entries), frozenset(names))
+        with _index_lock:
+            _index_cache[key] = cached
+            while len(_index_cache) > _INDEX_CACHE_SIZE:
+                _index_cache.popitem(last=False)
+        return cached
+
+    def _build_index(self, st: os.stat_result) -> Iterator[MemberInfo]:
+        """Один проход по архиву; для сжатого tar - одна распаковка потока."""
         if self.format == 'zip':
-            try:
-                # Используем pyzipper для корректной поддержки паролей при чтении zip
-                import pyzipper  # type: ignore[import-not-found]
-                with pyzipper.AESZipFile(self.path, 'r') as zf:  # type: ignore[reportUnknownMemberType]
-                    if self.password:
-                        zf.pwd = self.password.encode('utf-8')
-                    for name in zf.namelist():
-                        yield name.replace('\\', '/')
-            except Exception:
-                # Fallback на стандартный zipfile
-                with zipfile.ZipFile(self.path, 'r') as zf:
-                    for name in zf.namelist():
-                        yield name.replace('\\', '/')
+            # Список читается без пароля, поэтому хватает стандартного zipfile (в т.ч. для AES-архивов)
+            with zipfile.ZipFile(self.path, 'r') as zf:
+                for info in zf.infolist():
+                    yield MemberInfo(info.filename.replace('\\', '/'), info.file_size, info.header_offset,
+                                     time.mktime(info.date_time + (0, 0, -1)), info.CRC, 'dir' if info.is_dir() else 'file')
         elif self.format == '7z':
             with py7zr.SevenZipFile(self.path, 'r', password=self.password) as zf:
-                for name in zf.getnames():
-                    yield name.replace('\\', '/')
-        elif self.format in ('tar', 'tar.gz', 'tar.bz2'):
-            mode = 'r:' + self.format.split('.')[-1] if '.' in self.format else 'r'
-            with tarfile.open(self.path, mode) as tf: # type: ignore
-                for from_path in tf.getmembers():
-                    yield from_path.name.replace('\\', '/')
+                for info in zf.list():
+                    kind = 'dir' if info.is_directory else 'link' if info.is_symlink else 'file' if info.is_file else 'other'
+                    mtime = info.creationtime.timestamp() if info.creationtime else None
+                    yield MemberInfo(info.filename.replace('\\', '/'), info.uncompressed, None, mtime, info.crc32, kind)
+        elif self.format == 'tar.gz' and self.gzip_seek_index and self._cached_seek_index(st) is None:
+            # Тот же единственный проход распаковки заодно строит точки доступа
+            with open(self.path, 'rb') as raw:
+                builder = GzipIndexBuilder(raw, self.gzip_seek_span)
+                with tarfile.open(fileobj=builder, mode='r:') as tf:
+                    for info in tf:
+                        yield self._tar_entry(info)
+                self._remember_seek_index(st, builder.finish())
+        elif self.format in _TAR_FORMATS:
+            with self._tar_reader() as tf:
+                for info in tf:
+                    yield self._tar_entry(info)
         elif self.format == 'rar':
-            if rarfile is None:  # type: ignore[reportConstantCondition]
-                raise ImportError("RAR support requires the 'rarfile' package")
             with rarfile.RarFile(self.path, 'r') as rf:  # type: ignore[reportUnknownMemberType]
-                for name in rf.namelist():  # type: ignore[reportUnknownMemberType]
-                    yield str(cast(Any, name)).replace('\\', '/')
-        elif self.format in ('gz', 'bz2'):
-            yield self.path.stem
+                for info in rf.infolist():  # type: ignore[reportUnknownMemberType]
+                    mtime = time.mktime(tuple(info.date_time) + (0, 0, -1)) if info.date_time else None
+                    yield MemberInfo(str(info.filename).replace('\\', '/'), info.file_size, getattr(info, 'header_offset', None),
+                                     mtime, getattr(info, 'CRC', None), 'dir' if info.is_dir() else 'file')
         else:
-            raise NotImplementedError(f"Итерация не поддерживается для {self.format}")
+            yield MemberInfo(self.path.stem, None, None, st.st_mtime, None, 'file')
+
+    @staticmethod
+    def _tar_entry(info: Any) -> MemberInfo:
+        kind = 'dir' if info.isdir() else 'file' if info.isreg() else 'link' if info.issym() or info.islnk() else 'other'
+        return MemberInfo(info.name.replace('\\', '/'), info.size, info.offset, info.mtime, None, kind)
+
+    def _cache_key(self, st: os.stat_result) -> tuple:
+        return (str(self.path.absolute()), st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _seek_index_path(self) -> Path:
+        return self.path.with_name(self.path.name + '.gzi')
+
+    def _cached_seek_index(self, st: os.stat_result) -> Optional[GzipIndex]:
+        """Индекс точек доступа из памяти или из файла рядом с архивом (если он не устарел)."""
+        key = self._cache_key(st)
+        with _index_lock:
+            index = _seek_index_cache.get(key)
+            if index is not None:
+                _seek_index_cache.move_to_end(key)
+                return index
+        index = GzipIndex.load(self._seek_index_path(), st.st_size, st.st_mtime_ns)
+        if index is not None:
+            self._remember_seek_index(st, index, save=False)
+        return index
+
+    def _remember_seek_index(self, st: os.stat_result, index: GzipIndex, save: bool = True) -> None:
+        with _index_lock:
+            _seek_index_cache[self._cache_key(st)] = index
+            while len(_seek_index_cache) > _SEEK_INDEX_CACHE_SIZE:
+                _seek_index_cache.popitem(last=False)
+        if save:
+            target = self._seek_index_path()
+            tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+            try:
+                index.save(tmp, st.st_size, st.st_mtime_ns)
+                os.replace(tmp, target)
+            except OSError:
+                tmp.unlink(missing_ok=True)
+
+    def _seek_index(self) -> GzipIndex:
+        """Индекс точек доступа tar.gz; при первом обращении строится полным проходом по архиву."""
+        st = self.path.stat()
+        index = self._cached_seek_index(st)
+        if index is None:
+            with open(self.path, 'rb') as raw:
+                index = GzipIndexBuilder(raw, self.gzip_seek_span).finish()
+            self._remember_seek_index(st, index)
+        return index
+
+    def _open_tar_read(self, random_access: bool = False) -> Tuple[Any, Callable[[], None]]:
+        """
+        Открывает tar на чтение и возвращает (tarfile, close). При random_access и включённом
+        gzip_seek_index tar.gz читается через точки доступа: seek к элементу распаковывает
+        с ближайшей точки, а не с начала потока.
+        """
+        if random_access and self.format == 'tar.gz' and self.gzip_seek_index:
+            reader = GzipSeekReader(self.path, self._seek_index())
+            try:
+                tf = tarfile.open(fileobj=reader, mode='r:')
+            except BaseException:
+                reader.close()
+                raise
+
+            def close() -> None:
+                tf.close()
+                reader.close()
+            return tf, close
+        if self.format == 'tar':
+            tf = tarfile.open(self.path, 'r')
+            return tf, tf.close
+        raw = open_compressed(self.path, self._codec())
+        try:
+            tf = tarfile.open(fileobj=raw, mode='r:')
+        except tarfile.ReadError:
+            raw.close()
+            raise
+        except Exception as e:
+            # как tarfile.open(..., 'r:gz'): повреждённый сжатый поток - это ReadError
+            raw.close()
+            raise tarfile.ReadError(f"not a {self._codec()} file") from e
+
+        def close_all() -> None:
+            tf.close()
+            raw.close()
+        return tf, close_all
+
+    @contextmanager
+    def _tar_reader(self, random_access: bool = False) -> Iterator[Any]:
+        tf, close = self._open_tar_read(random_access)
+        try:
+            yield tf
+        finally:
+            close()
+
+    def _codec(self) -> str:
+        """Кодек сжатого потока: 'tar.zst' -> 'zst', 'xz' -> 'xz'."""
+        return self.format.rsplit('.', 1)[-1]
+
+    def _sidecar_path(self) -> Path:
+        return self.path.with_name(self.path.name + '.index.json')
+
+    def _read_sidecar(self, st: os.stat_result) -> Optional[List[MemberInfo]]:
+        try:
+            data = json.loads(self._sidecar_path().read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        if data.get('size') != st.st_size or data.get('mtime_ns') != st.st_mtime_ns or data.get('format') != self.format:
+            return None
+        return [MemberInfo(*entry) for entry in data['members']]
+
+    def _write_sidecar(self, st: os.stat_result, entries: List[MemberInfo]) -> None:
+        """Сохраняет индекс рядом с архивом; если каталог недоступен для записи - просто пропускает."""
+        data = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'format': self.format, 'members': [list(e) for e in entries]}
+        sidecar = self._sidecar_path()
+        tmp = sidecar.with_name(f".{sidecar.name}.{os.getpid()}.tmp")
+        try:
+            tmp.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+            os.replace(tmp, sidecar)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+
+    def _forget_index(self) -> None:
+        """Сбрасывает индекс после изменения архива (размер и mtime могут совпасть с прежними)."""
+        path = str(self.path.absolute())
+        with _index_lock:
+            for cache in (_index_cache, _seek_index_cache):
+                for key in [key for key in cache if key[0] == path]:
+                    del cache[key]
+        self._sidecar_path().unlink(missing_ok=True)
+        self._seek_index_path().unlink(missing_ok=True)
+
+    def _tar_members(self, tf: Any, entries: List[MemberInfo]) -> List[Any]:
+        """Читает заголовки нужных элементов tar по смещениям из индекса - без разбора всего архива."""
+        members = []
+        for entry in sorted(entries, key=lambda e: e.offset or 0):
+            tf.fileobj.seek(entry.offset)
+            members.append(tarfile.TarInfo.fromtarfile(tf))
+        return members
 
     def add(self, path: Union[Path, str], arcname: Optional[str] = None):
         """
@@ -118,226 +398,501 @@ class Archive:
         path - путь к добавляемому файлу/директории
         arcname - имя в архиве (опционально)
         """
-        path = Path(path)
-        if not path.exists():
-            raise FileNotFoundError(f"Источник не найден: {path}")
-
-        # Обработка директорий
-        if path.is_dir():
-            return self._add_directory(path, arcname)
+        self.add_many([path], [arcname])
 
-        arcname = arcname or path.name
+    def add_many(self, paths: List[Union[Path, str]], arcnames: Optional[List[Optional[str]]] = None):
+        """
+        Добавляет несколько файлов/директорий за одно открытие (и не более одной пересборки) архива.
+        
+        Параметры:
+        paths - пути к добавляемым файлам/директориям
+        arcnames - имена в архиве (опционально, None - имя исходного файла)
+        """
+        sources = [Path(p) for p in paths]
+        names = arcnames if arcnames is not None else [None] * len(sources)
+        if len(names) != len(sources):
+            raise ValueError("Количество arcnames не совпадает с количеством путей")
+        for source in sources:
+            if not source.exists():
+                raise FileNotFoundError(f"Источник не найден: {source}")
+        items = [(source, name or source.name) for source, name in zip(sources, names)]
+        if not items:
+            return self
 
         if self.format == 'zip':
-            if self.password:
-                # Используем pyzipper для записи зашифрованных файлов
-                try:
-                    import pyzipper  # type: ignore[import-not-found]
-                except Exception as e:
-                    raise RuntimeError("Для записи zip с паролем требуется пакет 'pyzipper'") from e
-                with pyzipper.AESZipFile(self.path, 'a', compression=zipfile.ZIP_DEFLATED) as zf:  # type: ignore[reportUnknownMemberType]
-                    zf.setpassword(self.password.encode('utf-8'))
-                    try:
-                        zf.setencryption(pyzipper.WZ_AES, nbits=256)
-                    except Exception:
-                        pass
-                    zf.writestr(arcname, Path(path).read_bytes())
-            else:
-                with zipfile.ZipFile(self.path, 'a', compression=zipfile.ZIP_DEFLATED) as zf:
-                    zf.write(path, arcname)
+            with self._open_zip('a') as zf:
+                for file, arcname in self._iter_files(items):
+                    zf.write(file, arcname)
 
         elif self.format == '7z':
-            self._add_to_7z(path, arcname)
+            if self.path.exists():
+                # режим 'a' py7zr портит заголовок при дописывании нескольких папок подряд,
+                # поэтому существующий архив пересобирается потоково
+                self._rewrite_7z(items)
+            else:
+                with py7zr.SevenZipFile(self.path, 'w', filters=self._7z_filters(), password=self.password, dereference=True) as zf:
+                    for source, arcname in items:
+                        zf.writeall(source, arcname=arcname)
 
-        elif self.format in ('tar', 'tar.gz', 'tar.bz2'):
-            # Для сжатых tar используем режим записи вместо добавления
+        elif self.format in _TAR_FORMATS:
             if self.path.exists():
-                self._add_to_tar(path, arcname)
+                if self.format == 'tar' and not self._has_any(arcname for _, arcname in items):
+                    # Несжатый tar: дописываем новые элементы на место маркера конца архива
+                    with tarfile.open(self.path, 'a') as tf:
+                        for source, arcname in items:
+                            tf.add(source, arcname=arcname)
+                else:
+                    self._rewrite_tar(items)
             else:
-                mode = 'w:' + self.format.split('.')[-1] if '.' in self.format else 'w'
-                with tarfile.open(self.path, mode) as tf:
-                    tf.add(path, arcname=arcname)
+                with self._open_tar_write(self.path) as tf:
+                    for source, arcname in items:
+                        tf.add(source, arcname=arcname)
+
+        elif self.format in _SINGLE_FORMATS:
+            if len(items) != 1 or not items[0][0].is_file():
+                raise ValueError(f"Архив {self.format} может содержать только один файл")
+            source, arcname = items[0]
+
+            def write(tmp: Path):
+                with open(source, 'rb') as src, self._compressor(tmp, arcname, source.stat().st_mtime) as dst:
+                    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+            self._rewrite(write)
 
         else:
             raise NotImplementedError(f"Добавление не поддерживается для {self.format}")
+        self._forget_index()
+        return self
 
-    def _add_directory(self, path: Path, arcroot: Optional[str] = None):
+    def copy_members(self, source: Union["Archive", Path, str], members: Optional[List[str]] = None,
+                     rename: Optional[Union[Dict[str, str], Callable[[str], str]]] = None):
         """
-        Внутренний метод для добавления директории в архив.
+        Копирует элементы другого архива в этот без распаковки на диск.
+        zip -> zip: сжатые записи переносятся байт в байт, без пересжатия (шифрование элементов сохраняется);
+        tar -> tar (с любым сжатием): элементы передаются потоком по одному за один проход по источнику;
+        прочие сочетания - потоком через open(member) с повторным сжатием.
+        Элементы с совпадающими именами заменяются.
         
         Параметры:
-        path - путь к директории
-        arcroot - корневое имя в архиве (опционально)
+        source - архив-источник (Archive или путь)
+        members - имена элементов или каталогов (None - все)
+        rename - новые имена: словарь {старое имя: новое} или функция
         """
-        arcroot = arcroot or path.name
+        src = source if isinstance(source, Archive) else Archive(source)
+        if self.format not in ('zip',) + _TAR_FORMATS:
+            raise NotImplementedError(f"Копирование элементов не поддерживается для {self.format}")
+        entries = list(src._load_index()[0])
+        if members is not None:
+            wanted = tuple(members)
+            for name in wanted:
+                if name.rstrip('/') not in src:
+                    raise ValueError(f"Элемент '{name}' не найден в архиве")
+            prefixes = tuple(name.rstrip('/') + '/' for name in wanted)
+            entries = [e for e in entries if e.name in wanted or e.name.startswith(prefixes)]
+        if isinstance(rename, dict):
+            mapping = rename
+            rename = lambda name: mapping.get(name, name)
+        items = [(entry, rename(entry.name) if rename else entry.name) for entry in entries]
+        if not items:
+            return self
 
+        new_names = {name for _, name in items}
+        replacing = self.path.exists() and any(name in new_names for name in self)
+        # Источник и приёмник - один файл: дописывать в него, одновременно читая, нельзя
+        rewrite = replacing or (self.path.exists() and src.path.resolve() == self.path.resolve())
         if self.format == 'zip':
-            if self.password:
-                try:
-                    import pyzipper  # type: ignore[import-not-found]
-                except Exception as e:
-                    raise RuntimeError("Для записи zip с паролем требуется пакет 'pyzipper'") from e
-                with pyzipper.AESZipFile(self.path, 'a', compression=zipfile.ZIP_DEFLATED) as zf:  # type: ignore[reportUnknownMemberType]
-                    zf.setpassword(self.password.encode('utf-8'))
-                    try:
-                        zf.setencryption(pyzipper.WZ_AES, nbits=256)
-                    except Exception:
-                        pass
-                    for item in path.rglob('*'):
-                        if item.is_file():
-                            rel_path = item.relative_to(path)
-                            arcname = str(Path(arcroot) / rel_path).replace(os.sep, '/')
-                            zf.writestr(arcname, item.read_bytes())
-            else:
-                with zipfile.ZipFile(self.path, 'a', compression=zipfile.ZIP_DEFLATED) as zf:
-                    for item in path.rglob('*'):
-                        if item.is_file():
-                            rel_path = item.relative_to(path)
-                            arcname = str(Path(arcroot) / rel_path).replace(os.sep, '/')
-                            zf.write(item, arcname)
+            self._copy_into_zip(src, items, new_names, rewrite)
+        else:
+            self._copy_into_tar(src, items, new_names, rewrite)
+        self._forget_index()
+        return self
 
-        elif self.format == '7z':
-            temp_dir = self._prepare_7z_temp()
-            dest = temp_dir / arcroot
-            if dest.exists():
-                shutil.rmtree(dest)
-            shutil.copytree(path, dest)
-            self._recreate_7z(temp_dir)
-
-        elif self.format in ('tar', 'tar.gz', 'tar.bz2'):
-            # Для сжатых tar используем режим записи вместо добавления
-            if self.path.exists():
-                self._add_dir_to_tar(path, arcroot)
-            else:
-                mode = 'w:' + self.format.split('.')[-1] if '.' in self.format else 'w'
-                with tarfile.open(self.path, mode) as tf:
-                    tf.add(path, arcname=arcroot)
+    def _copy_into_zip(self, src: "Archive", items: List[tuple], new_names: set, rewrite: bool):
+        def copy_items(dst: Any) -> None:
+            if src.format == 'zip':
+                with zipfile.ZipFile(src.path, 'r') as szf, open(src.path, 'rb') as raw:
+                    infos = {info.filename.replace('\\', '/'): info for info in szf.infolist()}
+                    for entry, name in items:
+                        dst.copy(raw, infos[entry.name], name)
+                return
+            files = {}
+            for entry, name in items:
+                info = zipfile.ZipInfo(name, time.localtime(entry.mtime or time.time())[:6])
+                if entry.type == 'dir':
+                    info.filename = name.rstrip('/') + '/'
+                    info.external_attr = 0o40755 << 16 | 0x10
+                    dst.writestr(info, b'')
+                elif entry.type == 'file':
+                    files[entry.name] = info
+            # один проход по источнику: 7z и сжатый tar распаковываются один раз, а не на каждый элемент
+            for member, fsrc in src._member_streams(list(files)):
+                info = files[member]
+                info.compress_type = self._zip_method()
+                _set_zip_level(info, self.level)
+                with dst.open(info, 'w') as fdst:
+                    shutil.copyfileobj(fsrc, fdst, CHUNK_SIZE)
+
+        if not rewrite:
+            # Сырые записи (уже сжатые и, при необходимости, зашифрованные) дописываются без zipfile
+            with (_RawZipWriter(self.path, 'a') if src.format == 'zip' else self._open_zip('a')) as dst:
+                copy_items(dst)
+            return
+
+        def write(tmp: Path):
+            with zipfile.ZipFile(self.path, 'r') as old, open(self.path, 'rb') as raw, _RawZipWriter(tmp) as dst:
+                for info in old.infolist():
+                    if info.filename.replace('\\', '/') not in new_names:
+                        dst.copy(raw, info, info.filename)
+                if src.format == 'zip':
+                    copy_items(dst)
+            if src.format != 'zip':
+                with self._open_zip('a', tmp) as dst:
+                    copy_items(dst)
+
+        self._rewrite(write)
+
+    def _copy_into_tar(self, src: "Archive", items: List[tuple], new_names: set, rewrite: bool):
+        def copy_items(dst: Any) -> None:
+            if src.format in _TAR_FORMATS:
+                renamed = {entry.name: name for entry, name in items}
+                with src._tar_reader() as stf:
+                    for info in stf:
+                        name = renamed.get(info.name.replace('\\', '/'))
+                        if name is None:
+                            continue
+                        copied = copy.copy(info)
+                        copied.name = name
+                        if info.islnk():
+                            copied.linkname = renamed.get(info.linkname, info.linkname)
+                        dst.addfile(copied, stf.extractfile(info) if info.isreg() else None)
+                return
+            files = {}
+            for entry, name in items:
+                info = tarfile.TarInfo(name.rstrip('/'))
+                info.mtime = int(entry.mtime or time.time())
+                if entry.type == 'dir':
+                    info.type, info.mode = tarfile.DIRTYPE, 0o755
+                    dst.addfile(info)
+                elif entry.type == 'file':
+                    info.mode = 0o644
+                    files[entry.name] = (entry, info)
+            # один проход по источнику, как и для zip
+            for member, fsrc in src._member_streams(list(files)):
+                entry, info = files[member]
+                if entry.size is None:
+                    # размер одиночного сжатого файла заранее неизвестен, а tar пишет его в заголовок
+                    data = fsrc.read()
+                    info.size, fsrc = len(data), io.BytesIO(data)
+                else:
+                    info.size = entry.size
+                dst.addfile(info, fsrc)
 
+        if not self.path.exists():
+            with self._open_tar_write(self.path) as dst:
+                copy_items(dst)
+        elif not rewrite and self.format == 'tar':
+            with tarfile.open(self.path, 'a') as dst:
+                copy_items(dst)
         else:
-            raise NotImplementedError(f"Добавление директорий не поддерживается для {self.format}")
+            def write(tmp: Path):
+                with self._tar_reader() as old, self._open_tar_write(tmp) as dst:
+                    for member in old:
+                        if member.name.replace('\\', '/') not in new_names:
+                            dst.addfile(member, old.extractfile(member) if member.isreg() else None)
+                    copy_items(dst)
 
-    def _add_to_tar(self, path: Path, arcname: str):
-        """
-        Добавляет файл в существующий tar-архив путем пересоздания.
-        
-        Параметры:
-        path - путь к файлу
-        arcname - имя в архиве
-        """
-        temp_dir = self._prepare_tar_temp()
-        dest = temp_dir / arcname
-        dest.parent.mkdir(parents=True, exist_ok=True)
-        shutil.copy2(path, dest)
-        self._recreate_tar(temp_dir)
+            self._rewrite(write)
+
+    def remove(self, member: str):
+        """Удаляет элемент (или каталог со всем содержимым) из архива."""
+        return self.remove_many([member])
 
-    def _add_dir_to_tar(self, path: Path, arcroot: str):
+    def remove_many(self, members: List[str]):
         """
-        Добавляет директорию в существующий tar-архив путем пересоздания.
-        
-        Параметры:
-        path - путь к директории
-        arcroot - корневое имя в архиве
+        Удаляет несколько элементов за один проход по архиву.
+        zip: оставшиеся записи переносятся в новый архив как есть, без пересжатия;
+        tar: оставшиеся блоки копируются диапазонами байт (средствами ядра, где возможно);
+        сжатый tar и 7z: оставшиеся элементы передаются потоком в заново сжатый архив.
         """
-        temp_dir = self._prepare_tar_temp()
-        dest = temp_dir / arcroot
-        if dest.exists():
-            shutil.rmtree(dest)
-        shutil.copytree(path, dest)
-        self._recreate_tar(temp_dir)
+        names = tuple(name.rstrip('/') for name in members)
+        self._check_members(names)
+        if not names:
+            return self
+        dropped = self._dropped(names)
+
+        if self.format == 'zip':
+            def write(tmp: Path):
+                with zipfile.ZipFile(self.path, 'r') as old, open(self.path, 'rb') as raw, _RawZipWriter(tmp) as dst:
+                    for info in old.infolist():
+                        if not dropped(info.filename.replace('\\', '/')):
+                            dst.copy(raw, info, info.filename)
+            self._rewrite(write)
+        elif self.format == 'tar':
+            self._compact_tar(dropped)
+        elif self.format in _TAR_FORMATS:
+            self._rewrite_tar([], removed=names)
+        elif self.format == '7z':
+            self._rewrite_7z([], removed=names)
+        else:
+            raise NotImplementedError(f"Удаление не поддерживается для {self.format}")
+        self._forget_index()
+        return self
 
-    def _prepare_tar_temp(self) -> Path:
+    def replace(self, member: str, path: Union[Path, str]):
+        """Заменяет существующий элемент архива файлом/директорией path."""
+        return self.replace_many({member: path})
+
+    def replace_many(self, replacements: Dict[str, Union[Path, str]]):
         """
-        Подготавливает временную директорию для операций с tar архивами.
-        Возвращает путь к временной директории.
+        Заменяет несколько элементов за одну пересборку: {имя в архиве: путь к новому содержимому}.
+        Неизменённые записи zip копируются без пересжатия.
         """
-        self.cleanup()
-        self.temp_dir = self.path.parent / f"~temp_{self.path.stem}"
-        self.temp_dir.mkdir(parents=True, exist_ok=True)
+        names = tuple(name.rstrip('/') for name in replacements)
+        self._check_members(names)
+        for source in replacements.values():
+            if not Path(source).exists():
+                raise FileNotFoundError(f"Источник не найден: {source}")
+        items = [(Path(source), name.rstrip('/')) for name, source in replacements.items()]
+        if not items:
+            return self
 
-        if self.path.exists():
-            mode = 'r:' + self.format.split('.')[-1] if '.' in self.format else 'r'
-            with tarfile.open(self.path, mode) as tf:
-                # Для Python 3.12+ используем фильтр
-                if sys.version_info >= (3, 12):
-                    tf.extractall(path=self.temp_dir, filter='data')
-                else:
-                    tf.extractall(path=self.temp_dir)
+        if self.format == 'zip':
+            dropped = self._dropped(names)
 
-        return self.temp_dir
+            def write(tmp: Path):
+                with zipfile.ZipFile(self.path, 'r') as old, open(self.path, 'rb') as raw, _RawZipWriter(tmp) as dst:
+                    for info in old.infolist():
+                        if not dropped(info.filename.replace('\\', '/')):
+                            dst.copy(raw, info, info.filename)
+                with self._open_zip('a', tmp) as dst:
+                    for file, arcname in self._iter_files(items):
+                        dst.write(file, arcname)
+            self._rewrite(write)
+            self._forget_index()
+            return self
+        # tar и 7z при совпадении имён и так пересобираются с заменой
+        return self.add_many([source for source, _ in items], [name for _, name in items])
 
-    def _recreate_tar(self, temp_dir: Path):
+    def _check_members(self, names: Iterable[str]) -> None:
+        for name in names:
+            if name not in self:
+                raise ValueError(f"Элемент '{name}' не найден в архиве")
+
+    @staticmethod
+    def _dropped(names: Tuple[str, ...]) -> Callable[[str], bool]:
+        """Предикат: имя совпадает с одним из names или лежит внутри такого каталога."""
+        dir_prefixes = tuple(name + '/' for name in names)
+        return lambda name: name.rstrip('/') in names or name.startswith(dir_prefixes)
+
+    def _compact_tar(self, dropped: Callable[[str], bool]) -> None:
         """
-        Пересоздает tar-архив из временной директории.
-        
-        Параметры:
-        temp_dir - путь к временной директории с содержимым
+        Удаление из несжатого tar: заголовки и данные оставшихся элементов копируются
+        в новый файл непрерывными диапазонами байт по смещениям из индекса, без разбора содержимого.
         """
-        mode = 'w:' + self.format.split('.')[-1] if '.' in self.format else 'w'
-        with tarfile.open(self.path, mode) as tf:
-            for item in temp_dir.iterdir():
-                tf.add(item, arcname=item.name)
-        self.cleanup()
+        entries = sorted(self._load_index()[0], key=lambda e: e.offset or 0)
+        with tarfile.open(self.path, 'r') as tf:
+            self._tar_members(tf, entries[-1:])
+            end = tf.offset  # конец данных последнего элемента
+        ranges: List[List[int]] = []
+        for entry, following in zip(entries, entries[1:] + [None]):
+            if dropped(entry.name):
+                continue
+            stop = following.offset if following is not None else end
+            if ranges and ranges[-1][1] == entry.offset:
+                ranges[-1][1] = stop
+            else:
+                ranges.append([entry.offset, stop])
+
+        def write(tmp: Path):
+            with open(self.path, 'rb') as src, open(tmp, 'r+b') as dst:
+                written = 0
+                for start, stop in ranges:
+                    _copy_fd(src.fileno(), dst.fileno(), stop - start, written, src_offset=start)
+                    written += stop - start
+                # маркер конца архива: два нулевых блока, затем выравнивание до записи tar
+                trailer = 2 * tarfile.BLOCKSIZE
+                trailer += -(written + trailer) % tarfile.RECORDSIZE
+                dst.seek(written)
+                dst.write(b'\0' * trailer)
+                dst.truncate()
 
-    def _add_to_7z(self, path: Path, arcname: str):
+        self._rewrite(write)
+
+    def writer(self) -> "ArchiveWriter":
         """
-        Добавляет файл в 7z архив через временную директорию.
+        Пакетная сессия добавления: все add() внутри with применяются одним add_many при выходе.
         
-        Параметры:
-        path - путь к файлу
-        arcname - имя в архиве
+        Пример:
+        with archive.writer() as w:
+            w.add("a.txt")
+            w.add("docs", arcname="manual")
         """
-        temp_dir = self._prepare_7z_temp()
-        dest = temp_dir / arcname
-        
-        # Удаляем существующий файл/директорию
-        if dest.exists():
-            if dest.is_dir():
-                shutil.rmtree(dest)
+        return ArchiveWriter(self)
+
+    def _open_zip(self, mode: str, path: Optional[Path] = None) -> Any:
+        """Открывает zip на запись; при наличии пароля - через pyzipper с шифрованием AES."""
+        path = path or self.path
+        method = self._zip_method()
+        if self.password:
+            if method == _ZIP_METHODS['zstd']:
+                raise ValueError("Шифрование zip (pyzipper) не поддерживает метод сжатия zstd")
+            try:
+                import pyzipper  # type: ignore[import-not-found]
+            except Exception as e:
+                raise RuntimeError("Для записи zip с паролем требуется пакет 'pyzipper'") from e
+            zf = pyzipper.AESZipFile(path, mode, compression=method, compresslevel=self.level)  # type: ignore[reportUnknownMemberType]
+            zf.setpassword(self.password.encode('utf-8'))
+            try:
+                zf.setencryption(pyzipper.WZ_AES, nbits=256)
+            except Exception:
+                pass
+            return zf
+        return zipfile.ZipFile(path, mode, compression=method, compresslevel=self.level)
+
+    def _zip_method(self) -> int:
+        return _resolve_zip_method(self.compression)
+
+    def _7z_filters(self) -> Optional[List[Dict[str, Any]]]:
+        """Цепочка фильтров py7zr для заданного level (None - фильтры py7zr по умолчанию)."""
+        if self.level is None:
+            return None
+        filters: List[Dict[str, Any]] = [{'id': py7zr.FILTER_LZMA2, 'preset': self.level}]
+        if self.password:
+            filters.append({'id': py7zr.FILTER_CRYPTO_AES256_SHA256})
+        return filters
+
+    @staticmethod
+    def _iter_files(items: List[tuple]) -> Iterator[tuple]:
+        """Разворачивает директории в пары (файл, имя в архиве); пустые директории пропускаются."""
+        for source, arcname in items:
+            if source.is_dir():
+                for item in source.rglob('*'):
+                    if item.is_file():
+                        rel_path = item.relative_to(source)
+                        yield item, str(Path(arcname) / rel_path).replace(os.sep, '/')
             else:
-                dest.unlink()
-                
-        # Создаем родительскую директорию
-        dest.parent.mkdir(parents=True, exist_ok=True)
-        shutil.copy2(path, dest)
+                yield source, arcname
+
+    @contextmanager
+    def _open_tar_write(self, target: Path) -> Iterator[Any]:
+        """Открывает tar на запись; сжатый tar - это tarfile поверх потока кодека."""
+        if self.format == 'tar':
+            with tarfile.open(target, 'w') as tf:
+                yield tf
+            return
+        with self._compressor(target, '') as raw, tarfile.open(fileobj=raw, mode='w') as tf:
+            yield tf
+
+    def _compressor(self, target: Path, filename: str, mtime: Optional[float] = None) -> Any:
+        """Сжимающий поток формата с настройками архива; gzip - параллельный, с именем и временем в заголовке."""
+        if self._codec() == 'gz':
+            return self._gzip_writer(target, filename, mtime)
+        return open_compressed(target, self._codec(), 'wb', self.level, self.threads, self.long_window)
+
+    def _gzip_writer(self, target: Path, filename: str, mtime: Optional[float] = None) -> ParallelGzipWriter:
+        return ParallelGzipWriter(target, level=6 if self.level is None else self.level, block_size=self.gzip_block_size,
+                                  workers=self.gzip_workers if self.threads is None else self.threads,
+                                  filename=filename, mtime=mtime)
 
-        self._recreate_7z(temp_dir)
+    def _has_any(self, arcnames: Iterator[str]) -> bool:
+        """Проверяет, есть ли в архиве элементы с такими именами (или внутри таких директорий)."""
+        prefixes = tuple(arcnames)
+        dir_prefixes = tuple(p + '/' for p in prefixes)
+        return any(name in prefixes or name.startswith(dir_prefixes) for name in self)
 
-    def _prepare_7z_temp(self) -> Path:
+    def _rewrite_tar(self, items: List[tuple], removed: Iterable[str] = ()):
         """
-        Подготавливает временную директорию для операций с 7z архивами.
-        Возвращает путь к временной директории.
+        Пересобирает tar потоково: элементы старого архива копируются по одному в новый
+        (кроме заменяемых и удаляемых), затем добавляются новые. Ничего не распаковывается на диск.
         """
-        self.cleanup()
-        self.temp_dir = self.path.parent / f"~temp_{self.path.stem}"
-        self.temp_dir.mkdir(parents=True, exist_ok=True)
+        prefixes = tuple(arcname for _, arcname in items) + tuple(removed)
+        dir_prefixes = tuple(p + '/' for p in prefixes)
 
-        if self.path.exists():
-            with py7zr.SevenZipFile(self.path, 'r', password=self.password) as zf:
-                zf.extractall(path=self.temp_dir)
+        def write(tmp: Path):
+            with self._tar_reader() as src, self._open_tar_write(tmp) as dst:
+                for member in src:
+                    if member.name in prefixes or member.name.startswith(dir_prefixes):
+                        continue
+                    dst.addfile(member, src.extractfile(member) if member.isreg() else None)
+                for source, arcname in items:
+                    dst.add(source, arcname=arcname)
+
+        self._rewrite(write)
 
-        return self.temp_dir
+    def _rewrite(self, write: Callable[[Path], Any]):
+        """Пишет новую версию архива во временный файл рядом и атомарно подменяет им архив."""
+        import tempfile
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{self.path.name}.", suffix='.tmp', dir=self.path.parent)
+        os.close(fd)
+        tmp = Path(tmp_name)
+        try:
+            write(tmp)
+            if self.path.exists():
+                shutil.copymode(self.path, tmp)
+            os.replace(tmp, self.path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
 
-    def _recreate_7z(self, temp_dir: Path):
+    def _rewrite_7z(self, items: List[tuple], removed: Iterable[str] = ()):
         """
-        Пересоздает 7z архив из временной директории.
-        
-        Параметры:
-        temp_dir - путь к временной директории с содержимым
+        Пересобирает 7z без распаковки на диск: сохраняемые элементы потоково переносятся
+        из старого архива в новый (во временном файле рядом), затем добавляются новые.
         """
-        with py7zr.SevenZipFile(self.path, 'w', password=self.password) as zf:
-            zf.writeall(temp_dir, arcname='')
-        self.cleanup()
+        prefixes = tuple(arcname for _, arcname in items) + tuple(removed)
+        dir_prefixes = tuple(p + '/' for p in prefixes)
+
+        def write(tmp: Path):
+            import tempfile
+            with py7zr.SevenZipFile(self.path, 'r', password=self.password) as src, \
+                 py7zr.SevenZipFile(tmp, 'w', filters=self._7z_filters(), password=self.password, dereference=True) as dst, \
+                 tempfile.TemporaryDirectory(dir=self.path.parent) as scratch:
+                survivors = [info for info in src.list()
+                             if not (info.filename in prefixes or info.filename.startswith(dir_prefixes))]
+                for info in survivors:
+                    if info.is_directory:
+                        dst.write(Path(scratch), arcname=info.filename)  # пустая директория-образец
+                targets = [info.filename for info in survivors if not info.is_directory]
+                if targets:
+                    for member in _stream_7z_members(src, targets, Path(scratch)):
+                        dst.writef(member.fileobj, member.name)
+                        member.discard()
+                for source, arcname in items:
+                    dst.writeall(source, arcname=arcname)
 
-    def extract(self, member: Optional[str] = None, path: Union[Path, str] = '.'):
+        self._rewrite(write)
+
+    def extract(self, member: Optional[str] = None, path: Union[Path, str] = '.', workers: Optional[int] = 1,
+                mode: str = 'overwrite', delete: bool = False):
         """
         Извлекает содержимое архива или конкретный элемент.
         
         Параметры:
         from_path - конкретный файл/директория для извлечения (опционально)
         to_path - целевая директория для извлечения (по умолчанию текущая)
+        workers - число потоков распаковки для zip и 7z (None - по числу ядер). Каждый поток
+                  открывает архив сам; для 7z параллелятся только независимые блоки (solid-архив
+                  из одного блока распаковывается в один поток). tar и gz/bz2/xz/zst/lz4 - один сжатый поток,
+                  rar распаковывает внешняя утилита, поэтому для них workers не влияет.
+        mode - 'overwrite' (по умолчанию) - записать все элементы заново; 'update' - только изменившиеся:
+               размер и время изменения элемента сравниваются с файлом в path (один проход os.scandir),
+               а при совпадении размера и расхождении времени - CRC, если формат его хранит (zip, 7z).
+               Совпавшие элементы не распаковываются
+        delete - только для mode='update': удалить из path файлы, которых нет в архиве
+                 (если задан member - только внутри него)
         """
+        if mode not in ('overwrite', 'update'):
+            raise ValueError(f"Неизвестный режим извлечения: {mode}")
         path = Path(path)
         path.mkdir(parents=True, exist_ok=True)
+        workers = workers or os.cpu_count() or 1
+
+        if mode == 'update':
+            self._extract_update(member, path, workers, delete)
+            return
+
+        if workers > 1 and self.format in ('zip', '7z') and self._extract_parallel(member, path, workers):
+            return
 
         if self.format == 'zip':
             # Используем pyzipper для корректной поддержки паролей при извлечении
@@ -378,16 +933,17 @@ class Archive:
                 else:
                     zf.extractall(path)
 
-        elif self.format in ('tar', 'tar.gz', 'tar.bz2'):
-            mode = 'r:' + self.format.split('.')[-1] if '.' in self.format else 'r'
-            with tarfile.open(self.path, mode) as tf:
+        elif self.format in _TAR_FORMATS:
+            entries: List[MemberInfo] = []
+            if member:
+                # индекс берётся до открытия: для tar.gz один проход строит и его, и точки доступа
+                entries = [e for e in self._load_index()[0] if e.name == member or e.name.startswith(member + '/')]
+                if not entries:
+                    raise ValueError(f"Элемент '{member}' не найден в архиве")
+            tf, close = self._open_tar_read(random_access=bool(member))
+            try:
                 if member:
-                    members: List[tarfile.TarInfo] = []
-                    for m in tf.getmembers():
-                        if m.name == member or m.name.startswith(member + '/'):
-                            members.append(m)
-                    if not members:
-                        raise ValueError(f"Элемент '{member}' не найден в архиве")
+                    members = self._tar_members(tf, entries)
                     
                     # Обработка предупреждений в Python 3.12+
                     if sys.version_info >= (3, 12):
@@ -399,6 +955,8 @@ class Archive:
                         tf.extractall(path=path, filter='data')
                     else:
                         tf.extractall(path=path)
+            finally:
+                close()
 
         elif self.format == 'rar':
             with rarfile.RarFile(self.path, 'r') as rf:  # type: ignore[reportUnknownMemberType]
@@ -411,17 +969,11 @@ class Archive:
                 else:
                     cast(Any, rf).extractall(path=path, pwd=self.password)  # type: ignore[no-any-return]
 
-        elif self.format == 'gz':
-            output_file = path / self.path.stem
-            with gzip.open(self.path, 'rb') as f_in:
-                with open(output_file, 'wb') as f_out:
-                    shutil.copyfileobj(f_in, f_out)
-
-        elif self.format == 'bz2':
+        elif self.format in _SINGLE_FORMATS:
             output_file = path / self.path.stem
-            with bz2.open(self.path, 'rb') as f_in:
+            with open_compressed(self.path, self.format) as f_in:
                 with open(output_file, 'wb') as f_out:
-                    shutil.copyfileobj(f_in, f_out)
+                    shutil.copyfileobj(f_in, f_out, CHUNK_SIZE)
 
         else:
             raise NotImplementedError(f"Извлечение не поддерживается для {self.format}")
@@ -430,6 +982,490 @@ class Archive:
         """Возвращает список файлов в архиве."""
         return list(self.__iter__())
 
+    def open(self, member: str, mode: str = 'rb') -> "MemberReader":
+        """
+        Открывает элемент архива на чтение без извлечения на диск.
+        Для zip/tar/rar и одиночных сжатых файлов данные распаковываются по мере чтения; элемент 7z
+        распаковывается в память (крупный - во временный файл), так как py7zr не умеет читать потоком.
+        
+        Параметры:
+        member - имя элемента в архиве
+        mode - только 'rb'
+        """
+        if mode != 'rb':
+            raise ValueError(f"Поддерживается только режим 'rb', получен '{mode}'")
+        not_found = ValueError(f"Элемент '{member}' не найден в архиве")
+
+        if self.format == 'zip':
+            zf = self._open_zip_read()
+            try:
+                name = member if member in zf.NameToInfo else member.replace('/', '\\')
+                if name not in zf.NameToInfo or zf.getinfo(name).is_dir():
+                    raise not_found
+                pwd = self.password.encode('utf-8') if self.password else None
+                return MemberReader(zf.open(name, pwd=pwd), zf.close)
+            except BaseException:
+                zf.close()
+                raise
+
+        elif self.format == '7z':
+            with py7zr.SevenZipFile(self.path, 'r', password=self.password) as zf:
+                infos = {info.filename: info for info in zf.list()}
+                if member not in infos or infos[member].is_directory:
+                    raise not_found
+                members = _stream_7z_members(zf, [member], None)
+                try:
+                    spooled = next(members)
+                finally:
+                    members.close()
+            return MemberReader(spooled.fileobj, spooled.discard)
+
+        elif self.format in _TAR_FORMATS:
+            entry = next((e for e in self._load_index()[0] if e.name == member), None)
+            if entry is None or entry.type not in ('file', 'link'):
+                raise not_found
+            tf, close = self._open_tar_read(random_access=True)
+            try:
+                stream = tf.extractfile(self._tar_members(tf, [entry])[0])
+                if stream is None:
+                    raise not_found
+                return MemberReader(stream, close)
+            except BaseException:
+                close()
+                raise
+
+        elif self.format == 'rar':
+            rf = rarfile.RarFile(self.path, 'r')  # type: ignore[reportUnknownMemberType]
+            try:
+                if member not in rf.namelist() or rf.getinfo(member).is_dir():  # type: ignore[reportUnknownMemberType]
+                    raise not_found
+                return MemberReader(rf.open(member, pwd=self.password), rf.close)  # type: ignore[reportUnknownMemberType]
+            except BaseException:
+                rf.close()
+                raise
+
+        elif self.format in _SINGLE_FORMATS:
+            if member != self.path.stem:
+                raise not_found
+            return MemberReader(open_compressed(self.path, self.format))
+
+        else:
+            raise NotImplementedError(f"Чтение элементов не поддерживается для {self.format}")
+
+    def _extract_parallel(self, member: Optional[str], path: Path, workers: int,
+                          only: Optional[FrozenSet[str]] = None) -> bool:
+        """
+        Распаковывает элементы zip/7z пулом потоков (zlib/lzma отпускают GIL).
+        Структура каталогов создаётся заранее одним проходом, чтобы потоки не гонялись за mkdir.
+        only - распаковать только элементы с этими именами.
+        Возвращает False, если распараллелить нечего - тогда работает обычное извлечение.
+        """
+        def matches(name: str) -> bool:
+            return (member is None or name == member or name.startswith(member + '/')) and (only is None or name in only)
+
+        if self.format == 'zip':
+            with self._open_zip_read() as zf:
+                entries = [info for info in zf.infolist() if matches(info.filename)]
+            if member and not entries:
+                raise ValueError(f"Элемент '{member}' не найден в архиве")
+            files = [info for info in entries if not info.is_dir()]
+            if len(files) < 2:
+                return False
+            _make_dirs(path, [info.filename for info in entries if info.is_dir()], [info.filename for info in files])
+            pwd = self.password.encode('utf-8') if self.password else None
+
+            def extract_zip(batch: List[Any]) -> None:
+                with self._open_zip_read() as zf:
+                    for info in batch:
+                        with zf.open(info, pwd=pwd) as src, open(_safe_join(path, info.filename), 'wb') as dst:
+                            shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+            _run_batches(extract_zip, _balance(files, workers, lambda info: info.compress_size))
+            return True
+
+        with py7zr.SevenZipFile(self.path, 'r', password=self.password) as zf:
+            entries = [f for f in zf.files if matches(f.filename)]
+        if member and not entries:
+            raise ValueError(f"Элемент '{member}' не найден в архиве")
+        # Внутри блока (folder) данные сжаты одним потоком - делить можно только по блокам
+        blocks: Dict[int, List[Any]] = {}
+        for entry in entries:
+            blocks.setdefault(id(entry.folder), []).append(entry)
+        if len(blocks) < 2:
+            return False
+        _make_dirs(path, [f.filename for f in entries if f.is_directory], [f.filename for f in entries if not f.is_directory])
+
+        def extract_7z(batch: List[List[Any]]) -> None:
+            with py7zr.SevenZipFile(self.path, 'r', password=self.password) as zf:
+                zf.extract(path=path, targets=[f.filename for block in batch for f in block])
+
+        _run_batches(extract_7z, _balance(list(blocks.values()), workers, lambda block: sum(f.compressed or 0 for f in block)))
+        return True
+
+    def _extract_update(self, member: Optional[str], path: Path, workers: int, delete: bool) -> None:
+        """extract(mode='update'): сравнивает индекс с деревом в path и распаковывает только изменившееся."""
+        entries = [e for e in self._load_index()[0]
+                   if member is None or e.name.rstrip('/') == member or e.name.startswith(member + '/')]
+        if member and not entries:
+            raise ValueError(f"Элемент '{member}' не найден в архиве")
+        root = _safe_join(path, member) if member else path
+        files, dirs = _scan_tree(root)
+
+        changed: List[MemberInfo] = []
+        for entry in entries:
+            target = _safe_join(path, entry.name)
+            if entry.type == 'dir':
+                target.mkdir(parents=True, exist_ok=True)
+            elif not _up_to_date(entry, target, files.pop(str(target), None)):
+                changed.append(entry)
+
+        if delete:
+            # В files остались только пути, которых нет в архиве
+            for name in files:
+                os.unlink(name)
+            kept = {str(_safe_join(path, name)) for name in self._load_index()[1]}
+            for name in sorted(dirs, reverse=True):
+                if name not in kept and not any(os.scandir(name)):
+                    os.rmdir(name)
+
+        if changed:
+            self._extract_entries(changed, path, workers)
+
+    def _extract_entries(self, entries: List[MemberInfo], path: Path, workers: int) -> None:
+        """Распаковывает перечисленные элементы (не каталоги) поверх существующих файлов."""
+        names = frozenset(e.name for e in entries)
+        if self.format == 'zip':
+            if not (workers > 1 and self._extract_parallel(None, path, workers, names)):
+                pwd = self.password.encode('utf-8') if self.password else None
+                with self._open_zip_read() as zf:
+                    for entry in entries:
+                        zf.extract(entry.name, path, pwd=pwd)
+            # zipfile не восстанавливает время изменения, а без него следующее сравнение не сойдётся
+            for entry in entries:
+                if entry.mtime is not None:
+                    os.utime(_safe_join(path, entry.name), (entry.mtime, entry.mtime))
+
+        elif self.format == '7z':
+            if not (workers > 1 and self._extract_parallel(None, path, workers, names)):
+                with py7zr.SevenZipFile(self.path, 'r', password=self.password) as zf:
+                    zf.extract(path=path, targets=list(names))
+
+        elif self.format in _TAR_FORMATS:
+            tf, close = self._open_tar_read(random_access=True)
+            try:
+                members = self._tar_members(tf, entries)
+                if sys.version_info >= (3, 12):
+                    tf.extractall(path=path, members=members, filter='data')
+                else:
+                    tf.extractall(path=path, members=members)
+            finally:
+                close()
+
+        elif self.format == 'rar':
+            with rarfile.RarFile(self.path, 'r') as rf:  # type: ignore[reportUnknownMemberType]
+                cast(Any, rf).extractall(path=path, members=sorted(names), pwd=self.password)  # type: ignore[no-any-return]
+
+        else:
+            # одиночный сжатый файл: размер содержимого в индексе неизвестен, поэтому он всегда пишется заново
+            self.extract(path=path)
+
+    def search(self, pattern: Union[str, "re.Pattern[str]"], members_glob: Optional[str] = None, regex: bool = True,
+               encoding: Optional[str] = None, workers: Optional[int] = 1) -> Iterator[SearchHit]:
+        """
+        Ищет строки с pattern в элементах архива без распаковки на диск (как grep) и отдаёт
+        SearchHit(элемент, номер строки, строка) по мере нахождения.
+        Элементы распаковываются потоком за один проход по архиву; совпадение ищется в пределах
+        строки, поэтому границы блоков чтения на результат не влияют. Двоичные элементы (нулевые
+        байты в начале) пропускаются, кодировка текстовых определяется по их началу.
+        
+        Параметры:
+        pattern - регулярное выражение (строка или скомпилированное); ^ и $ - границы строки
+        members_glob - шаблон имён элементов в стиле fnmatch ('*.log', 'conf/*'), None - все
+        regex - False: pattern ищется как обычная подстрока
+        encoding - кодировка элементов (None - определять для каждого)
+        workers - число потоков для zip и 7z (None - по числу ядер); строки элемента идут по порядку,
+                  а сами элементы - в порядке готовности
+        """
+        compiled = _compile_search(pattern, regex)
+        names = [e.name for e in self._load_index()[0]
+                 if e.type == 'file' and (members_glob is None or fnmatch.fnmatchcase(e.name, members_glob))]
+        workers = workers or os.cpu_count() or 1
+        if workers > 1 and self.format in ('zip', '7z') and len(names) > 1:
+            yield from self._search_parallel(names, compiled, encoding, workers)
+            return
+        for name, stream in self._member_streams(names):
+            for line_no, line in _scan_lines(stream, compiled, encoding):
+                yield SearchHit(name, line_no, line)
+
+    def _member_streams(self, names: List[str]) -> Iterator[Tuple[str, Any]]:
+        """Бинарные потоки элементов names по порядку архива; сжатый tar и 7z распаковываются один раз."""
+        wanted = set(names)
+        if self.format == 'zip':
+            pwd = self.password.encode('utf-8') if self.password else None
+            with self._open_zip_read() as zf:
+                for info in zf.infolist():
+                    name = info.filename.replace('\\', '/')
+                    if name in wanted:
+                        with zf.open(info, pwd=pwd) as stream:
+                            yield name, stream
+        elif self.format in _TAR_FORMATS:
+            with self._tar_reader() as tf:
+                for info in tf:
+                    name = info.name.replace('\\', '/')
+                    if name in wanted and info.isreg():
+                        yield name, tf.extractfile(info)
+        elif self.format == '7z':
+            if not names:
+                return
+            with py7zr.SevenZipFile(self.path, 'r', password=self.password) as zf:
+                members = _stream_7z_members(zf, names, None)
+                try:
+                    for member in members:
+                        try:
+                            yield member.name, member.fileobj
+                        finally:
+                            member.discard()
+                finally:
+                    members.close()
+        else:
+            for name in names:
+                with self.open(name) as stream:
+                    yield name, stream
+
+    def _search_parallel(self, names: List[str], pattern: "re.Pattern[str]", encoding: Optional[str],
+                         workers: int) -> Iterator[SearchHit]:
+        """Поиск пулом потоков: каждый открывает архив сам; для 7z элементы делятся по блокам."""
+        if self.format == 'zip':
+            with self._open_zip_read() as zf:
+                sizes = {info.filename.replace('\\', '/'): info.compress_size for info in zf.infolist()}
+            batches = _balance(names, workers, lambda name: sizes[name])
+        else:
+            with py7zr.SevenZipFile(self.path, 'r', password=self.password) as zf:
+                files = {f.filename: f for f in zf.files}
+            blocks: Dict[int, List[str]] = {}
+            for name in names:
+                blocks.setdefault(id(files[name].folder), []).append(name)
+            batches = [[name for block in batch for name in block] for batch in
+                       _balance(list(blocks.values()), workers, lambda block: sum(files[n].compressed or 0 for n in block))]
+
+        results: "queue.Queue[Any]" = queue.Queue()
+        stop = threading.Event()
+        done = object()
+
+        def scan(batch: List[str]) -> None:
+            try:
+                for name, stream in self._member_streams(batch):
+                    if stop.is_set():
+                        break
+                    hits = [SearchHit(name, line_no, line) for line_no, line in _scan_lines(stream, pattern, encoding)]
+                    if hits:
+                        results.put(hits)
+            except BaseException as e:
+                results.put(e)
+            finally:
+                results.put(done)
+
+        threads = [threading.Thread(target=scan, args=(batch,), daemon=True) for batch in batches]
+        for thread in threads:
+            thread.start()
+        try:
+            running = len(threads)
+            while running:
+                item = results.get()
+                if item is done:
+                    running -= 1
+                elif isinstance(item, BaseException):
+                    raise item
+                else:
+                    yield from item
+        finally:
+            # потребитель мог остановиться раньше: потоки доделывают текущий элемент и выходят
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    def verify(self, workers: Optional[int] = 1) -> VerifyReport:
+        """
+        Проверяет целостность архива без записи на диск: данные распаковываются в пустой приёмник.
+        zip и 7z - CRC каждого элемента (пулом потоков при workers > 1; 7z делится по блокам);
+        tar.* - один потоковый проход: заголовки, размеры данных и маркер конца архива
+        (а для сжатого tar - и контрольная сумма самого потока); gz/bz2/xz/zst/lz4 - проверка
+        до конца потока вместе с его контрольными суммами. Ошибки не выбрасываются, а попадают в отчёт.
+        
+        Параметры:
+        workers - число потоков для zip и 7z (None - по числу ядер)
+        """
+        self.path.stat()  # отсутствующий архив - это FileNotFoundError, а не повреждение
+        workers = workers or os.cpu_count() or 1
+        started = time.perf_counter()
+        bad: List[Tuple[str, str]] = []
+        checked = [0, 0]  # элементы, байты
+        try:
+            if self.format == 'zip':
+                self._verify_zip(workers, bad, checked)
+            elif self.format == '7z':
+                self._verify_7z(workers, bad, checked)
+            elif self.format in _TAR_FORMATS:
+                self._verify_tar(bad, checked)
+            else:
+                for entry in self._load_index()[0]:
+                    if entry.type != 'file':
+                        continue
+                    checked[0] += 1
+                    try:
+                        with self.open(entry.name) as stream:
+                            checked[1] += _drain(stream)
+                    except Exception as e:
+                        bad.append((entry.name, _describe(e)))
+        except Exception as e:
+            bad.append(('', _describe(e)))
+        return VerifyReport(bad, checked[0], checked[1], time.perf_counter() - started)
+
+    def _verify_zip(self, workers: int, bad: List[Tuple[str, str]], checked: List[int]) -> None:
+        with self._open_zip_read() as zf:
+            infos = [info for info in zf.infolist() if not info.is_dir()]
+        order = {info.filename: i for i, info in enumerate(infos)}
+        pwd = self.password.encode('utf-8') if self.password else None
+        lock = threading.Lock()
+
+        def check_batch(batch: List[Any]) -> None:
+            found: List[Tuple[str, str]] = []
+            size = 0
+            with self._open_zip_read() as zf:
+                for info in batch:
+                    try:
+                        # CRC проверяет сам zipfile, дочитав элемент до конца
+                        with zf.open(info, pwd=pwd) as stream:
+                            size += _drain(stream)
+                    except Exception as e:
+                        found.append((info.filename, _describe(e)))
+            with lock:
+                bad.extend(found)
+                checked[0] += len(batch)
+                checked[1] += size
+
+        if infos:
+            _run_batches(check_batch, _balance(infos, workers, lambda info: info.compress_size))
+        bad.sort(key=lambda item: order.get(item[0], -1))
+        for i, (name, reason) in enumerate(bad):
+            bad[i] = (name.replace('\\', '/'), reason)
+
+    def _verify_7z(self, workers: int, bad: List[Tuple[str, str]], checked: List[int]) -> None:
+        """
+        Блоки 7z распаковываются в пустой приёмник; py7zr сверяет CRC и прерывает блок на первой ошибке,
+        поэтому после сбоя проверка продолжается со следующего блока, а хвост повреждённого блока помечается.
+        """
+        with py7zr.SevenZipFile(self.path, 'r', password=self.password) as zf:
+            files = [f for f in zf.files if not f.is_directory]
+        order = {f.filename: i for i, f in enumerate(files)}
+        blocks: Dict[int, List[Any]] = {}
+        for f in files:
+            blocks.setdefault(id(f.folder), []).append(f)
+        lock = threading.Lock()
+
+        def check_batch(batch: List[List[Any]]) -> None:
+            pending = sorted(batch, key=lambda block: order[block[0].filename])
+            done: Dict[str, int] = {}
+            found: List[Tuple[str, str]] = []
+            while pending:
+                factory = _NullFactory()
+                try:
+                    with py7zr.SevenZipFile(self.path, 'r', password=self.password) as zf:
+                        zf.extract(targets=[f.filename for block in pending for f in block], factory=factory)
+                    error = None
+                except Exception as e:
+                    error = e
+                done.update(factory.checked)
+                if error is None:
+                    break
+                # py7zr распаковывает блоки параллельно, так что сбойный блок - не обязательно первый
+                name = error.args[2] if isinstance(error, py7zr.exceptions.CrcError) and len(error.args) > 2 else None
+                failed = next((block for block in pending if any(f.filename == name for f in block)), None)
+                if failed is None:
+                    failed = next((block for block in pending if any(f.filename not in done for f in block)), None)
+                if failed is None:
+                    found.append(('', _describe(error)))
+                    break
+                unchecked = [f.filename for f in failed if f.filename not in done]
+                first = name if name in unchecked else unchecked[0]
+                found.append((first, _describe(error)))
+                found.extend((other, "не проверен: блок 7z повреждён раньше") for other in unchecked if other != first)
+                pending = [block for block in pending
+                           if block is not failed and any(f.filename not in done for f in block)]
+            with lock:
+                bad.extend(found)
+                checked[0] += sum(len(block) for block in batch)
+                checked[1] += sum(done.values())
+
+        if blocks:
+            _run_batches(check_batch, _balance(list(blocks.values()), workers,
+                                               lambda block: sum(f.compressed or 0 for f in block)))
+        bad.sort(key=lambda item: order.get(item[0], -1))
+
+    def _verify_tar(self, bad: List[Tuple[str, str]], checked: List[int]) -> None:
+        """
+        Один проход по tar. tarfile молча заканчивает чтение на повреждённом заголовке посреди архива,
+        поэтому после последнего элемента должны идти только нулевые блоки маркера конца.
+        """
+        with self._tar_reader() as tf:
+            for info in tf:
+                if not info.isreg():
+                    continue
+                checked[0] += 1
+                try:
+                    stream = tf.extractfile(info)
+                    size = _drain(stream) if stream is not None else 0
+                except Exception as e:
+                    bad.append((info.name, _describe(e)))
+                    return  # данные оборвались - дальше заголовков нет
+                checked[1] += size
+                if size != info.size:
+                    bad.append((info.name, f"прочитано {size} байт из {info.size}"))
+            end = tf.offset
+            tf.fileobj.seek(end)
+            trailer = 0
+            while chunk := tf.fileobj.read(CHUNK_SIZE):
+                if chunk.count(0) != len(chunk):
+                    offset = end + trailer + len(chunk) - len(chunk.lstrip(b'\0'))
+                    bad.append(('', f"повреждённый заголовок по смещению {offset}"))
+                    return
+                trailer += len(chunk)
+            if trailer < 2 * tarfile.BLOCKSIZE:
+                bad.append(('', "нет маркера конца архива: архив обрезан"))
+
+    def read_bytes(self, member: str) -> bytes:
+        """Возвращает содержимое элемента архива как байты."""
+        with self.open(member) as f:
+            return f.read()
+
+    def read_text(self, member: str, encoding: Optional[str] = None) -> str:
+        """Возвращает содержимое элемента как строку; кодировка определяется автоматически, если не указана."""
+        data = self.read_bytes(member)
+        if encoding is None:
+            encoding, _ = sniff_encoding(data)
+        return io.TextIOWrapper(io.BytesIO(data), encoding=encoding).read()
+
+    def member(self, name: str, encoding: Optional[str] = None) -> "ArchiveMember":
+        """Элемент архива как поток: archive.member('a.txt') > File('a.txt')."""
+        return ArchiveMember(self, name, encoding)
+
+    def __truediv__(self, name: str) -> "ArchiveMember":
+        return self.member(name)
+
+    def _open_zip_read(self) -> Any:
+        """Открывает zip на чтение; с паролем - через pyzipper (AES-пароли), если он установлен."""
+        if not self.password:
+            # стандартный zipfile читает и элементы zstd, которых не знает pyzipper
+            return zipfile.ZipFile(self.path, 'r')
+        try:
+            import pyzipper  # type: ignore[import-not-found]
+        except ImportError:
+            return zipfile.ZipFile(self.path, 'r')
+        zf = pyzipper.AESZipFile(self.path, 'r')  # type: ignore[reportUnknownMemberType]
+        if self.password:
+            zf.pwd = self.password.encode('utf-8')
+        return zf
+
     
     def create(self):
         """
@@ -454,20 +1490,21 @@ class Archive:
                 with zipfile.ZipFile(self.path, 'w', compression=zipfile.ZIP_DEFLATED) as _:
                     pass
         elif self.format == '7z':
-            with py7zr.SevenZipFile(self.path, 'w', password=self.password) as _:
+            with py7zr.SevenZipFile(self.path, 'w', filters=self._7z_filters(), password=self.password) as _:
+                pass
+        elif self.format in _TAR_FORMATS:
+            with self._open_tar_write(self.path) as _:
                 pass
-        elif self.format in ('tar', 'tar.gz', 'tar.bz2'):
-            mode = 'w'
-            if self.format == 'tar.gz':
-                mode = 'w:gz'
-            elif self.format == 'tar.bz2':
-                mode = 'w:bz2'
-            with tarfile.open(self.path, mode) as _:
+        elif self.format in _SINGLE_FORMATS:
+            with self._compressor(self.path, self.path.stem) as _:
                 pass
+        self._forget_index()
         return self
     
     @classmethod
-    def create_from(cls, path: Union[Path, str], format: str, files: List[Union[Path, str]], password: Optional[str] = None):
+    def create_from(cls, path: Union[Path, str], format: str, files: List[Union[Path, str]], password: Optional[str] = None,
+                    level: Optional[int] = None, threads: Optional[int] = None, long_window: bool = False,
+                    compression: Optional[str] = None):
         """
         Создает новый архив с указанными файлами.
         
@@ -476,13 +1513,14 @@ class Archive:
         format - формат архива
         files - список файлов/директорий для добавления
         password - пароль (опционально)
+        level, threads, long_window, compression - настройки сжатия (см. Archive)
         
         Возвращает объект Archive.
         """
-        archive = cls(path, format, password)
+        archive = cls(path, format, password, level=level, threads=threads, long_window=long_window, compression=compression)
         
         # Поддерживаемые форматы для создания
-        supported_formats = ['zip', '7z', 'tar', 'tar.gz', 'tar.bz2']
+        supported_formats = ['zip', '7z', *_TAR_FORMATS, *_SINGLE_FORMATS]
         
         if format not in supported_formats:
             raise NotImplementedError(f"Создание архивов формата {format} не поддерживается")
@@ -493,26 +1531,735 @@ class Archive:
                 with zipfile.ZipFile(archive.path, 'w') as _:
                     pass  # Создаем пустой zip-архив
             elif format == '7z':  # type: ignore[reportConstantCondition]
-                with py7zr.SevenZipFile(archive.path, 'w', password=password) as _:
+                with py7zr.SevenZipFile(archive.path, 'w', filters=archive._7z_filters(), password=password) as _:
                     pass  # Создаем пустой 7z-архив
-            elif format in ('tar', 'tar.gz', 'tar.bz2'):  # type: ignore[reportConstantCondition]
-                mode = 'w'
-                if format == 'tar.gz':
-                    mode = 'w:gz'
-                elif format == 'tar.bz2':
-                    mode = 'w:bz2'
-                with tarfile.open(archive.path, mode) as _:
-                    pass  # Создаем пустой tar-архив
+            else:
+                archive.create()  # пустой tar/gz
             return archive
 
-        # Добавляем файлы, если они есть
-        for item in files:
-            item = Path(item)
-            if item.is_dir():
-                archive._add_directory(item)
-            else:
-                archive.add(item)
+        # Добавляем файлы за одну сессию записи
+        archive.add_many(files)
         return archive
     
     def __str__(self) -> str:
-        return str(self.path)
\ No newline at end of file
+        return str(self.path)
+
+
+class ArchiveWriter:
+    """Накопитель для Archive.writer(): добавления применяются одним Archive.add_many при выходе."""
+
+    def __init__(self, archive: Archive):
+        self.archive = archive
+        self._paths: List[Union[Path, str]] = []
+        self._arcnames: List[Optional[str]] = []
+
+    def add(self, path: Union[Path, str], arcname: Optional[str] = None) -> "ArchiveWriter":
+        self._paths.append(path)
+        self._arcnames.append(arcname)
+        return self
+
+    def __enter__(self) -> "ArchiveWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.archive.add_many(self._paths, self._arcnames)
+
+
+def stream_archive(sources: List[Union[Path, str]], format: str, fileobj: Any, level: Optional[int] = None,
+                   threads: Optional[int] = None, long_window: bool = False, compression: Optional[str] = None) -> None:
+    """
+    Пишет архив из sources прямо в поток fileobj (канал, сокет, тело HTTP-запроса) без временного файла.
+    От fileobj нужен только write: перемотки нет, zip пишется с дескрипторами данных после элементов,
+    tar - в потоковом режиме tarfile поверх потока кодека. Файлы читаются блоками по CHUNK_SIZE,
+    так что память ограничена блоком и буферами кодека, а не размером архива. fileobj не закрывается.
+    
+    Параметры:
+    sources - файлы и директории (директории - рекурсивно, в архиве - под своим именем)
+    format - 'zip', 'tar', 'tar.gz', 'tar.bz2', 'tar.xz', 'tar.zst', 'tar.lz4'
+             или 'gz', 'bz2', 'xz', 'zst', 'lz4' для одного файла
+    fileobj - бинарный поток, открытый на запись
+    level, threads, long_window, compression - настройки сжатия (см. Archive)
+    """
+    for _ in _write_stream(sources, format, fileobj, level, threads, long_window, compression):
+        pass
+
+
+def stream_archive_chunks(sources: List[Union[Path, str]], format: str, level: Optional[int] = None,
+                          threads: Optional[int] = None, long_window: bool = False,
+                          compression: Optional[str] = None) -> Iterator[bytes]:
+    """
+    То же, что stream_archive, но генератор: отдаёт архив кусками байт по мере сжатия
+    (например, как тело запроса с chunked-передачей). Пока потребитель не взял кусок, чтение дальше не идёт.
+    """
+    sink = _ChunkSink()
+    for _ in _write_stream(sources, format, sink, level, threads, long_window, compression):
+        if sink.pending:
+            yield sink.take()
+    if sink.pending:
+        yield sink.take()
+
+
+def _write_stream(sources: List[Union[Path, str]], format: str, fileobj: Any, level: Optional[int],
+                  threads: Optional[int], long_window: bool, compression: Optional[str]) -> Iterator[None]:
+    """Пишет архив в fileobj, уступая управление после каждого блока данных (для stream_archive_chunks)."""
+    if format not in ('zip',) + _TAR_FORMATS + _SINGLE_FORMATS:
+        raise NotImplementedError(f"Потоковая запись не поддерживается для {format}")
+    if compression is not None and compression not in _ZIP_METHODS:
+        raise ValueError(f"Неизвестный метод сжатия zip: {compression}")
+    paths = [Path(source) for source in sources]
+    # всё проверяется до первого байта: оборванный на середине поток приёмнику уже не исправить
+    for source in paths:
+        if not source.exists():
+            raise FileNotFoundError(f"Источник не найден: {source}")
+    if format in _SINGLE_FORMATS and (len(paths) != 1 or not paths[0].is_file()):
+        raise ValueError(f"Архив {format} может содержать только один файл")
+
+    if format == 'zip':
+        method = _resolve_zip_method(compression)
+        with zipfile.ZipFile(fileobj, 'w', compression=method, compresslevel=level) as zf:
+            for source, arcname in _walk_sources(paths):
+                if source.is_dir():
+                    zf.write(source, arcname)
+                    yield
+                    continue
+                info = zipfile.ZipInfo.from_file(source, arcname)
+                info.compress_type = method
+                _set_zip_level(info, level)
+                with open(source, 'rb') as src, zf.open(info, 'w') as dst:
+                    while chunk := src.read(CHUNK_SIZE):
+                        dst.write(chunk)
+                        yield
+
+    elif format in _SINGLE_FORMATS:
+        source = paths[0]
+        with open(source, 'rb') as src, \
+                _stream_compressor(fileobj, format, source.name, source.stat().st_mtime, level, threads, long_window) as dst:
+            while chunk := src.read(CHUNK_SIZE):
+                dst.write(chunk)
+                yield
+
+    else:
+        codec = format[4:]
+        compressor = _stream_compressor(fileobj, codec, '', None, level, threads, long_window) if codec else nullcontext(fileobj)
+        with compressor as raw, tarfile.open(fileobj=raw, mode='w|') as tf:
+            for source, arcname in _walk_sources(paths):
+                yield from _stream_tar_member(tf, source, arcname)
+
+
+def _walk_sources(paths: List[Path]) -> Iterator[Tuple[Path, str]]:
+    """Источники и содержимое директорий (вместе с самими директориями) по порядку имён, как tarfile.add."""
+    for root in paths:
+        pending = [(root, root.name)]
+        while pending:
+            source, arcname = pending.pop()
+            yield source, arcname
+            if source.is_dir() and not source.is_symlink():
+                pending.extend((child, f"{arcname}/{child.name}") for child in sorted(source.iterdir(), reverse=True))
+
+
+def _stream_tar_member(tf: Any, source: Path, arcname: str) -> Iterator[None]:
+    """
+    Дописывает элемент в tar, открытый в режиме 'w|'. Данные файла копируются блоками с yield
+    после каждого; tf.members не пополняется, чтобы память не росла с числом элементов.
+    """
+    info = tf.gettarinfo(str(source), arcname)
+    if info is None:  # сокеты и прочее, что tar не хранит
+        return
+    if not info.isreg():
+        tf.addfile(info)
+        yield
+        return
+    header = info.tobuf(tf.format, tf.encoding, tf.errors)
+    tf.fileobj.write(header)
+    tf.offset += len(header)
+    with open(source, 'rb') as src:
+        remaining = info.size
+        while remaining:
+            chunk = src.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                raise OSError(f"Файл {source} стал короче во время записи в архив")
+            tf.fileobj.write(chunk)
+            remaining -= len(chunk)
+            yield
+    blocks, rest = divmod(info.size, tarfile.BLOCKSIZE)
+    if rest:
+        tf.fileobj.write(tarfile.NUL * (tarfile.BLOCKSIZE - rest))
+        blocks += 1
+    tf.offset += blocks * tarfile.BLOCKSIZE
+
+
+def _stream_compressor(fileobj: Any, codec: str, filename: str, mtime: Optional[float], level: Optional[int],
+                       threads: Optional[int], long_window: bool) -> Any:
+    if codec == 'gz':
+        return ParallelGzipWriter(fileobj, level=6 if level is None else level, workers=threads, filename=filename, mtime=mtime)
+    return open_compressed(fileobj, codec, 'wb', level, threads, long_window)
+
+
+def _resolve_zip_method(compression: Optional[str]) -> int:
+    method = _ZIP_METHODS[compression or 'deflate']
+    if method == _ZIP_METHODS['zstd'] and not hasattr(zipfile, 'ZIP_ZSTANDARD'):
+        raise ImportError("zstd support requires the 'backports.zstd' package")
+    return method
+
+
+def _set_zip_level(info: Any, level: Optional[int]) -> None:
+    """Уровень сжатия элемента, открываемого через ZipFile.open(info, 'w'): с Python 3.13 (и в backports.zstd) - compress_level."""
+    setattr(info, 'compress_level' if hasattr(info, 'compress_level') else '_compresslevel', level)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Приёмник stream_archive_chunks: копит записанное до следующего take(); перемотки нет, как у канала."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self.pending = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self.pending += len(chunk)
+        return len(chunk)
+
+    def take(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        self.pending = 0
+        return data
+
+
+def _compile_search(pattern: Union[str, "re.Pattern[str]"], regex: bool) -> "re.Pattern[str]":
+    """Шаблон Archive.search: ^ и $ должны совпадать на границах строк, а не только всего блока."""
+    if isinstance(pattern, re.Pattern):
+        return re.compile(pattern.pattern, pattern.flags | re.MULTILINE)
+    return re.compile(pattern if regex else re.escape(pattern), re.MULTILINE)
+
+
+def _scan_lines(stream: Any, pattern: "re.Pattern[str]", encoding: Optional[str]) -> Iterator[Tuple[int, str]]:
+    """
+    Строки потока с совпадением pattern: (номер строки, строка). Текст декодируется блоками
+    по CHUNK_SIZE, шаблон ищется по блоку целиком (без цикла по строкам в Python), а неполная
+    последняя строка блока переносится в следующий. Двоичный поток не читается дальше первого блока.
+    """
+    sample = stream.read(CHUNK_SIZE)
+    if check_bom(sample) is None and b'\0' in sample:
+        return
+    if encoding is None:
+        encoding, tier = sniff_encoding(sample, complete=len(sample) < CHUNK_SIZE)
+        if tier == 'ascii':
+            encoding = 'utf-8'  # в начале только ASCII - дальше может быть что угодно из надмножеств
+    decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder(encoding)(errors='replace'), translate=True)
+    line_no = 1
+    pending: List[str] = []
+    while True:
+        final = not sample
+        chunk = decoder.decode(sample, final=final)
+        if not final and '\n' not in chunk:
+            pending.append(chunk)  # очень длинная строка: копим без повторных склеек
+            sample = stream.read(CHUNK_SIZE)
+            continue
+        pending.append(chunk)
+        text = ''.join(pending)
+        end = len(text) if final else text.rfind('\n') + 1
+        pos = counted = 0
+        while pos < end:
+            match = pattern.search(text, pos, end)
+            if match is None or (match.start() == end and text[end - 1] == '\n'):
+                break  # пустое совпадение за последним переводом строки - это уже следующая строка
+            start = text.rfind('\n', pos, match.start()) + 1 or pos
+            stop = text.find('\n', match.start(), end)
+            if stop == -1:
+                stop = end
+            # совпадение, захватившее перевод строки, проверяется заново в пределах своей строки
+            if match.end() <= stop or pattern.search(text, start, stop):
+                line_no += text.count('\n', counted, start)
+                counted = start
+                yield line_no, text[start:stop]
+            pos = stop + 1
+        line_no += text.count('\n', counted, end)
+        pending = [text[end:]]
+        if final:
+            return
+        sample = stream.read(CHUNK_SIZE)
+
+
+def _strip_zip64_extra(extra: bytes) -> bytes:
+    """Убирает из extra-поля записи zip64 (id 1); у zipfile своя такая функция, но она приватная и менялась между версиями."""
+    fields = []
+    pos = 0
+    while pos + 4 <= len(extra):
+        xid, xlen = struct.unpack('<HH', extra[pos:pos + 4])
+        if xid != 1:
+            fields.append(extra[pos:pos + 4 + xlen])
+        pos += 4 + xlen
+    return b''.join(fields) + extra[pos:]
+
+
+# Раскладка записей zip по APPNOTE.TXT (4.3.7, 4.3.12, 4.3.14-4.3.16): своя, а не приватные константы zipfile
+_ZIP_LOCAL = struct.Struct('<4sHHHHHLLLHH')
+_ZIP_CENTRAL = struct.Struct('<4sBBBBHHHHLLLHHHHHLL')
+_ZIP_END = struct.Struct('<4sHHHHLLH')
+_ZIP64_END = struct.Struct('<4sQHHLLQQQQ')
+_ZIP64_LOCATOR = struct.Struct('<4sLQL')
+_ZIP_LIMIT = 0xFFFFFFFF
+
+
+def _read_zip_end(fp: Any) -> Tuple[int, int, int, int, bytes]:
+    """
+    Конец zip: (позиция центрального каталога в файле, его размер, число записей,
+    сдвиг смещений из-за данных перед архивом, комментарий архива).
+    """
+    size = fp.seek(0, os.SEEK_END)
+    tail_start = max(size - _ZIP_END.size - 0xFFFF, 0)
+    fp.seek(tail_start)
+    tail = fp.read()
+    pos = tail.rfind(b'PK\x05\x06')
+    if pos < 0 or len(tail) - pos < _ZIP_END.size:
+        raise zipfile.BadZipFile("Не найден конец центрального каталога zip")
+    _, _, _, _, count, cd_size, cd_offset, comment_len = _ZIP_END.unpack_from(tail, pos)
+    comment = tail[pos + _ZIP_END.size:pos + _ZIP_END.size + comment_len]
+    locator = pos - _ZIP64_LOCATOR.size
+    if locator >= 0 and tail[locator:locator + 4] == b'PK\x06\x07':
+        end64 = _ZIP64_LOCATOR.unpack_from(tail, locator)[2]
+        fp.seek(end64)
+        record = fp.read(_ZIP64_END.size)
+        if len(record) != _ZIP64_END.size or record[:4] != b'PK\x06\x06':
+            raise zipfile.BadZipFile("Повреждён конец центрального каталога zip64")
+        count, cd_size, cd_offset = _ZIP64_END.unpack(record)[7:]
+        return cd_offset, cd_size, count, 0, comment
+    # данные перед архивом (самораспаковывающийся zip): смещения в каталоге считаются от начала архива
+    base = tail_start + pos - cd_size - cd_offset
+    return cd_offset + base, cd_size, count, base, comment
+
+
+class _RawZipWriter:
+    """
+    Запись zip из готовых элементов других zip: сжатые (и, возможно, зашифрованные) данные
+    копируются байт в байт, локальные заголовки, центральный каталог и его конец пишутся здесь же,
+    без вмешательства во внутреннее состояние ZipFile. В режиме 'a' новые элементы пишутся
+    на место центрального каталога, прежние записи каталога сохраняются как есть.
+    """
+
+    def __init__(self, path: Union[Path, str], mode: str = 'w'):
+        self._central = bytearray()
+        self._count = 0
+        self._base = 0
+        self._comment = b''
+        if mode == 'a' and os.path.exists(path):
+            self._fp = open(path, 'r+b')
+            try:
+                position, size, self._count, self._base, self._comment = _read_zip_end(self._fp)
+                self._fp.seek(position)
+                self._central += self._fp.read(size)
+                self._fp.seek(position)
+            except BaseException:
+                self._fp.close()
+                raise
+        else:
+            self._fp = open(path, 'wb')
+
+    def __enter__(self) -> "_RawZipWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._fp.close()
+
+    def copy(self, src: Any, info: Any, name: str) -> None:
+        """Переносит запись info из открытого в двоичном режиме zip src под именем name."""
+        src.seek(info.header_offset)
+        header = src.read(_ZIP_LOCAL.size)
+        if len(header) != _ZIP_LOCAL.size or header[:4] != b'PK\x03\x04':
+            raise zipfile.BadZipFile(f"Повреждён локальный заголовок элемента '{info.filename}'")
+        fields = _ZIP_LOCAL.unpack(header)
+        src.seek(fields[9] + fields[10], os.SEEK_CUR)
+
+        fp = self._fp
+        offset = fp.tell() - self._base
+        ascii_name = name.isascii()
+        encoded = name.encode('ascii' if ascii_name else 'utf-8')
+        flags = info.flag_bits & ~0x800 | (0 if ascii_name else 0x800)
+        year, month, day, hour, minute, second = info.date_time
+        dosdate = (year - 1980) << 9 | month << 5 | day
+        dostime = hour << 11 | minute << 5 | second // 2
+        extra = _strip_zip64_extra(info.extra)
+        zip64 = info.file_size > _ZIP_LIMIT or info.compress_size > _ZIP_LIMIT
+        version = max(info.extract_version, 45 if zip64 or offset > _ZIP_LIMIT else 20)
+
+        # При флаге дескриптора CRC и размеры в локальном заголовке нулевые - они идут после данных
+        described = info.flag_bits & 0x08
+        crc, csize, usize = (0, 0, 0) if described else (info.CRC, info.compress_size, info.file_size)
+        local_extra = extra
+        if zip64:
+            local_extra = struct.pack('<HHQQ', 1, 16, usize, csize) + extra
+            csize = usize = _ZIP_LIMIT
+        fp.write(_ZIP_LOCAL.pack(b'PK\x03\x04', version, flags, info.compress_type, dostime, dosdate,
+                                 crc, csize, usize, len(encoded), len(local_extra)))
+        fp.write(encoded + local_extra)
+        remaining = info.compress_size
+        while remaining:
+            chunk = src.read(min(remaining, CHUNK_SIZE))
+            if not chunk:
+                raise zipfile.BadZipFile(f"Данные элемента '{info.filename}' обрываются")
+            fp.write(chunk)
+            remaining -= len(chunk)
+        if described:
+            fmt = '<4sLQQ' if zip64 else '<4sLLL'
+            fp.write(struct.pack(fmt, b'PK\x07\x08', info.CRC, info.compress_size, info.file_size))
+
+        # В центральном каталоге не влезающие в 32 бита значения уходят в zip64-поле в порядке APPNOTE
+        values = [info.file_size, info.compress_size, offset]
+        wide = [value for value in values if value > _ZIP_LIMIT]
+        central_extra = extra
+        if wide:
+            central_extra = struct.pack(f'<HH{len(wide)}Q', 1, 8 * len(wide), *wide) + extra
+        usize, csize, offset = (min(value, _ZIP_LIMIT) for value in values)
+        self._central += _ZIP_CENTRAL.pack(
+            b'PK\x01\x02', info.create_version, info.create_system, version, 0, flags, info.compress_type,
+            dostime, dosdate, info.CRC, csize, usize, len(encoded), len(central_extra), len(info.comment),
+            0, info.internal_attr, info.external_attr, offset)
+        self._central += encoded + central_extra + info.comment
+        self._count += 1
+
+    def close(self) -> None:
+        """Дописывает центральный каталог и его конец (zip64, если нужно)."""
+        fp = self._fp
+        try:
+            position = fp.tell()
+            fp.write(self._central)
+            count, size, offset = self._count, len(self._central), position - self._base
+            if count > 0xFFFF or size > _ZIP_LIMIT or offset > _ZIP_LIMIT:
+                end64 = fp.tell() - self._base
+                fp.write(_ZIP64_END.pack(b'PK\x06\x06', _ZIP64_END.size - 12, 45, 45, 0, 0,
+                                         count, count, size, offset))
+                fp.write(_ZIP64_LOCATOR.pack(b'PK\x06\x07', 0, end64, 1))
+                count, size, offset = min(count, 0xFFFF), min(size, _ZIP_LIMIT), min(offset, _ZIP_LIMIT)
+            fp.write(_ZIP_END.pack(b'PK\x05\x06', 0, 0, count, count, size, offset, len(self._comment)))
+            fp.write(self._comment)
+            fp.truncate()
+        finally:
+            fp.close()
+
+
+_WINDOWS_ILLEGAL = str.maketrans(':<>|"?*', '_______')
+
+
+def _safe_join(root: Path, name: str) -> Path:
+    """Путь элемента внутри root без абсолютных путей и '..' - так же, как это делает zipfile."""
+    if os.sep == '\\':
+        name = name.replace('\\', '/')
+    parts = [part for part in os.path.splitdrive(name)[1].split('/') if part not in ('', '.', '..')]
+    if os.sep == '\\':
+        parts = [part.translate(_WINDOWS_ILLEGAL).rstrip('.') or '_' for part in parts]
+    return root.joinpath(*parts)
+
+
+def _scan_tree(root: Path) -> Tuple[Dict[str, os.stat_result], List[str]]:
+    """Один проход os.scandir по root: stat файлов (и ссылок - без перехода по ним) и список подкаталогов."""
+    files: Dict[str, os.stat_result] = {}
+    dirs: List[str] = []
+    pending = [str(root)]
+    while pending:
+        try:
+            it = os.scandir(pending.pop())
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        with it:
+            for item in it:
+                if item.is_dir(follow_symlinks=False):
+                    dirs.append(item.path)
+                    pending.append(item.path)
+                else:
+                    files[item.path] = item.stat(follow_symlinks=False)
+    return files, dirs
+
+
+def _up_to_date(entry: MemberInfo, target: Path, st: Optional[os.stat_result]) -> bool:
+    """
+    Совпадает ли файл на диске с элементом - быстрая проверка как у rsync: размер и время изменения
+    (с точностью до секунды: zip и tar хранят целые секунды). Если время разошлось, а размер нет
+    (файл скопировали или перезаписали тем же содержимым), решает CRC, и файлу возвращается время элемента.
+    """
+    if st is None or entry.type != 'file' or entry.size is None or entry.mtime is None:
+        return False
+    if not stat.S_ISREG(st.st_mode) or st.st_size != entry.size:
+        return False
+    if abs(st.st_mtime - entry.mtime) < 1:
+        return True
+    if entry.crc is None or _file_crc(target) != entry.crc:
+        return False
+    os.utime(target, (entry.mtime, entry.mtime))
+    return True
+
+
+def _file_crc(path: Path) -> int:
+    crc = 0
+    with open(path, 'rb') as f:
+        while chunk := f.read(CHUNK_SIZE):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def _make_dirs(root: Path, dirs: List[str], files: List[str]) -> None:
+    """Создаёт каталоги и родителей файлов один раз, до запуска потоков."""
+    targets = {_safe_join(root, name) for name in dirs}
+    targets.update(_safe_join(root, name).parent for name in files)
+    for target in sorted(targets):
+        target.mkdir(parents=True, exist_ok=True)
+
+
+def _balance(items: List[Any], workers: int, weight: Callable[[Any], int]) -> List[List[Any]]:
+    """Раскладывает элементы по потокам: крупные первыми, каждый - в наименее загруженный."""
+    batches: List[List[Any]] = [[] for _ in range(min(workers, len(items)))]
+    loads = [0] * len(batches)
+    for item in sorted(items, key=weight, reverse=True):
+        i = loads.index(min(loads))
+        batches[i].append(item)
+        loads[i] += weight(item) + 1
+    return batches
+
+
+def _run_batches(func: Callable[[Any], None], batches: List[Any]) -> None:
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=len(batches)) as pool:
+        for future in [pool.submit(func, batch) for batch in batches]:
+            future.result()
+
+
+class MemberReader(io.RawIOBase):
+    """Бинарный поток элемента архива; при закрытии освобождает и сам архив."""
+
+    def __init__(self, stream: Any, *on_close: Callable[[], Any]):
+        self._stream = stream
+        self._on_close = on_close
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return bool(getattr(self._stream, 'seekable', lambda: False)())
+
+    def read(self, size: int = -1) -> bytes:
+        return self._stream.read(size)
+
+    def readinto(self, buffer: Any) -> int:
+        data = self._stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._stream.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._stream.tell()
+
+    def close(self) -> None:
+        if not self.closed:
+            try:
+                self._stream.close()
+            finally:
+                for callback in self._on_close:
+                    callback()
+                super().close()
+
+
+class ArchiveMember(Stream):
+    """
+    Элемент архива как источник потока: member > File(...) копирует данные порциями,
+    без промежуточного извлечения. Кодировка определяется по началу данных, если не указана.
+    """
+
+    def __init__(self, archive: Archive, name: str, encoding: Optional[str] = None):
+        self.archive = archive
+        self.name = name
+        self.encoding = encoding
+
+    def __repr__(self) -> str:
+        return f"<ArchiveMember: {self.archive.path}!{self.name}>"
+
+    def __stream_getData__(self) -> str:
+        return self.archive.read_text(self.name, self.encoding)
+
+    def __stream_iter__(self) -> Iterator[str]:
+        with self.archive.open(self.name) as raw:
+            sample = raw.read(CHUNK_SIZE)
+            encoding = self.encoding
+            if encoding is None:
+                encoding, tier = sniff_encoding(sample, complete=len(sample) < CHUNK_SIZE)
+                if tier == 'ascii':
+                    encoding = 'utf-8'  # в начале только ASCII - дальше может быть что угодно из надмножеств
+            decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder(encoding)(), translate=True)
+            while sample:
+                if text := decoder.decode(sample):
+                    yield text
+                sample = raw.read(CHUNK_SIZE)
+            if text := decoder.decode(b'', final=True):
+                yield text
+
+
+def _drain(stream: Any) -> int:
+    """Читает поток до конца в никуда и возвращает число байт."""
+    total = 0
+    while chunk := stream.read(CHUNK_SIZE):
+        total += len(chunk)
+    return total
+
+
+def _describe(error: BaseException) -> str:
+    return f"{type(error).__name__}: {error}"
+
+
+class _NullSink:
+    """Приёмник элемента 7z (совместим с py7zr.io.Py7zIO) без хранения данных."""
+
+    def __init__(self, name: str, factory: "_NullFactory"):
+        self.name = name
+        self._factory = factory
+        self._size = 0
+
+    def write(self, data: bytes) -> int:
+        self._size += len(data)
+        return len(data)
+
+    def read(self, size: Optional[int] = None) -> bytes:
+        return b''
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return 0
+
+    def flush(self) -> None:
+        pass
+
+    def size(self) -> int:
+        return self._size
+
+    def close(self) -> None:
+        # py7zr закрывает приёмник только после успешной сверки CRC элемента
+        self._factory.checked[self.name] = self._size
+
+
+class _NullFactory:
+    """py7zr.io.WriterFactory для проверки: запоминает элементы, распакованные без ошибок."""
+
+    def __init__(self):
+        self.checked: Dict[str, int] = {}
+
+    def create(self, filename: str) -> _NullSink:
+        return _NullSink(filename, self)
+
+
+class _SpoolWriter:
+    """
+    Приёмник одного элемента 7z (совместим с py7zr.io.Py7zIO): данные держатся в памяти
+    до limit байт, дальше - во временном файле. Новые версии py7zr (например, 1.1.4) вызывают close()
+    по окончании элемента, только если его CRC сошёлся, - повреждённый элемент потребителю не отдаётся.
+    """
+
+    def __init__(self, name: str, factory: "_SpoolFactory"):
+        self.name = name
+        self.fileobj: Any = io.BytesIO()
+        self._factory = factory
+        self._tmp: Any = None
+        self.done = False
+
+    def write(self, data: bytes) -> int:
+        if self._tmp is None and self.fileobj.tell() + len(data) > self._factory.limit:
+            import tempfile
+            self._tmp = tempfile.TemporaryFile(dir=self._factory.spool_dir)
+            spilled = getattr(self._tmp, 'file', self._tmp)
+            spilled.write(self.fileobj.getbuffer())
+            self.fileobj = spilled
+        return self.fileobj.write(data)
+
+    def read(self, size: Optional[int] = None) -> bytes:
+        return self.fileobj.read(size)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self.fileobj.seek(offset, whence)
+
+    def flush(self) -> None:
+        self.fileobj.flush()
+
+    def size(self) -> int:
+        pos = self.fileobj.tell()
+        end = self.fileobj.seek(0, os.SEEK_END)
+        self.fileobj.seek(pos)
+        return end
+
+    def close(self) -> None:
+        if not self.done:
+            self.done = True
+            self.fileobj.seek(0)
+            self._factory.finished(self)
+
+    def discard(self) -> None:
+        self.fileobj.close()
+        if self._tmp is not None:
+            self._tmp.close()
+
+
+class _SpoolFactory:
+    """py7zr.io.WriterFactory: отдаёт готовые элементы в очередь ограниченного размера."""
+
+    def __init__(self, spool_dir: Path, limit: int = 8 << 20):
+        self.spool_dir = spool_dir
+        self.limit = limit
+        self.queue: "queue.Queue[Any]" = queue.Queue(maxsize=1)
+        self.cancelled = threading.Event()
+        self.created: List[_SpoolWriter] = []
+
+    def create(self, filename: str) -> _SpoolWriter:
+        writer = _SpoolWriter(filename, self)
+        self.created.append(writer)
+        return writer
+
+    def finished(self, writer: _SpoolWriter) -> None:
+        if self.cancelled.is_set():
+            writer.discard()
+        else:
+            self.queue.put(writer)
+
+
+def _stream_7z_members(src: Any, targets: List[str], spool_dir: Path) -> Iterator[_SpoolWriter]:
+    """
+    Распаковывает элементы 7z в фоновом потоке и отдаёт их по одному. Очередь размера 1
+    приостанавливает распаковку, пока потребитель не заберёт элемент: на диске/в памяти
+    одновременно не больше пары элементов.
+    """
+    factory = _SpoolFactory(spool_dir)
+    done = object()
+
+    def produce():
+        try:
+            src.extract(targets=targets, factory=factory)
+            # Старые версии py7zr (1.0) не вызывают close() у приёмников: для них элементы отдаются
+            # после успешной распаковки; у уже закрытых приёмников повторный close() ничего не делает
+            for writer in factory.created:
+                writer.close()
+        except BaseException as e:
+            factory.queue.put(e)
+        else:
+            factory.queue.put(done)
+
+    worker = threading.Thread(target=produce, daemon=True)
+    worker.start()
+    try:
+        while (item := factory.queue.get()) is not done:
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        factory.cancelled.set()
+        while worker.is_alive():
+            try:
+                item = factory.queue.get(timeout=0.1)
+                if isinstance(item, _SpoolWriter):
+                    item.discard()
+            except queue.Empty:
+                pass
@@ -2,15 +2,20 @@ from __future__ import annotations
 
 import os
 import stat
+import codecs
+import shutil
 from  pathlib import Path
 import platform
-import subprocess
 from datetime import datetime,timezone
 
-from typing import Optional,Union,Dict
+from typing import Optional,Union,Dict,Iterable,Iterator,Callable
 
-from ..stream import Stream
-from ..encoding_utils import detect_encoding,determine_minimal_encoding
+from ..stream import Stream, CHUNK_SIZE
+from ..encoding_utils import detect_encoding,determine_minimal_encoding,MinimalEncoding
+from ..file_utils import copy_content
+
+# Сколько байтов с конца файла проверяет File.append, прежде чем дописывать в его кодировке (кратно 4 - для utf-16/32)
+_TAIL_SIZE = 4096
 
 
 class File(Stream):
@@ -32,10 +37,86 @@ class File(Stream):
 	def __stream_getData__(self):
 		return self.content
 	def __stream_append__(self, value:str):
-		self.content += value
+		self.append(value)
 	def __stream_rewrite__(self, value:str):
 		self.content = value
 
+	#потоковый протокол: данные передаются порциями, без загрузки файла целиком
+	def __stream_iter__(self) -> Iterator[str]:
+		with self.path.open('r', encoding=self.encoding) as f:
+			while chunk := f.read(CHUNK_SIZE):
+				yield chunk
+	def __stream_append_iter__(self, chunks: Iterable[str]):
+		exists = self.path.exists()
+		# size - длина исходного содержимого в байтах; после перекодировки файла в utf-8 она пересчитывается
+		# как новый размер за вычетом уже дописанного текста (его длину в utf-8 копим до перекодировки)
+		size = self.path.stat().st_size if exists else 0
+		encoding = self.encoding
+		appended = 0
+		recoded = False
+		try:
+			for chunk in chunks:
+				if self._append(chunk):
+					recoded = True
+					encoding = self.encoding
+					size = self.path.stat().st_size - appended - len(chunk.encode('utf-8'))
+				elif not recoded:
+					appended += len(chunk) if chunk.isascii() else len(chunk.encode('utf-8'))
+		except BaseException:
+			# откатываем дописанное; перекодированное исходное содержимое остаётся в utf-8
+			if not exists:
+				self.path.unlink(missing_ok=True)
+			else:
+				os.truncate(self.path, size)
+				self.encoding = encoding
+			raise
+	def __stream_transfer__(self, target: Stream, append: bool) -> bool:
+		"""
+		Побайтовое копирование File -> File при совпадающей кодировке, без перекодирования.
+		Заявленным кодировкам не доверяем: кодировка непустого приёмника сверяется с файлом,
+		а источник проверяется строгим декодированием; при расхождении - обычный путь порциями.
+		"""
+		if not isinstance(target, File) or not self.path.is_file():
+			return False
+		target_empty = not target.path.exists() or target.path.stat().st_size == 0
+		if not append and not target_empty and self.path.samefile(target.path):
+			return True
+		if append and not target_empty:
+			target._check_encoding()
+		codec = codecs.lookup(self.encoding).name
+		if codec != codecs.lookup(target.encoding).name:
+			return False
+		if append and not target_empty and codec in ('utf-8-sig', 'utf-16', 'utf-32'):
+			return False  # BOM источника оказался бы в середине файла
+		if not self._decodes_as(codec):
+			return False
+		try:
+			copy_content(self.path, target.path, append = append)
+		except Exception as e:
+			raise IOError(f"Не удалось скопировать '{self.path}' в '{target.path}': {e}")
+		return True
+	def _decodes_as(self, codec: str) -> bool:
+		"""Строгая проверка, что файл целиком декодируется codec (порциями, без хранения текста)."""
+		decoder = codecs.getincrementaldecoder(codec)()
+		try:
+			with self.path.open('rb') as f:
+				while chunk := f.read(CHUNK_SIZE):
+					decoder.decode(chunk)
+			decoder.decode(b'', final=True)
+		except UnicodeDecodeError:
+			return False
+		return True
+	def __stream_rewrite_iter__(self, chunks: Iterable[str]):
+		if not self.path.exists():
+			self.__stream_append_iter__(chunks)
+			return
+		# пишем во временный файл рядом и атомарно подменяем: источник может совпадать с приёмником
+		def write(tmp: Path) -> str:
+			out = File(tmp, 'ascii')
+			out.__stream_append_iter__(chunks)
+			return out.encoding
+		self.encoding = self._replace_with(write)
+
 	@property
 	def content(self) -> str:
 		"""Содержимое файла как строка (автоматически определяет кодировку при ошибке)."""
@@ -62,6 +143,88 @@ class File(Stream):
 		except Exception as e:
 			raise IOError(f"Не удалось очистить '{self.path}': {e}")
 	
+	def append(self, value: str):
+		"""
+		Дописывает строку в конец файла, не перечитывая его содержимое.
+		Если новая часть не кодируется текущей кодировкой файла, кодировка расширяется:
+		ascii дописывается без перезаписи, иначе файл один раз перекодируется в utf-8.
+		"""
+		self._append(value)
+		return self
+
+	def _append(self, value: str) -> bool:
+		"""Тело append; возвращает True, если файл пришлось целиком перекодировать в utf-8."""
+		if not value:
+			return False
+		if not self.path.exists() or self.path.stat().st_size == 0:
+			# байты, а не write_text: как и при дописывании, концы строк не переводятся
+			encoding = determine_minimal_encoding(value)
+			try:
+				self.path.write_bytes(value.encode(encoding))
+			except Exception as e:
+				raise IOError(f"Не удалось записать в '{self.path}': {e}")
+			self.encoding = encoding
+			return False
+		self._check_encoding()
+		codec = self._append_codec()
+		recoded = False
+		try:
+			data = value.encode(codec)
+		except UnicodeEncodeError:
+			if codecs.lookup(self.encoding).name == 'ascii':
+				# ascii - подмножество cp1251 и utf-8: существующие байты остаются валидными
+				self.encoding = determine_minimal_encoding(value)
+			else:
+				self.recode('utf-8')
+				recoded = True
+			codec = self._append_codec()
+			data = value.encode(codec)
+		try:
+			with self.path.open('ab') as f:
+				f.write(data)
+		except Exception as e:
+			raise IOError(f"Не удалось дописать в '{self.path}': {e}")
+		return recoded
+
+	def appender(self, buffer_size: int = 1 << 20) -> "FileAppender":
+		"""Буферизованный поток для множества операций <<, сбрасывается при выходе из with."""
+		return FileAppender(self, buffer_size)
+
+	def _check_encoding(self):
+		"""
+		Сверяет self.encoding с файлом строгим декодированием его хвоста; при расхождении берёт
+		кодировку из detect_encoding (с кэшем), чтобы не дописать байты другой кодировки.
+		"""
+		size = self.path.stat().st_size
+		with self.path.open('rb') as f:
+			f.seek(max(size - _TAIL_SIZE, 0))
+			tail = f.read()
+		codec = self._append_codec()
+		# хвост мог начаться посреди символа (utf-8, суррогатная пара utf-16): пробуем сдвиги до 3 байтов
+		for skip in range(4 if size > _TAIL_SIZE else 1):
+			try:
+				tail[skip:].decode(codec)
+				return
+			except UnicodeDecodeError as e:
+				error = e
+		encoding = detect_encoding(self.path)
+		if encoding is None or codecs.lookup(encoding).name == codecs.lookup(self.encoding).name:
+			raise error
+		self.encoding = encoding
+
+	def _append_codec(self) -> str:
+		"""Кодек для дописывания в конец файла: без повторной записи BOM."""
+		name = codecs.lookup(self.encoding).name
+		if name == 'utf-8-sig':
+			return 'utf-8'
+		if name in ('utf-16', 'utf-32'):
+			with self.path.open('rb') as f:
+				head = f.read(4)
+			if name == 'utf-32':
+				return 'utf-32-be' if head.startswith(b'\x00\x00\xFE\xFF') else 'utf-32-le'
+			return 'utf-16-be' if head.startswith(b'\xFE\xFF') else 'utf-16-le'
+		return name
+
 	def create(self, mode: int = 438, ignore_errors: bool = True):
 		"""Создаёт пустой файл по указанному пути."""
 		self.path.touch(mode = mode,exist_ok = ignore_errors)
@@ -82,6 +245,7 @@ class File(Stream):
 			editor_command = ["nano", str(path)]
 		else:
 			raise OSError(f"Операционная система '{platform.system()}' не поддерживается.")
+		import subprocess
 		subprocess.run(editor_command, check=True)
 	
 	def chmod(self, mode: int):
@@ -98,27 +262,81 @@ class File(Stream):
 			os.chmod(self.path, mode)
 	def recode(self, to_encoding: Optional[str] = None, from_encoding: Optional[str] = None):
 		"""
-		Перекодирует файл в другую кодировку.
-		:param to_encoding: Целевая кодировка
+		Перекодирует файл в другую кодировку потоково: порциями во временный файл рядом,
+		который затем атомарно заменяет исходный. Концы строк сохраняются как есть.
+		:param to_encoding: Целевая кодировка (None - минимальная, определяется в том же проходе)
 		:param from_encoding: Исходная кодировка (опционально)
 		:return: self._cmd для цепочек вызовов
 		"""
 		try:
-			if to_encoding is None:
-					to_encoding = determine_minimal_encoding(self.content)
-			if from_encoding is None:
-				try:
-					content = self.path.read_text(encoding=self.encoding)
-				except UnicodeDecodeError:
-					detected_encoding = detect_encoding(self.path)
-					content = self.path.read_text(encoding=detected_encoding)
-			else:
-				content = self.path.read_text(encoding=from_encoding)
-			self.path.write_text(content, encoding=to_encoding)
-			self.encoding = to_encoding
+			try:
+				self._recode_stream(from_encoding or self.encoding, to_encoding)
+			except UnicodeDecodeError:
+				if from_encoding is not None:
+					raise
+				self._recode_stream(detect_encoding(self.path), to_encoding)
 		except Exception as e:
 			raise IOError(f"Ошибка перекодировки файла '{self.path}': {e}")
-		
+
+	def _recode_stream(self, from_encoding: str, to_encoding: Optional[str]):
+		def write(tmp: Path) -> str:
+			with self.path.open('r', encoding=from_encoding, newline='') as src:
+				chunks = iter(lambda: src.read(CHUNK_SIZE), '')
+				if to_encoding is not None:
+					with tmp.open('w', encoding=to_encoding, newline='') as dst:
+						for chunk in chunks:
+							dst.write(chunk)
+					return to_encoding
+				# минимальная кодировка определяется по ходу записи: ascii годится и как cp1251, и как utf-8,
+				# а записанное в cp1251 при переходе на utf-8 переписывается вторым проходом по источнику
+				minimal = MinimalEncoding()
+				with tmp.open('wb') as dst:
+					for chunk in chunks:
+						previous = minimal.encoding
+						encoding = minimal.feed(chunk)
+						if previous == 'cp1251' and encoding == 'utf-8':
+							src.seek(0)
+							dst.seek(0)
+							dst.truncate()
+							for chunk in iter(lambda: src.read(CHUNK_SIZE), ''):
+								dst.write(chunk.encode('utf-8'))
+							break
+						dst.write(chunk.encode(encoding))
+				return minimal.encoding
+		self.encoding = self._replace_with(write)
+
+	def _replace_with(self, write: Callable[[Path], str]) -> str:
+		"""
+		Вызывает write(tmp) для временного файла рядом с файлом и атомарно подменяет им файл.
+		Символическая ссылка сохраняется - подменяется файл, на который она указывает. Файл с
+		несколькими жёсткими ссылками перезаписывается на месте из временного: подмена inode
+		разорвала бы связь с остальными именами. Права, а по возможности и владелец, сохраняются.
+		Возвращает кодировку, которую сообщил write.
+		"""
+		import tempfile
+		target = self.path.resolve()
+		fd, tmp_name = tempfile.mkstemp(prefix=f".{target.name}.", dir=target.parent)
+		os.close(fd)
+		tmp = Path(tmp_name)
+		try:
+			encoding = write(tmp)
+			st = target.stat() if target.exists() else None
+			if st is not None and st.st_nlink > 1:
+				copy_content(tmp, target)
+				tmp.unlink()
+				return encoding
+			if st is not None:
+				shutil.copymode(target, tmp)
+				if hasattr(os, 'chown'):
+					try:
+						os.chown(tmp, st.st_uid, st.st_gid)
+					except OSError:
+						pass  # сменить владельца может только root - остаётся текущий пользователь
+			os.replace(tmp, target)
+		except BaseException:
+			tmp.unlink(missing_ok=True)
+			raise
+		return encoding
 
 	def run(self, *args, **kwargs):
 		"""
@@ -267,4 +485,40 @@ class File(Stream):
 			'accessed_local': to_local(stat_result.st_atime),
 			'is_symlink': self.path.is_symlink(),
 			'hidden': is_hidden
-		}
\ No newline at end of file
+		}
+
+
+class FileAppender(Stream):
+	"""
+	Накапливает данные операций << / >> и записывает их в файл одним вызовом append.
+	Сброс происходит при превышении buffer_size символов, при flush() и при выходе из with.
+	"""
+	def __init__(self, file: File, buffer_size: int = 1 << 20):
+		self.file = file
+		self.buffer_size = buffer_size
+		self._chunks: list[str] = []
+		self._size = 0
+
+	def __repr__(self) -> str:
+		return f"<FileAppender: {self.file.path}, buffered={self._size}>"
+
+	def __stream_append__(self, value: str):
+		self._chunks.append(value)
+		self._size += len(value)
+		if self._size >= self.buffer_size:
+			self.flush()
+
+	def flush(self):
+		"""Записывает накопленные данные в файл."""
+		if self._chunks:
+			data = "".join(self._chunks)
+			self._chunks.clear()
+			self._size = 0
+			self.file.append(data)
+		return self
+
+	def __enter__(self) -> "FileAppender":
+		return self
+
+	def __exit__(self, exc_type, exc, tb):
+		self.flush()
@@ -3,6 +3,7 @@ from __future__ import annotations
 from ..stream import Stream
 from .file import File
 from pathlib import Path
+from typing import Iterator
 
 class Files(Stream):
     def __init__(self,*files : str|Path|File, encoding = None, sep = "\n"):
@@ -12,3 +13,9 @@ class Files(Stream):
     
     def __stream_getData__(self) -> str:
         return self.sep.join(map(lambda file:file.content, self.files))
+
+    def __stream_iter__(self) -> Iterator[str]:
+        for i, file in enumerate(self.files):
+            if i and self.sep:
+                yield self.sep
+            yield from file.__stream_iter__()
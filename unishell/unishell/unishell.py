@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import os
+from collections import OrderedDict
 from pathlib import Path
 from typing import Optional
 
@@ -22,6 +23,8 @@ class UniShell:
 
 
 	parms:ViewPort
+	# Максимальное число запомненных результатов to_abspath
+	abspath_cache_size: int = 4096
 		
 	def __init__(
 		self,
@@ -33,27 +36,45 @@ class UniShell:
 	):
 		
 		self.current_dir = Path(str(current_dir))
-		parms.sets({
-			"~": lambda: Path(os.path.expanduser('~')),
-			"..": lambda: self.current_dir.parent,
-			"CURRENTDIR": lambda: self.current_dir
-		})
+		parms.set_("~", lambda: Path(os.path.expanduser('~')), link=True,
+			depends=lambda: (os.environ.get("HOME"), os.environ.get("USERPROFILE")))
+		parms.set_("..", lambda: self.current_dir.parent, link=True, depends=lambda: self.current_dir)
+		parms.set_("CURRENTDIR", lambda: self.current_dir, link=True)
 		parms["default_encoding"] = default_encoding
 		parms["autodetect_encoding"] = autodetect_encoding
 		parms["sep"] = sep
 		self.parms = parms
+		self._abspath_cache: OrderedDict[tuple[str, Path, int], Path] = OrderedDict()
 
 
 
 	def to_abspath(self, path: "str|Path|File|Dir") -> Path:  # pyright: ignore[reportUndefinedVariable]
-		path = Path(str(path))
+		key = (str(path), self.current_dir, self.parms.version)
+		cache = self._abspath_cache
+		result = cache.get(key)
+		if result is not None:
+			cache.move_to_end(key)
+			return result
+		result = self._resolve_abspath(key[0])
+		cache[key] = result
+		if len(cache) > self.abspath_cache_size:
+			cache.popitem(last=False)
+		return result
+
+	def invalidate_abspath_cache(self):
+		"""Сбрасывает кэш to_abspath (нужно после изменения os.environ в обход parms)."""
+		self._abspath_cache.clear()
+		return self
+
+	def _resolve_abspath(self, path: str) -> Path:
+		path = Path(path)
 		parts = path.parts
 		new_path = Path()
 
 		for part in parts:
 			if len(part) >= 3 and part.startswith('%') and part.endswith('%'):
 				var_name = part[1:-1]
-				if var_name in self.parms.all():
+				if var_name in self.parms:
 					new_path = new_path / Path(self.parms[var_name])
 				else:
 					new_path = new_path / part
@@ -74,6 +95,7 @@ class UniShell:
 
 	def cd(self, path):
 		self.current_dir = self.to_abspath(path)
+		self._abspath_cache.clear()
 		return self
 
 	def copy(self, from_path: str | Path, to_path: str | Path, *, follow_symlinks: bool = True, ignore_errors: bool = False):
@@ -118,7 +140,8 @@ class UniShell:
 		rmdir(path, ignore_errors=ignore_errors, onexc=onexc)
 		return self
 
-	def make_archive(self, from_path: str | Path, to_path: str | Path | None = None, format: str = "zip", owner: Optional[str] = None, group: Optional[str] = None, ignore_errors: bool = False):
+	def make_archive(self, from_path: str | Path, to_path: str | Path | None = None, format: str = "zip", owner: Optional[str] = None, group: Optional[str] = None, ignore_errors: bool = False,
+				  level: Optional[int] = None, threads: Optional[int] = None, long_window: bool = False):
 		from_path = self.to_abspath(from_path)
 		if to_path is None:
 			archive_name = f"{from_path.name}.{format}"
@@ -126,20 +149,21 @@ class UniShell:
 		else:
 			to_path = self.to_abspath(to_path)
 		try:
-			make_archive(from_path, to_path, format=format, owner=owner, group=group)
+			make_archive(from_path, to_path, format=format, owner=owner, group=group, level=level, threads=threads, long_window=long_window)
 		except Exception:
 			if not ignore_errors:
 				raise
 		return self
 		
-	def extract_archive(self, archive_path: str | Path, extract_dir: Optional[str | Path] = None, format: Optional[str] = None, ignore_errors: bool = False):
+	def extract_archive(self, archive_path: str | Path, extract_dir: Optional[str | Path] = None, format: Optional[str] = None, ignore_errors: bool = False,
+					 mode: str = "overwrite", delete: bool = False):
 		archive_path = self.to_abspath(archive_path)
 		if extract_dir is None:
 			extract_dir = self.current_dir
 		else:
 			extract_dir = self.to_abspath(extract_dir)
 		try:
-			extract_archive(archive_path, extract_dir, format=format)
+			extract_archive(archive_path, extract_dir, format=format, mode=mode, delete=delete)
 		except Exception:
 			if not ignore_errors:
 				raise
@@ -52,6 +52,7 @@ class UniShell:
         >>> shell.copy('source/', 'dest/').make_archive('dest/', 'backup.zip')
     """
     parms : ViewPort
+    abspath_cache_size: int
     def __init__(
         self,
         sep: str = "\n",
@@ -118,6 +119,24 @@ class UniShell:
             WindowsPath('C:/Users/john/docs')
             >>> shell.to_abspath('../data/./files')
             PosixPath('/home/user/data/files')
+        
+        Note:
+            Results are memoised in a bounded LRU cache (``abspath_cache_size``
+            entries) keyed by the input path, ``current_dir`` and
+            ``parms.version``. Changing parameters through ``parms`` or calling
+            ``cd`` invalidates it automatically.
+        """
+        ...
+    
+    def invalidate_abspath_cache(self) -> 'UniShell':
+        """
+        Clear the memoised results of ``to_abspath``.
+        
+        Needed only when ``os.environ`` or linked parameters change without
+        going through ``parms`` (``set_``, ``set_gl``, ``del_``, ``del_gl``).
+        
+        Returns:
+            Self for method chaining.
         """
         ...
     
@@ -342,12 +361,16 @@ class UniShell:
         format: str = "zip",
         owner: str|None = None,
         group: str|None = None,
-        ignore_errors: bool = False
+        ignore_errors: bool = False,
+        level: int|None = None,
+        threads: int|None = None,
+        long_window: bool = False
     ) -> 'UniShell':
         """
         Create archive from file or directory.
         
-        Supported formats: 'zip', 'tar', 'gztar', 'bztar', 'xztar'.
+        Supported formats: 'zip', 'tar', 'gztar', 'bztar', 'xztar', 'zstdtar', 'lz4tar'.
+        'zstdtar' needs the 'backports.zstd' package before Python 3.14, 'lz4tar' needs 'lz4'.
         
         Args:
             from_path: Source to archive (file or directory).
@@ -357,6 +380,12 @@ class UniShell:
             owner: Set owner for archive entries (Unix only).
             group: Set group for archive entries (Unix only).
             ignore_errors: Continue execution on errors.
+            level: Compression level; None uses the codec default
+                (gz 6, bz2 9, xz 6, zst 3, lz4 0, zip 6).
+            threads: Compression threads for gztar and zstdtar
+                (None uses all cores); other codecs are single-threaded.
+            long_window: zstdtar only - match against a 128 MB window,
+                like `zstd --long`.
         
         Returns:
             Self for method chaining.
@@ -369,6 +398,7 @@ class UniShell:
             >>> shell.make_archive('project/', 'backup.zip')
             >>> shell.make_archive('data/', format='gztar')
             >>> shell.make_archive('logs/', 'logs.tar.gz', format='gztar')
+            >>> shell.make_archive('dump/', format='zstdtar', level=19, long_window=True)
         """
         ...
     
@@ -377,7 +407,9 @@ class UniShell:
         archive_path: FileTp,
         extract_dir: FileTp|None = None,
         format: str|None = None,
-        ignore_errors: bool = False
+        ignore_errors: bool = False,
+        mode: str = "overwrite",
+        delete: bool = False
     ) -> 'UniShell':
         """
         Extract archive contents to directory.
@@ -388,6 +420,11 @@ class UniShell:
                 current directory.
             format: Archive format. If None, auto-detected from extension.
             ignore_errors: Continue execution on errors.
+            mode: 'overwrite' rewrites every member; 'update' writes only
+                members whose size, mtime or CRC differ from the file
+                already in extract_dir.
+            delete: With mode='update', also remove files in extract_dir
+                that are not in the archive.
         
         Returns:
             Self for method chaining.
@@ -401,6 +438,7 @@ class UniShell:
             >>> shell.extract_archive('data.zip', 'extracted/')
             >>> shell.extract_archive('backup.tar.gz')
             >>> shell.extract_archive('archive.unknown', format='zip')
+            >>> shell.extract_archive('release.tar.zst', 'site/', mode='update', delete=True)
         """
         ...
     